@@ -0,0 +1,103 @@
+"""Benchmark dos codecs de eventos Kafka (shared/kafka/codecs.py).
+
+Compara throughput de encode/decode e tamanho do payload para os envelopes
+reais de order_created, payment_processed e menu_updated.
+
+Uso (na raiz do projeto):
+    PYTHONPATH=. python benchmarks/bench_codecs.py [--iterations 20000]
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+from shared.kafka.codecs import TopicCodecs, decode_message, get_codec
+
+def order_created_event(num_items: int = 3) -> dict:
+    return {
+        "event_type": "orders",
+        "payload": {
+            "order_id": str(uuid.uuid4()),
+            "customer_name": "Maria Souza",
+            "items": [
+                {
+                    "item_id": str(uuid.uuid4()),
+                    "item_name": f"Pizza {i}",
+                    "quantity": 2,
+                    "unit_price": 39.9
+                }
+                for i in range(num_items)
+            ],
+            "total_price": 39.9 * 2 * num_items,
+            "payment_type": "online",
+            "status": "pending"
+        },
+        "metadata": {
+            "service": "order-service",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    }
+
+def payment_processed_event() -> dict:
+    return {
+        "event_type": "payment",
+        "payload": {
+            "order_id": str(uuid.uuid4()),
+            "payment_id": str(uuid.uuid4()),
+            "status": "paid"
+        },
+        "metadata": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "service": "payment-service"
+        }
+    }
+
+def menu_updated_event() -> dict:
+    return {
+        "event_type": "menu_updated",
+        "payload": {
+            "item_id": str(uuid.uuid4()),
+            "name": "Pizza Margherita",
+            "description": "Clássica com mussarela e manjericão",
+            "price": 29.9,
+            "available": True
+        }
+    }
+
+EVENTS = {
+    "order_created": order_created_event(),
+    "payment_processed": payment_processed_event(),
+    "menu_updated": menu_updated_event(),
+}
+
+def bench(codec_name: str, topic: str, event: dict, iterations: int):
+    codecs = TopicCodecs({topic: codec_name})
+    value, headers = codecs.encode(topic, event)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codecs.encode(topic, event)
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode_message(value, headers)
+    decode_seconds = time.perf_counter() - start
+
+    return iterations / encode_seconds, iterations / decode_seconds, len(value)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    codec_names = [name for name in ("json", "orjson", "msgpack") if get_codec(name).name == name]
+
+    print(f"{'evento':<18} {'codec':<8} {'encode/s':>12} {'decode/s':>12} {'bytes':>7}")
+    for topic, event in EVENTS.items():
+        for codec_name in codec_names:
+            encode_rate, decode_rate, size = bench(codec_name, topic, event, args.iterations)
+            print(f"{topic:<18} {codec_name:<8} {encode_rate:>12,.0f} {decode_rate:>12,.0f} {size:>7}")
+
+if __name__ == "__main__":
+    main()
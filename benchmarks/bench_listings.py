@@ -0,0 +1,120 @@
+"""Benchmark da listagem de pedidos (GET /orders) por caminho de leitura.
+
+Compara, para páginas de 100 e 1000 pedidos, o tempo de consulta + serialização de:
+  - orm+pydantic: caminho antigo (offset/limit, lazy load dos itens por pedido, OrderResponse)
+  - orm+selectin: orders com os itens em selectinload (duas queries), serializado pelo OrderResponse
+  - view+orjson: list_order_rows (read model order_views) serializado direto para bytes (caminho atual da rota)
+
+Roda em um SQLite temporário, então mede o custo do lado Python (ORM, Pydantic,
+JSON) e o número de queries; a latência de rede até o PostgreSQL não entra.
+
+Uso (na raiz do projeto):
+    PYTHONPATH=. python benchmarks/bench_listings.py [--orders 5000] [--iterations 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services", "order-service"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Order, OrderItem  # noqa: E402
+from schemas import OrderResponse  # noqa: E402
+from controllers import build_order_view, list_order_rows  # noqa: E402
+from shared.responses import dumps  # noqa: E402
+
+ORDER_LIST = TypeAdapter(list[OrderResponse])
+
+def seed(num_orders: int, items_per_order: int = 3):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    base = datetime(2026, 1, 1)
+    orders = []
+    for i in range(num_orders):
+        orders.append(Order(
+            order_id=str(uuid.uuid4()), customer_name=f"Cliente {i}", total_price=39.9 * items_per_order,
+            payment_type="online", status="pending", created_at=base + timedelta(seconds=i),
+            items=[
+                OrderItem(item_id=str(uuid.uuid4()), item_name=f"Pizza {n}", quantity=1, unit_price=39.9)
+                for n in range(items_per_order)
+            ]
+        ))
+    db.add_all(orders)
+    db.flush()
+    # O read model é escrito junto com o pedido, como no create_order
+    db.add_all([build_order_view(order) for order in orders])
+    db.commit()
+    db.close()
+
+def orm_pydantic(db, limit: int) -> bytes:
+    orders = db.query(Order).offset(0).limit(limit).all()
+    return JSONResponse(ORDER_LIST.dump_python(ORDER_LIST.validate_python(orders), mode="json")).body
+
+def orm_selectin(db, limit: int) -> bytes:
+    orders = db.execute(
+        select(Order).options(selectinload(Order.items))
+        .order_by(Order.created_at.desc(), Order.order_id.desc()).limit(limit)
+    ).scalars().all()
+    return JSONResponse(ORDER_LIST.dump_python(ORDER_LIST.validate_python(orders), mode="json")).body
+
+def rows_orjson(db, limit: int) -> bytes:
+    rows, _ = list_order_rows(db, limit=limit)
+    return dumps(rows)
+
+PATHS = {
+    "orm+pydantic": orm_pydantic,
+    "orm+selectin": orm_selectin,
+    "view+orjson": rows_orjson,
+}
+
+def bench(path, limit: int, iterations: int):
+    queries = 0
+
+    def count(*args):
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        total = 0.0
+        for _ in range(iterations):
+            # Sessão nova por página, como em uma requisição (sem identity map aquecido)
+            db = SessionLocal()
+            start = time.perf_counter()
+            body = path(db, limit)
+            total += time.perf_counter() - start
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return total / iterations * 1000, queries // iterations, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        seed(args.orders)
+        print(f"{'página':<8} {'caminho':<15} {'ms/página':>10} {'queries':>8} {'bytes':>9}")
+        for limit in (100, 1000):
+            for name, path in PATHS.items():
+                ms, queries, size = bench(path, limit, args.iterations)
+                print(f"{limit:<8} {name:<15} {ms:>10.2f} {queries:>8} {size:>9}")
+    finally:
+        engine.dispose()
+        os.unlink(_db_file.name)
+
+if __name__ == "__main__":
+    main()
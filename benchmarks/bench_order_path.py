@@ -0,0 +1,111 @@
+"""Teste de carga do POST /api/v1/orders com requisições concorrentes.
+
+Mede pedidos/s e latências (p50/p95/p99) contra um order-service em execução.
+Para comparar os caminhos de criação de pedidos, rode uma vez com
+ORDER_ASYNC_PATH=false (threadpool) e outra com ORDER_ASYNC_PATH=true
+(asyncpg, redis.asyncio e httpx) no order-service. Com --batch-size > 1 os
+pedidos vão em lotes para o POST /api/v1/orders/batch (pedidos/s conta pedidos,
+não requisições; as latências são por lote).
+
+Uso (na raiz do projeto, com os serviços no ar):
+    python benchmarks/bench_order_path.py [--concurrency 50] [--requests 2000]
+    python benchmarks/bench_order_path.py --item-id <uuid>   # reutiliza um item existente
+    python benchmarks/bench_order_path.py --batch-size 100   # endpoint de lote
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+import httpx
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def ensure_menu_item(client: httpx.AsyncClient, menu_url: str, item_id: Optional[str]) -> str:
+    if item_id:
+        return item_id
+    response = await client.post(f"{menu_url}/api/v1/menu", json={
+        "name": "Pizza Benchmark",
+        "description": "Item criado pelo bench_order_path",
+        "price": 39.9,
+        "available": True
+    })
+    response.raise_for_status()
+    return response.json()["item_id"]
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        item_id = await ensure_menu_item(client, args.menu_url, args.item_id)
+        order = {
+            "customer_name": "Cliente Benchmark",
+            "payment_type": "online",
+            "items": [{"item_id": item_id, "quantity": 1}] * args.items_per_order
+        }
+
+        if args.batch_size > 1:
+            url, body, expected = f"{args.url}/api/v1/orders/batch", {"orders": [order] * args.batch_size}, 200
+        else:
+            url, body, expected = f"{args.url}/api/v1/orders", order, 201
+        calls = max(1, args.requests // args.batch_size)
+
+        latencies: List[float] = []
+        errors = created = 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one_call():
+            nonlocal errors, created
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=body)
+                    if response.status_code != expected:
+                        errors += args.batch_size
+                        return
+                    failed = response.json()["failed"] if args.batch_size > 1 else 0
+                    errors += failed
+                    created += args.batch_size - failed
+                except httpx.HTTPError:
+                    errors += args.batch_size
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        # Aquece o cache de cardápio e os pools de conexão antes de medir
+        await asyncio.gather(*(one_call() for _ in range(min(args.concurrency, calls))))
+        latencies.clear()
+        errors = created = 0
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_call() for _ in range(calls)))
+        elapsed = time.perf_counter() - start
+
+    orders = calls * args.batch_size
+    print(f"{'concorrência':<14} {'lote':>5} {'pedidos':>8} {'erros':>6} {'pedidos/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    if not latencies:
+        print(f"{args.concurrency:<14} {args.batch_size:>5} {orders:>8} {errors:>6} {'-':>10}")
+        return
+    print(
+        f"{args.concurrency:<14} {args.batch_size:>5} {orders:>8} {errors:>6} "
+        f"{created / elapsed:>10,.1f} "
+        f"{statistics.median(latencies) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+        f"{percentile(latencies, 99) * 1000:>8.1f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5001", help="Base do order-service")
+    parser.add_argument("--menu-url", default="http://localhost:5003", help="Base do menu-service (cria o item)")
+    parser.add_argument("--item-id", help="Item de cardápio existente; se omitido, um item é criado")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1, help="Pedidos por requisição (> 1 usa /orders/batch)")
+    parser.add_argument("--timeout", type=float, default=30)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
+from datetime import datetime
 from uuid import UUID
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from fastapi import HTTPException
-from kafka_producer import publish_menu_updated
+from kafka_producer import enqueue_menu_updated
 from models import MenuItem
 from schemas import MenuItemCreate, MenuItemUpdate
 
@@ -10,6 +11,10 @@ from schemas import MenuItemCreate, MenuItemUpdate
 def get_all_menu_items(db: Session):
     return db.query(MenuItem).all()
 
+def get_menu_items_by_ids(db: Session, item_ids: List[UUID]) -> List[MenuItem]:
+    """Busca vários itens em uma única query; ids inexistentes são ignorados"""
+    return db.query(MenuItem).filter(MenuItem.item_id.in_([str(item_id) for item_id in item_ids])).all()
+
 def get_menu_item_by_id(db: Session, item_id: UUID) -> MenuItem:
 
     item = db.query(MenuItem).filter_by(item_id=str(item_id)).first()
@@ -22,11 +27,13 @@ def get_menu_item_by_id(db: Session, item_id: UUID) -> MenuItem:
 def create_menu_item(db: Session, item_data: MenuItemCreate):
     item = MenuItem(**item_data.model_dump())
     db.add(item)
+    # Gera o item_id antes do commit para compor o evento
+    db.flush()
+
+    enqueue_menu_updated(db, item)
     db.commit()
     db.refresh(item)
 
-    publish_menu_updated(item)
-
     return item
 
 def update_menu_item(db: Session, item_id: UUID, update_data: MenuItemUpdate) -> MenuItem:
@@ -35,17 +42,20 @@ def update_menu_item(db: Session, item_id: UUID, update_data: MenuItemUpdate) ->
 
     for field, value in update_data.model_dump(exclude_unset=True).items():
         setattr(item, field, value)
+    # Aplica o onupdate de updated_at antes de compor o evento
+    db.flush()
 
+    enqueue_menu_updated(db, item)
     db.commit()
     db.refresh(item)
 
-    publish_menu_updated(item)
-
     return item
 
 def delete_menu_item(db: Session, item_id: UUID):
     item = get_menu_item_by_id(db, item_id)
+    item.updated_at = datetime.utcnow()
 
+    enqueue_menu_updated(db, item, deleted=True)
     db.delete(item)
     db.commit()
     return None
@@ -1,11 +1,16 @@
 import logging
-from shared.kafka.producer import get_kafka_producer
-from models import MenuItem
+from datetime import datetime
+from sqlalchemy.orm import Session
+from shared.kafka.outbox import add_outbox_event
+from models import MenuItem, OutboxEvent
 
 logger = logging.getLogger(__name__)
 
-def publish_menu_updated(item: MenuItem):
-    producer = get_kafka_producer()
+def enqueue_menu_updated(db: Session, item: MenuItem, deleted: bool = False):
+    """Grava o evento na outbox dentro da transação do item; o OutboxRelay publica no Kafka.
+
+    Remoções usam o mesmo tópico com deleted=True, para réplicas e caches descartarem o item.
+    """
     try:
         event = {
             "event_type": "menu_updated",
@@ -14,10 +19,16 @@ def publish_menu_updated(item: MenuItem):
                 "name": item.name,
                 "description": item.description,
                 "price": float(item.price),
-                "available": item.available
+                "available": item.available,
+                "updated_at": item.updated_at.isoformat() if item.updated_at else None,
+                "deleted": deleted
+            },
+            "metadata": {
+                "service": "menu-service",
+                "timestamp": datetime.utcnow().isoformat()
             }
         }
-        producer.publish_message("menu_updated", event)
+        add_outbox_event(db, OutboxEvent, "menu_updated", event, key=str(item.item_id))
     except Exception as e:
-        logger.error(f"Falha ao publicar evento: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"Falha ao registrar evento na outbox: {str(e)}")
+        raise
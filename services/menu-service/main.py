@@ -1,16 +1,36 @@
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 
 from routes import router as menu_router
+from database import SessionLocal
+from models import OutboxEvent
+from shared.kafka.producer import get_kafka_producer, is_kafka_producer_ready, shutdown_kafka_producer
+from shared.kafka.outbox import OutboxRelay
+from shared.kafka.metrics import latest_metrics
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cria o producer sem bloquear; a conexão é confirmada em background
+    get_kafka_producer()
+    outbox_relay = OutboxRelay(SessionLocal, OutboxEvent)
+    outbox_relay.start()
+    try:
+        yield
+    finally:
+        # Entrega os eventos ainda enfileirados antes de encerrar
+        outbox_relay.stop()
+        shutdown_kafka_producer()
+
 app = FastAPI(
     title="Menu Service API",
     description="API para gerenciamento de itens do menu",
     version="1.0.0",
+    lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -29,6 +49,25 @@ app.include_router(
     tags=["Menu Items"]
 )
 
+@app.get("/health", tags=["Health"])
+def health():
+    """Liveness: o processo está de pé, mesmo sem Kafka"""
+    return {"status": "ok", "kafka_producer_ready": is_kafka_producer_ready()}
+
+@app.get("/health/ready", tags=["Health"])
+def readiness(response: Response):
+    """Readiness: 503 enquanto o producer não confirmar a conexão com o Kafka"""
+    ready = is_kafka_producer_ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "starting", "kafka_producer_ready": ready}
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Métricas Prometheus (consumer lag, throughput, latências do producer e do consumer)"""
+    body, content_type = latest_metrics()
+    return Response(content=body, media_type=content_type)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("menu-service")
 logger.info("✅ Menu Service iniciado")
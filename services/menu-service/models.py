@@ -2,6 +2,7 @@ from sqlalchemy import Column, String, Numeric, DateTime, Boolean
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
 from database import Base
+from shared.kafka.outbox import OutboxMixin
 import uuid
 
 
@@ -18,3 +19,7 @@ class MenuItem(Base):
 
     def __repr__(self):
         return f"<MenuItem(name={self.name}, price={self.price}, available={self.available})>"
+
+
+class OutboxEvent(OutboxMixin, Base):
+    __tablename__ = 'outbox_events'
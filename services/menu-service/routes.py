@@ -2,11 +2,14 @@ from uuid import UUID
 from typing import List
 from sqlalchemy import select
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 from schemas import MenuItemResponse, MenuItemCreate, MenuItemUpdate
-from controllers import get_menu_item_by_id, get_all_menu_items, create_menu_item, update_menu_item, delete_menu_item
+from controllers import (
+    get_menu_item_by_id, get_menu_items_by_ids, get_all_menu_items, create_menu_item, update_menu_item, delete_menu_item
+)
 from database import get_db
 from models import MenuItem
+from shared.menu import MENU_BATCH_MAX_IDS
 
 
 router = APIRouter()
@@ -15,6 +18,20 @@ router = APIRouter()
 def list_menu_items(db: Session = Depends(get_db)):
     return get_all_menu_items(db)
 
+# Declarada antes de /menu/{item_id} para "batch" não ser interpretado como id
+@router.get("/menu/batch", response_model=List[MenuItemResponse])
+def get_menu_items_batch(ids: str = Query(..., description="UUIDs separados por vírgula"), db: Session = Depends(get_db)):
+    try:
+        item_ids = list(dict.fromkeys(UUID(item_id.strip()) for item_id in ids.split(",") if item_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Lista de ids inválida")
+    if len(item_ids) > MENU_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Máximo de {MENU_BATCH_MAX_IDS} ids por requisição"
+        )
+    return get_menu_items_by_ids(db, item_ids)
+
 @router.get("/menu/{item_id}", response_model=MenuItemResponse)
 def get_menu_item(item_id: UUID, db: Session = Depends(get_db)):
     item = get_menu_item_by_id(db, item_id)
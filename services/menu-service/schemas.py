@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
@@ -19,5 +20,7 @@ class MenuItemUpdate(BaseModel):
 
 class MenuItemResponse(MenuItemBase):
     item_id: str
+    # Consumidores com réplica local comparam com o updated_at dos eventos
+    updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -1,8 +1,8 @@
 import pytest
 import logging
-from unittest.mock import patch, MagicMock
-from kafka_producer import publish_menu_updated
-from models import MenuItem
+from unittest.mock import MagicMock
+from kafka_producer import enqueue_menu_updated
+from models import MenuItem, OutboxEvent
 
 @pytest.fixture
 def sample_menu_item():
@@ -14,19 +14,35 @@ def sample_menu_item():
         available=True
     )
 
-def test_publish_menu_updated_success(sample_menu_item):
-    mock_producer = MagicMock()
-    with patch("kafka_producer.get_kafka_producer", return_value=mock_producer):
-        publish_menu_updated(sample_menu_item)
-        mock_producer.publish_message.assert_called_once()
+def test_enqueue_menu_updated_success(sample_menu_item):
+    db_mock = MagicMock()
 
-def test_publish_menu_updated_failure_logs_and_raises(sample_menu_item, caplog):
-    mock_producer = MagicMock()
-    mock_producer.publish_message.side_effect = Exception("Erro simulado")
+    enqueue_menu_updated(db_mock, sample_menu_item)
 
-    with patch("kafka_producer.get_kafka_producer", return_value=mock_producer):
-        with caplog.at_level(logging.ERROR):
-            with pytest.raises(Exception, match="Erro simulado"):
-                publish_menu_updated(sample_menu_item)
+    db_mock.add.assert_called_once()
+    outbox_event = db_mock.add.call_args[0][0]
+    assert isinstance(outbox_event, OutboxEvent)
+    assert outbox_event.topic == "menu_updated"
+    assert outbox_event.payload["event_type"] == "menu_updated"
+    assert outbox_event.payload["payload"]["item_id"] == sample_menu_item.item_id
+    assert outbox_event.key == sample_menu_item.item_id
+    db_mock.commit.assert_not_called()
 
-            assert "Falha ao publicar evento: Erro simulado" in caplog.text
+def test_enqueue_menu_updated_deleted_flag(sample_menu_item):
+    db_mock = MagicMock()
+
+    enqueue_menu_updated(db_mock, sample_menu_item, deleted=True)
+
+    payload = db_mock.add.call_args[0][0].payload["payload"]
+    assert payload["deleted"] is True
+    assert payload["updated_at"] is None
+
+def test_enqueue_menu_updated_failure_logs_and_raises(sample_menu_item, caplog):
+    db_mock = MagicMock()
+    db_mock.add.side_effect = Exception("Erro simulado")
+
+    with caplog.at_level(logging.ERROR):
+        with pytest.raises(Exception, match="Erro simulado"):
+            enqueue_menu_updated(db_mock, sample_menu_item)
+
+        assert "Falha ao registrar evento na outbox: Erro simulado" in caplog.text
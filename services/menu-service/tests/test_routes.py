@@ -64,6 +64,18 @@ def test_list_menu_items(client):
     data = response.json()
     assert isinstance(data, list)
 
+# Lote de itens - GET
+def test_get_menu_items_batch(client):
+    fake_id = "11111111-1111-1111-1111-111111111111"
+    response = client.get(f"{API_PREFIX}/menu/batch", params={"ids": f"{created_item_id},{fake_id},{created_item_id}"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [item["item_id"] for item in data] == [created_item_id]
+
+def test_get_menu_items_batch_invalid_ids(client):
+    response = client.get(f"{API_PREFIX}/menu/batch", params={"ids": "not-a-uuid"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
 # Item válido - PUT
 def test_update_menu_item(client):
     response = client.put(f"{API_PREFIX}/menu/{created_item_id}", json=updated_item)
@@ -87,6 +99,16 @@ def test_delete_menu_item(client):
     response = client.delete(f"{API_PREFIX}/menu/{created_item_id}")
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
+def test_delete_menu_item_enqueues_tombstone():
+    from models import OutboxEvent
+    from tests.conftest import TestingSessionLocal
+    db = TestingSessionLocal()
+    events = db.query(OutboxEvent).filter_by(key=created_item_id).all()
+    db.close()
+    tombstones = [event for event in events if event.payload["payload"]["deleted"]]
+    assert len(tombstones) == 1
+    assert tombstones[0].payload["payload"]["updated_at"] is not None
+
 # Item não encontrado - DELETE
 def test_delete_nonexistent_item(client):
     fake_id = "11111111-1111-1111-1111-111111111111"
@@ -1,16 +1,26 @@
+import logging
 import os
 import redis
+import redis.asyncio as aioredis
 import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from prometheus_client import Counter
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+logger = logging.getLogger("order-cache")
+
 # Configuração Redis via variáveis de ambiente
 REDIS_URL = os.getenv('REDIS_URL')
 if REDIS_URL:
     # Se REDIS_URL estiver definida, usar diretamente
     redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+    async_redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
 else:
     # Caso contrário, usar host e porta individuais
     REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
@@ -23,13 +33,213 @@ else:
         password=REDIS_PASSWORD,
         decode_responses=True
     )
+    # Cliente assíncrono para o caminho de criação de pedidos no event loop
+    async_redis_client = aioredis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        password=REDIS_PASSWORD,
+        decode_responses=True
+    )
 
 # TTL configurável via variável de ambiente
 CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 300))
 
+# Camada local: invalidada em todas as réplicas pelo pub/sub do Redis (o menu_updated só
+# chega à réplica dona da partição); o TTL fica como rede de segurança
+LOCAL_CACHE_MAX_ITEMS = int(os.getenv('LOCAL_CACHE_MAX_ITEMS', 1024))
+LOCAL_CACHE_TTL_SECONDS = float(os.getenv('LOCAL_CACHE_TTL_SECONDS', 30))
+LOCAL_CACHE_INVALIDATION_CHANNEL = os.getenv('LOCAL_CACHE_INVALIDATION_CHANNEL', 'menu:local-invalidate')
+LOCAL_CACHE_INVALIDATION_RETRY_SECONDS = float(os.getenv('LOCAL_CACHE_INVALIDATION_RETRY_SECONDS', 1))
+
+MENU_CACHE_REQUESTS = Counter(
+    'menu_cache_requests', 'Consultas ao cache de itens do menu por camada', ['tier', 'result']
+)
+
+class LocalCache:
+    """LRU em memória com TTL; guarda os dicts já decodificados (não devem ser modificados).
+
+    Entradas expiradas só saem por LRU: get_stale as devolve quando o menu-service está fora.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 30):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Valor mesmo expirado; None só se nunca esteve no cache ou já foi descartado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+local_menu_cache = LocalCache(maxsize=LOCAL_CACHE_MAX_ITEMS, ttl_seconds=LOCAL_CACHE_TTL_SECONDS)
+
+def _count(tier: str, hits: int, misses: int):
+    if hits:
+        MENU_CACHE_REQUESTS.labels(tier, 'hit').inc(hits)
+    if misses:
+        MENU_CACHE_REQUESTS.labels(tier, 'miss').inc(misses)
+
 def set_cached_menu_item(item_id: str, data: dict):
+    local_menu_cache.set(item_id, data)
     redis_client.setex(f"menu:item:{item_id}", CACHE_TTL_SECONDS, json.dumps(data))
 
+def invalidate_cached_menu_item(item_id: str):
+    local_menu_cache.delete(item_id)
+    redis_client.delete(f"menu:item:{item_id}")
+
+def publish_menu_invalidation(item_id: str):
+    """Avisa todas as réplicas para descartar o item da camada local (o Redis já tem a versão nova)"""
+    redis_client.publish(LOCAL_CACHE_INVALIDATION_CHANNEL, item_id)
+
+def listen_menu_invalidations(stop_event: threading.Event, client=None, cache: Optional[LocalCache] = None):
+    """Descarta da camada local os itens anunciados no canal até `stop_event`.
+
+    O pub/sub não reenvia o que foi publicado sem assinatura ativa: a cada (re)assinatura
+    a camada local é esvaziada, para não servir versões cuja invalidação se perdeu.
+    """
+    client = redis_client if client is None else client
+    cache = local_menu_cache if cache is None else cache
+    while not stop_event.is_set():
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(LOCAL_CACHE_INVALIDATION_CHANNEL)
+            cache.clear()
+            while not stop_event.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message and message.get('type') == 'message':
+                    cache.delete(message['data'])
+        except redis.RedisError as e:
+            logger.warning(f"Assinatura de invalidações do cache local falhou: {str(e)}")
+            stop_event.wait(LOCAL_CACHE_INVALIDATION_RETRY_SECONDS)
+        finally:
+            pubsub.close()
+
+_invalidation_stop = threading.Event()
+
+def start_local_cache_invalidation() -> threading.Thread:
+    _invalidation_stop.clear()
+    thread = threading.Thread(
+        target=listen_menu_invalidations, args=(_invalidation_stop,), daemon=True, name="order-cache-invalidation"
+    )
+    thread.start()
+    return thread
+
+def stop_local_cache_invalidation():
+    _invalidation_stop.set()
+
 def get_cached_menu_item(item_id: str):
+    local = local_menu_cache.get(item_id)
+    if local is not None:
+        _count('local', 1, 0)
+        return local
+    _count('local', 0, 1)
+
     cached = redis_client.get(f"menu:item:{item_id}")
-    return json.loads(cached) if cached else None
+    _count('redis', 1 if cached else 0, 0 if cached else 1)
+    if not cached:
+        return None
+    data = json.loads(cached)
+    local_menu_cache.set(item_id, data)
+    return data
+
+def get_stale_menu_items(item_ids: List[str]) -> Dict[str, dict]:
+    """Última versão conhecida dos itens, ignorando o TTL (fallback com o menu-service indisponível)"""
+    items = {}
+    for item_id in item_ids:
+        stale = local_menu_cache.get_stale(item_id)
+        if stale is not None:
+            items[item_id] = stale
+    _count('stale', len(items), len(item_ids) - len(items))
+    return items
+
+def _get_local_many(item_ids: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Itens encontrados na camada local e ids que precisam ir ao Redis"""
+    items = {}
+    for item_id in item_ids:
+        local = local_menu_cache.get(item_id)
+        if local is not None:
+            items[item_id] = local
+    remaining = [item_id for item_id in item_ids if item_id not in items]
+    _count('local', len(items), len(remaining))
+    return items, remaining
+
+def _merge_redis_values(items: Dict[str, dict], item_ids: List[str], values: list) -> Dict[str, dict]:
+    found = 0
+    for item_id, value in zip(item_ids, values):
+        if value:
+            items[item_id] = json.loads(value)
+            local_menu_cache.set(item_id, items[item_id])
+            found += 1
+    _count('redis', found, len(item_ids) - found)
+    return items
+
+def _queue_setex(pipe, items: Dict[str, dict]):
+    for item_id, data in items.items():
+        local_menu_cache.set(item_id, data)
+        pipe.setex(f"menu:item:{item_id}", CACHE_TTL_SECONDS, json.dumps(data))
+
+def get_cached_menu_items(item_ids: List[str]) -> Dict[str, dict]:
+    """Busca na memória local e, para o restante, um único MGET; itens fora do cache não aparecem no resultado"""
+    if not item_ids:
+        return {}
+    items, remaining = _get_local_many(item_ids)
+    if not remaining:
+        return items
+    values = redis_client.mget([f"menu:item:{item_id}" for item_id in remaining])
+    return _merge_redis_values(items, remaining, values)
+
+def set_cached_menu_items(items: Dict[str, dict]):
+    """Preenche as duas camadas; no Redis em um único round trip (pipeline sem transação)"""
+    if not items:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_setex(pipe, items)
+    pipe.execute()
+
+async def get_cached_menu_items_async(item_ids: List[str]) -> Dict[str, dict]:
+    """Versão de get_cached_menu_items que não bloqueia o event loop"""
+    if not item_ids:
+        return {}
+    items, remaining = _get_local_many(item_ids)
+    if not remaining:
+        return items
+    values = await async_redis_client.mget([f"menu:item:{item_id}" for item_id in remaining])
+    return _merge_redis_values(items, remaining, values)
+
+async def set_cached_menu_items_async(items: Dict[str, dict]):
+    if not items:
+        return
+    pipe = async_redis_client.pipeline(transaction=False)
+    _queue_setex(pipe, items)
+    await pipe.execute()
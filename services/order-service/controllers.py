@@ -1,105 +1,371 @@
+import base64
 import logging
-import requests
 import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from fastapi import status, HTTPException
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.orm import Session
-from models import Order, OrderItem
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Order, OrderItem, OrderView
 from schemas import OrderCreate
-from kafka_producer import publish_order_created_event
-from cache import set_cached_menu_item, get_cached_menu_item
-from shared.enums import PaymentStatus
+from kafka_producer import enqueue_order_created_event
+from cache import (
+    get_cached_menu_items, set_cached_menu_items,
+    get_cached_menu_items_async, set_cached_menu_items_async, get_stale_menu_items
+)
+from menu_client import MenuServiceUnavailable, menu_client
+from menu_replica import menu_replica
+from shared.enums import PaymentStatus, PaymentType
+from shared.menu import MENU_BATCH_MAX_IDS
 
 logger = logging.getLogger(__name__)
 
-def fetch_menu_item(item_id: str) -> dict:
-    cached = get_cached_menu_item(item_id)
-    if cached:
-        logger.info(f"🔁 Cache HIT para item {item_id}")
-        return cached
-
-    logger.info(f"🔄 Cache MISS. Consultando menu-service para item {item_id}")
-    response = requests.get(f"http://menu-service:5003/api/v1/menu/{item_id}")
-    if response.status_code == 200:
-        item_data = response.json()
-        set_cached_menu_item(item_id, item_data)
-        return item_data
-    return None
-
-def create_order(db: Session, order_data: OrderCreate):
-    try:
+def _serve_stale(item_ids: List[str], error: MenuServiceUnavailable) -> Dict[str, dict]:
+    """Com o menu-service indisponível, usa a última versão em memória; sem ela, 503"""
+    stale = get_stale_menu_items(item_ids)
+    if len(stale) < len(item_ids):
+        logger.error(f"menu-service indisponível e sem cópia local de {len(item_ids) - len(stale)} item(ns): {str(error)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço de cardápio indisponível. Tente novamente em instantes."
+        )
+    logger.warning(f"menu-service indisponível, servindo {len(stale)} item(ns) do cache expirado: {str(error)}")
+    return stale
+
+def _from_replica(item_ids: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Itens servidos pela réplica local e ids que ainda precisam de cache/menu-service"""
+    unique_ids = list(dict.fromkeys(item_ids))
+    replicated = menu_replica.get_many(unique_ids)
+    if replicated is None:
+        return {}, unique_ids
+    # Itens removidos não existem; ids desconhecidos (criados há instantes) seguem o caminho normal
+    return replicated, [item_id for item_id in unique_ids
+                        if item_id not in replicated and not menu_replica.is_deleted(item_id)]
+
+def _menu_batches(item_ids: List[str]) -> List[List[str]]:
+    return [item_ids[start:start + MENU_BATCH_MAX_IDS] for start in range(0, len(item_ids), MENU_BATCH_MAX_IDS)]
+
+def _batch_items(response, chunk: List[str]) -> Dict[str, dict]:
+    """Itens de uma resposta do /batch; qualquer status diferente de 200 é falha do menu-service, não item ausente"""
+    if response.status_code != 200:
+        raise MenuServiceUnavailable(f"menu-service respondeu {response.status_code} para o lote de {len(chunk)} item(ns)")
+    return {item["item_id"]: item for item in response.json()}
+
+def fetch_menu_items(item_ids: List[str]) -> Dict[str, dict]:
+    """Busca vários itens: réplica local se aquecida; senão um MGET no cache e uma chamada ao menu-service
+    por bloco de MENU_BATCH_MAX_IDS ids"""
+    replicated, unique_ids = _from_replica(item_ids)
+    if not unique_ids:
+        return replicated
+
+    items = get_cached_menu_items(unique_ids)
+    missing = [item_id for item_id in unique_ids if item_id not in items]
+    logger.info(f"🔁 Cache: {len(items)} HIT(s), {len(missing)} MISS(es)")
+    items.update(replicated)
+    if not missing:
+        return items
+
+    fetched: Dict[str, dict] = {}
+    for chunk in _menu_batches(missing):
+        try:
+            fetched.update(_batch_items(menu_client.get("/batch", params={"ids": ",".join(chunk)}), chunk))
+        except MenuServiceUnavailable as e:
+            items.update(_serve_stale(chunk, e))
+    set_cached_menu_items(fetched)
+    items.update(fetched)
+    return items
+
+async def fetch_menu_items_async(item_ids: List[str]) -> Dict[str, dict]:
+    """Mesma busca de fetch_menu_items com Redis e HTTP assíncronos"""
+    replicated, unique_ids = _from_replica(item_ids)
+    if not unique_ids:
+        return replicated
 
-        total_price = 0
-        order_items = []
-
-        for item in order_data.items:
-            item_uuid = UUID(item.item_id)
-            item_data = fetch_menu_item(str(item_uuid))
-
-            if not item_data:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Item com ID '{str(item.item_id)}' não encontrado no menu."
-                )
-            if not item_data['available']:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Item com ID '{str(item.item_id)}' não está disponível."
-                )
-
-            total_price += item_data['price'] * item.quantity
-
-            order_item = OrderItem(
-                item_id=str(item.item_id),
-                item_name=item_data["name"],
-                quantity=item.quantity,
-                unit_price=item_data["price"]
+    items = await get_cached_menu_items_async(unique_ids)
+    missing = [item_id for item_id in unique_ids if item_id not in items]
+    logger.info(f"🔁 Cache: {len(items)} HIT(s), {len(missing)} MISS(es)")
+    items.update(replicated)
+    if not missing:
+        return items
+
+    fetched: Dict[str, dict] = {}
+    for chunk in _menu_batches(missing):
+        try:
+            fetched.update(_batch_items(await menu_client.aget("/batch", params={"ids": ",".join(chunk)}), chunk))
+        except MenuServiceUnavailable as e:
+            items.update(_serve_stale(chunk, e))
+    await set_cached_menu_items_async(fetched)
+    items.update(fetched)
+    return items
+
+def _build_order(order_data: OrderCreate, menu_items: Dict[str, dict]) -> Order:
+    """Valida os itens contra o cardápio e monta o pedido (sem I/O)"""
+    total_price = 0
+    order_items = []
+    for item in order_data.items:
+        item_data = menu_items.get(str(UUID(item.item_id)))
+
+        if not item_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Item com ID '{str(item.item_id)}' não encontrado no menu."
+            )
+        if not item_data['available']:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Item com ID '{str(item.item_id)}' não está disponível."
             )
 
-            order_items.append(order_item)
+        total_price += item_data['price'] * item.quantity
 
-        order = Order(
-            customer_name=order_data.customer_name,
-            payment_type=order_data.payment_type,
-            total_price=total_price,
-            status=PaymentStatus.pending,
-            items=order_items # Relação 1:N
+        order_item = OrderItem(
+            item_id=str(item.item_id),
+            item_name=item_data["name"],
+            quantity=item.quantity,
+            unit_price=item_data["price"]
         )
 
+        order_items.append(order_item)
+
+    return Order(
+        customer_name=order_data.customer_name,
+        payment_type=order_data.payment_type,
+        total_price=total_price,
+        status=PaymentStatus.pending,
+        items=order_items # Relação 1:N
+    )
+
+def _order_created_payload(order: Order) -> dict:
+    return {
+        "order_id": str(order.order_id),
+        "customer_name": order.customer_name,
+        "items": [
+            {
+                "item_id": str(item.item_id),
+                "item_name": item.item_name,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price)
+            }
+            for item in order.items
+        ],
+        "total_price": float(order.total_price),
+        "payment_type": order.payment_type,
+        "status": order.status
+    }
+
+def build_order_view(order: Order) -> OrderView:
+    """Linha do read model a partir do pedido já com order_id e created_at (após o flush)"""
+    return OrderView(
+        order_id=order.order_id,
+        customer_name=order.customer_name,
+        total_price=order.total_price,
+        payment_type=order.payment_type,
+        status=order.status,
+        created_at=order.created_at,
+        updated_at=datetime.utcnow(),
+        items=[
+            {
+                "item_id": str(item.item_id),
+                "item_name": item.item_name,
+                "unit_price": float(item.unit_price),
+                "quantity": item.quantity
+            }
+            for item in order.items
+        ]
+    )
+
+def create_order(db: Session, order_data: OrderCreate) -> dict:
+    try:
+        menu_items = fetch_menu_items([str(UUID(item.item_id)) for item in order_data.items])
+        order = _build_order(order_data, menu_items)
+
         db.add(order)
+        # Gera o order_id antes do commit para compor o evento
+        db.flush()
+
+        # Kafka Event (outbox): persistido no mesmo commit do pedido
+        enqueue_order_created_event(db, _order_created_payload(order))
+        # Read model no mesmo commit: o pedido já aparece completo na listagem
+        view = build_order_view(order)
+        db.add(view)
+        # Resposta montada antes do commit, ainda na thread do worker: após o commit o
+        # pedido expira e validá-lo na rota faria SELECTs síncronos no event loop
+        created_row = _order_view_row(view)
+
         db.commit()
-        db.refresh(order)
 
-        logger.info(f"Novo pedido criado - ID: {order.order_id}")
+        logger.info(f"Novo pedido criado - ID: {created_row['order_id']}")
+
+        return created_row
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao criar pedido: {str(e)}")
+        raise
+
+async def create_order_async(db: AsyncSession, order_data: OrderCreate):
+    """create_order sem bloquear o event loop: sessão, Redis e HTTP assíncronos.
+
+    A publicação no Kafka já não bloqueia: o evento vai para a outbox no mesmo commit.
+    """
+    try:
+        menu_items = await fetch_menu_items_async([str(UUID(item.item_id)) for item in order_data.items])
+        order = _build_order(order_data, menu_items)
+
+        db.add(order)
+        await db.flush()
 
-        # Kafka Event
-        publish_order_created_event({
-            "order_id": str(order.order_id),
-            "customer_name": order.customer_name,
-            "items": [
-                {
-                    "item_id": str(item.item_id),
-                    "item_name": item.item_name,
-                    "quantity": item.quantity,
-                    "unit_price": float(item.unit_price)
-                }
-                for item in order.items
-            ],
-            "total_price": float(order.total_price),
-            "payment_type": order.payment_type,
-            "status": order.status
-        })
+        enqueue_order_created_event(db, _order_created_payload(order))
+        db.add(build_order_view(order))
+
+        # expire_on_commit=False: o pedido e seus itens seguem carregados para a resposta
+        await db.commit()
+
+        logger.info(f"Novo pedido criado - ID: {order.order_id}")
 
         return order
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erro ao criar pedido: {str(e)}")
         raise
 
-def get_orders(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Order).offset(skip).limit(limit).all()
+def create_orders_batch(db: Session, orders_data: List[OrderCreate]) -> List[dict]:
+    """Cria vários pedidos em uma transação: uma resolução do cardápio, um flush e um commit.
+
+    Pedidos com item inexistente ou indisponível são recusados individualmente; o resultado
+    segue a ordem da entrada. Os order_created vão para a outbox no mesmo commit, e o relay
+    os publica em lote.
+    """
+    item_ids = list(dict.fromkeys(str(UUID(item.item_id)) for order_data in orders_data for item in order_data.items))
+    menu_items = fetch_menu_items(item_ids)
+
+    results: List[Optional[dict]] = []
+    orders: List[Order] = []
+    for order_data in orders_data:
+        try:
+            orders.append(_build_order(order_data, menu_items))
+            results.append(None)
+        except HTTPException as e:
+            results.append({"status": "error", "status_code": e.status_code, "detail": e.detail})
+
+    if not orders:
+        return results
+
+    try:
+        db.add_all(orders)
+        # Um flush para o lote inteiro: os INSERTs de orders e order_items saem agrupados
+        db.flush()
+
+        views = []
+        for order in orders:
+            enqueue_order_created_event(db, _order_created_payload(order))
+            views.append(build_order_view(order))
+        db.add_all(views)
+        # Montado antes do commit, que expira os objetos (evita um SELECT por pedido)
+        created_rows = [_order_view_row(view) for view in views]
+
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao criar lote de {len(orders)} pedido(s): {str(e)}")
+        raise
+
+    logger.info(f"Lote de pedidos criado - {len(orders)} criado(s), {len(results) - len(orders)} recusado(s)")
+
+    created = iter(created_rows)
+    return [
+        result if result is not None else {"status": "created", "order": next(created)}
+        for result in results
+    ]
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado ou adulterado"""
+
+def encode_cursor(order: Order) -> str:
+    raw = json.dumps([order.created_at.isoformat(), str(order.order_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, order_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(order_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Cursor inválido: {cursor}") from e
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _order_page(statement, skip: int, limit: int, cursor: Optional[str], order_status: Optional[PaymentStatus],
+                payment_type: Optional[PaymentType], customer: Optional[str], created_from: Optional[datetime],
+                created_to: Optional[datetime]):
+    """Aplica filtros, keyset e ordenação; busca uma linha a mais para saber se há próxima página"""
+    if order_status is not None:
+        statement = statement.where(OrderView.status == order_status)
+    if payment_type is not None:
+        statement = statement.where(OrderView.payment_type == payment_type)
+    if customer:
+        # Prefixo sem diferenciar maiúsculas: usa o índice em lower(customer_name)
+        statement = statement.where(
+            func.lower(OrderView.customer_name).like(f"{_escape_like(customer.lower())}%", escape="\\")
+        )
+    if created_from is not None:
+        statement = statement.where(OrderView.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(OrderView.created_at < created_to)
+
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(OrderView.created_at, OrderView.order_id) < tuple_(created_at, order_id))
+    elif skip:
+        statement = statement.offset(skip)
+
+    return statement.order_by(OrderView.created_at.desc(), OrderView.order_id.desc()).limit(limit + 1)
+
+def _split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+_ORDER_VIEW_COLUMNS = (
+    OrderView.order_id, OrderView.customer_name, OrderView.total_price, OrderView.payment_type, OrderView.status,
+    OrderView.created_at, OrderView.items
+)
+
+def _order_view_row(row) -> dict:
+    return {
+        "order_id": row.order_id,
+        "customer_name": row.customer_name,
+        "total_price": float(row.total_price),
+        "payment_type": row.payment_type,
+        "status": row.status,
+        "created_at": row.created_at,
+        "items": row.items
+    }
+
+def list_order_rows(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                    order_status: Optional[PaymentStatus] = None, payment_type: Optional[PaymentType] = None,
+                    customer: Optional[str] = None, created_from: Optional[datetime] = None,
+                    created_to: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+    """Pedidos do mais recente para o mais antigo, paginados por keyset em (created_at, order_id).
+
+    Retorna dicts prontos para JSON e o cursor da próxima página (None na última). Lê só o
+    read model order_views: uma query por página, com os itens embutidos em cada linha e os
+    filtros cobertos pelos índices ix_order_views_*. skip sem cursor continua aceito por compatibilidade.
+    """
+    statement = _order_page(select(*_ORDER_VIEW_COLUMNS), skip, limit, cursor, order_status,
+                            payment_type, customer, created_from, created_to)
+    rows, next_cursor = _split_page(db.execute(statement).all(), limit)
+    return [_order_view_row(row) for row in rows], next_cursor
+
+def get_order_row(db: Session, order_id: str) -> Optional[dict]:
+    """Detalhe do pedido direto do read model (busca pela chave primária); None se não existe"""
+    row = db.execute(select(*_ORDER_VIEW_COLUMNS).where(OrderView.order_id == order_id)).first()
+    return _order_view_row(row) if row else None
 
 def update_order_status(db: Session, order_id: str, new_status: str) -> Order:
     try:
@@ -115,6 +381,14 @@ def update_order_status(db: Session, order_id: str, new_status: str) -> Order:
         logger.info(f"Atualizando Status de pagamento do pedido `{order_id}`: {order.status} -> {new_status}")
 
         order.status = new_status
+        # Read model na mesma transação; pedidos anteriores à order_views ganham a linha aqui
+        refreshed = db.execute(
+            update(OrderView)
+            .where(OrderView.order_id == order_id)
+            .values(status=new_status, updated_at=datetime.utcnow())
+        )
+        if refreshed.rowcount == 0:
+            db.add(build_order_view(order))
         db.commit()
         db.refresh(order)
 
@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
@@ -25,6 +26,13 @@ else:
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono (asyncpg) do caminho não bloqueante de criação de pedidos
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or SQLALCHEMY_DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+)
+_async_engine = None
+_AsyncSessionLocal = None
+
 Base = declarative_base()
 
 def get_db():
@@ -33,3 +41,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Cria o engine assíncrono no primeiro uso; sem o modo assíncrono o driver nem é carregado"""
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_size=int(os.getenv("DB_ASYNC_POOL_SIZE", 10)),
+            max_overflow=int(os.getenv("DB_ASYNC_MAX_OVERFLOW", 20))
+        )
+        # Sem expirar no commit: a resposta é montada sem novo SELECT (lazy load não existe em async)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, class_=AsyncSession, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+async def dispose_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _AsyncSessionLocal = None
@@ -7,6 +7,12 @@ CREATE TABLE IF NOT EXISTS orders (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- A listagem lê order_views (índices abaixo); os índices de listagem em orders só custavam escrita
+DROP INDEX IF EXISTS ix_orders_created_at_order_id;
+DROP INDEX IF EXISTS ix_orders_status_created_at;
+DROP INDEX IF EXISTS ix_orders_payment_type_created_at;
+DROP INDEX IF EXISTS ix_orders_customer_lower;
+
 CREATE TABLE IF NOT EXISTS order_items (
     order_item_id VARCHAR(36) PRIMARY KEY,
     order_id VARCHAR(36) REFERENCES orders(order_id) ON DELETE CASCADE,
@@ -14,4 +20,55 @@ CREATE TABLE IF NOT EXISTS order_items (
     item_name VARCHAR(100) NOT NULL,
     quantity INTEGER NOT NULL,
     unit_price NUMERIC(10, 2) NOT NULL
-);
\ No newline at end of file
+);
+
+-- Itens de um pedido (ON DELETE CASCADE e montagem da linha de order_views)
+CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id);
+
+-- Read model: o pedido com os itens embutidos, escrito na mesma transação que orders/order_items
+CREATE TABLE IF NOT EXISTS order_views (
+    order_id VARCHAR(36) PRIMARY KEY REFERENCES orders(order_id) ON DELETE CASCADE,
+    customer_name VARCHAR(100) NOT NULL,
+    total_price NUMERIC(10, 2) NOT NULL,
+    payment_type VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    items JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Listagem paginada por keyset em (created_at, order_id), com e sem filtros
+CREATE INDEX IF NOT EXISTS ix_order_views_created_at_order_id ON order_views (created_at DESC, order_id DESC);
+CREATE INDEX IF NOT EXISTS ix_order_views_status_created_at ON order_views (status, created_at DESC, order_id DESC);
+CREATE INDEX IF NOT EXISTS ix_order_views_payment_type_created_at ON order_views (payment_type, created_at DESC, order_id DESC);
+-- text_pattern_ops permite LIKE 'prefixo%' em qualquer collation
+CREATE INDEX IF NOT EXISTS ix_order_views_customer_lower ON order_views (lower(customer_name) text_pattern_ops, created_at DESC);
+
+-- Backfill dos pedidos que já existiam antes da tabela (idempotente)
+INSERT INTO order_views (order_id, customer_name, total_price, payment_type, status, items, created_at)
+SELECT o.order_id, o.customer_name, o.total_price, o.payment_type, o.status,
+       COALESCE(
+           (SELECT jsonb_agg(jsonb_build_object(
+                       'item_id', i.item_id, 'item_name', i.item_name,
+                       'unit_price', i.unit_price::float, 'quantity', i.quantity))
+            FROM order_items i WHERE i.order_id = o.order_id),
+           '[]'::jsonb
+       ),
+       o.created_at
+FROM orders o
+ON CONFLICT (order_id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    event_id VARCHAR(36) PRIMARY KEY,
+    topic VARCHAR(100) NOT NULL,
+    key VARCHAR(100),
+    payload JSON NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    sequence BIGINT GENERATED BY DEFAULT AS IDENTITY
+);
+
+-- Bancos criados antes da coluna: o relay publica na ordem de sequence (atribuída no INSERT)
+ALTER TABLE outbox_events ADD COLUMN IF NOT EXISTS sequence BIGINT GENERATED BY DEFAULT AS IDENTITY;
+DROP INDEX IF EXISTS ix_outbox_events_pending;
+CREATE INDEX IF NOT EXISTS ix_outbox_events_pending_sequence ON outbox_events (sequence) WHERE sent_at IS NULL;
\ No newline at end of file
@@ -1,21 +1,38 @@
+import asyncio
 import logging
+import os
 from sqlalchemy.orm import Session
 from shared.kafka.consumer import KafkaConsumerWrapper
-from database import get_db
+from shared.kafka.async_consumer import AsyncKafkaConsumerWrapper
+from shared.kafka.retry import DeadLetterRouter
+from shared.kafka.dedup import RedisDedupStore, event_id_of
+from shared.kafka.routing import EventRouter
+from database import get_db, SessionLocal
 from controllers import update_order_status
-from cache import set_cached_menu_item
+from cache import set_cached_menu_item, invalidate_cached_menu_item, publish_menu_invalidation, redis_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("order-consumer")
 
+# Reentregas de payment_processed são descartadas antes de tocar no banco
+dedup_store = RedisDedupStore(
+    redis_client, prefix='order-group', ttl_seconds=int(os.getenv('EVENT_DEDUP_TTL_SECONDS', 86400))
+)
+
 def process_payment_event(message: dict, db: Session):
     try:
         if message['event_type'] == 'payment':
+            event_id = event_id_of(message)
+            if dedup_store.seen(event_id):
+                logger.info(f"Evento {event_id} já processado, ignorando")
+                return
+
             order_id = message['payload']['order_id']
             new_status = message['payload']['status']
 
             # Atualiza status do pedido
             update_order_status(db, order_id, new_status)
+            dedup_store.mark(event_id)
             logger.info(f"Status do pedido {order_id} atualizado para {new_status}")
     except Exception as e:
         logger.error(f"Erro ao processar evento: {str(e)}")
@@ -26,20 +43,88 @@ def process_menu_updated_event(message: dict):
         if message['event_type'] == 'menu_updated':
             payload = message['payload']
             item_id = payload['item_id']
-            set_cached_menu_item(item_id, payload)
-            logger.info(f"Cache atualizado para item {item_id}")
+            if payload.get('deleted'):
+                invalidate_cached_menu_item(item_id)
+                logger.info(f"Item {item_id} removido do cache")
+            else:
+                set_cached_menu_item(item_id, payload)
+                logger.info(f"Cache atualizado para item {item_id}")
+            # Só esta réplica recebe o evento (grupo compartilhado): as demais descartam a cópia local
+            publish_menu_invalidation(item_id)
     except Exception as e:
         logger.error(f"Erro ao processar evento de menu_updated: {str(e)}")
 
+def process_event_batch(messages: list, db: Session):
+    """Processa um lote vindo de consume_batches, roteando pelo event_type"""
+    for message in messages:
+        if message.get('event_type') == 'menu_updated':
+            process_menu_updated_event(message)
+        else:
+            process_payment_event(message, db)
+
+def process_in_own_session(handler, message: dict):
+    """Workers paralelos não podem compartilhar a sessão do consumer"""
+    db = SessionLocal()
+    try:
+        handler(message, db)
+    finally:
+        db.close()
+
+# Consumer em uso pela thread de consumo, para o lifespan sinalizar o shutdown
+_consumer = None
+
+def stop_consumer():
+    """Pede ao consumer para terminar a mensagem atual, commitar e fechar"""
+    if _consumer is not None:
+        _consumer.stop()
+
 def start_consumer():
+    global _consumer
     db = next(get_db())
     try:
-        consumer = KafkaConsumerWrapper(group_id='order-group')
+        consumer = KafkaConsumerWrapper(group_id='order-group', dead_letter=DeadLetterRouter.from_env())
+        _consumer = consumer
+        workers = int(os.getenv('KAFKA_CONSUMER_WORKERS', 1))
 
-        consumer.subscribe_and_consume_multiple({
-            'payment_processed': lambda msg: process_payment_event(msg, db),
-            'menu_updated': lambda msg: process_menu_updated_event(msg)
-        })
+        if workers > 1:
+            consumer.consume_parallel({
+                'payment_processed': EventRouter({
+                    'payment': lambda msg: process_in_own_session(process_payment_event, msg)
+                }),
+                'menu_updated': EventRouter({'menu_updated': process_menu_updated_event})
+            }, num_workers=workers)
+        elif os.getenv('KAFKA_CONSUMER_BATCH_MODE', 'false').lower() == 'true':
+            consumer.consume_batches(
+                topics=['payment_processed', 'menu_updated'],
+                batch_callback=lambda msgs: process_event_batch(msgs, db),
+                max_messages=int(os.getenv('KAFKA_CONSUMER_BATCH_SIZE', 500)),
+                max_wait_ms=int(os.getenv('KAFKA_CONSUMER_BATCH_WAIT_MS', 100)),
+                event_types={'payment', 'menu_updated'}
+            )
+        else:
+            consumer.subscribe_and_consume_multiple({
+                'payment_processed': EventRouter({'payment': lambda msg: process_payment_event(msg, db)}),
+                'menu_updated': EventRouter({'menu_updated': process_menu_updated_event})
+            })
 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def handle_payment_event(message: dict):
+    # O acesso ao banco é síncrono: roda em thread para não bloquear o event loop
+    await asyncio.to_thread(process_in_own_session, process_payment_event, message)
+
+async def handle_menu_updated_event(message: dict):
+    await asyncio.to_thread(process_menu_updated_event, message)
+
+async def start_async_consumer():
+    """Consumer no event loop da aplicação; encerrado cancelando a task no lifespan"""
+    consumer = AsyncKafkaConsumerWrapper(
+        group_id='order-group',
+        max_concurrency=int(os.getenv('KAFKA_CONSUMER_CONCURRENCY', 10)),
+        dead_letter=DeadLetterRouter.from_env()
+    )
+    await consumer.consume({
+        'payment_processed': EventRouter({'payment': handle_payment_event}),
+        'menu_updated': EventRouter({'menu_updated': handle_menu_updated_event})
+    })
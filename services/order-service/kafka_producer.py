@@ -1,22 +1,28 @@
 import logging
 from datetime import datetime
-from shared.kafka.producer import get_kafka_producer
+from sqlalchemy.orm import Session
+from shared.kafka.outbox import add_outbox_event
+from models import OutboxEvent
 
 logger = logging.getLogger(__name__)
 
-def publish_order_created_event(order_data: dict):
-    producer = get_kafka_producer()
-    try:
-        event = {
-            "event_type": "orders",
-            "payload": order_data,
-            "metadata": {
-                "service": "order-service",
-                "timestamp": datetime.utcnow().isoformat()
-            }
+def build_order_created_event(order_data: dict) -> dict:
+    return {
+        "event_type": "orders",
+        "payload": order_data,
+        "metadata": {
+            "service": "order-service",
+            "timestamp": datetime.utcnow().isoformat()
         }
-        producer.publish_message("order_created", event)
+    }
+
+def enqueue_order_created_event(db: Session, order_data: dict):
+    """Grava o evento na outbox dentro da transação do pedido; o OutboxRelay publica no Kafka"""
+    try:
+        add_outbox_event(
+            db, OutboxEvent, "order_created", build_order_created_event(order_data),
+            key=str(order_data["order_id"])
+        )
     except Exception as e:
-        logger.error(f"Falha ao publicar evento: {str(e)}")
+        logger.error(f"Falha ao registrar evento na outbox: {str(e)}")
         raise
-
@@ -1,14 +1,24 @@
+import asyncio
 import logging
+import os
 import threading
-from fastapi import FastAPI, Request, status, HTTPException
+from fastapi import FastAPI, Request, Response, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 from routes import router as order_router
-from proxy_routes import router as proxy_router
-from kafka_consumer import start_consumer
+from proxy_routes import router as proxy_router, start_proxy_clients, close_proxy_clients
+from kafka_consumer import start_consumer, start_async_consumer, stop_consumer
+from menu_replica import MENU_REPLICA_ENABLED, start_menu_replica, stop_menu_replica
+from database import SessionLocal, dispose_async_engine
+from menu_client import menu_client
+from cache import async_redis_client, start_local_cache_invalidation, stop_local_cache_invalidation
+from models import OutboxEvent
+from shared.kafka.producer import get_kafka_producer, is_kafka_producer_ready, shutdown_kafka_producer
+from shared.kafka.outbox import OutboxRelay
+from shared.kafka.metrics import latest_metrics
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -19,14 +29,36 @@ logger.addHandler(handler)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     consumer_thread = None
+    consumer_task = None
+    replica_thread = None
+    invalidation_thread = None
+    outbox_relay = OutboxRelay(SessionLocal, OutboxEvent)
     try:
-        consumer_thread = threading.Thread(
-            target=start_consumer,
-            daemon=True,
-            name="order-consumer-thread"
-        )
-        consumer_thread.start()
+        # Cria o producer sem bloquear; a conexão é confirmada em background
+        get_kafka_producer()
+        # Invalidações do cache em memória vindas das outras réplicas
+        invalidation_thread = start_local_cache_invalidation()
+        # Pools de conexão do gateway, compartilhados por todas as requisições
+        start_proxy_clients()
+        outbox_relay.start()
+        if os.getenv('KAFKA_CONSUMER_ASYNC', 'false').lower() == 'true':
+            consumer_task = asyncio.create_task(start_async_consumer(), name="order-consumer-task")
+        else:
+            consumer_thread = threading.Thread(
+                target=start_consumer,
+                daemon=True,
+                name="order-consumer-thread"
+            )
+            consumer_thread.start()
         logger.info("✅ Order Consumer iniciado")
+        if MENU_REPLICA_ENABLED:
+            replica_thread = threading.Thread(
+                target=start_menu_replica,
+                daemon=True,
+                name="order-menu-replica-thread"
+            )
+            replica_thread.start()
+            logger.info("✅ Réplica do cardápio iniciada")
     except Exception as e:
         logger.error(f"❌ Falha ao iniciar consumer: {str(e)}", exc_info=True)
     finally:
@@ -35,7 +67,25 @@ async def lifespan(app: FastAPI):
         finally:
             logger.info("🛑 Order Consumer finalizado")
             if consumer_thread:
-                consumer_thread.join(timeout=1.0)
+                # Termina a mensagem em andamento e commita antes de sair
+                stop_consumer()
+                consumer_thread.join(timeout=float(os.getenv('KAFKA_CONSUMER_SHUTDOWN_TIMEOUT', 10)))
+            if consumer_task:
+                # O cancelamento aguarda os handlers em andamento e faz o commit final
+                consumer_task.cancel()
+                await asyncio.wait({consumer_task}, timeout=15)
+            if replica_thread:
+                stop_menu_replica()
+                replica_thread.join(timeout=float(os.getenv('KAFKA_CONSUMER_SHUTDOWN_TIMEOUT', 10)))
+            if invalidation_thread:
+                stop_local_cache_invalidation()
+                invalidation_thread.join(timeout=2)
+            outbox_relay.stop()
+            shutdown_kafka_producer()
+            await menu_client.aclose()
+            await close_proxy_clients()
+            await dispose_async_engine()
+            await async_redis_client.aclose()
 
 app = FastAPI(
     title="Order Service API",
@@ -51,7 +101,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count"]
+    expose_headers=["X-Total-Count", "X-Next-Cursor"]
 )
 
 app.include_router(
@@ -66,6 +116,25 @@ app.include_router(
     tags=["Payments Proxy"]
 )
 
+@app.get("/health", tags=["Health"])
+def health():
+    """Liveness: o processo está de pé, mesmo sem Kafka"""
+    return {"status": "ok", "kafka_producer_ready": is_kafka_producer_ready()}
+
+@app.get("/health/ready", tags=["Health"])
+def readiness(response: Response):
+    """Readiness: 503 enquanto o producer não confirmar a conexão com o Kafka"""
+    ready = is_kafka_producer_ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "starting", "kafka_producer_ready": ready}
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Métricas Prometheus (consumer lag, throughput, latências do producer e do consumer)"""
+    body, content_type = latest_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     logger.warning(f"HTTPException handler triggered: {exc.detail}")
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+MENU_SERVICE_URL = os.getenv('MENU_SERVICE_URL', "http://menu-service:5003/api/v1/menu")
+MENU_SERVICE_CONNECT_TIMEOUT_SECONDS = float(os.getenv('MENU_SERVICE_CONNECT_TIMEOUT_SECONDS', 1))
+MENU_SERVICE_READ_TIMEOUT_SECONDS = float(os.getenv('MENU_SERVICE_READ_TIMEOUT_SECONDS', 3))
+MENU_SERVICE_POOL_SIZE = int(os.getenv('MENU_SERVICE_POOL_SIZE', 20))
+MENU_SERVICE_RETRIES = int(os.getenv('MENU_SERVICE_RETRIES', 2))
+MENU_SERVICE_RETRY_BACKOFF_SECONDS = float(os.getenv('MENU_SERVICE_RETRY_BACKOFF_SECONDS', 0.1))
+MENU_BREAKER_FAILURE_THRESHOLD = int(os.getenv('MENU_BREAKER_FAILURE_THRESHOLD', 5))
+MENU_BREAKER_RESET_SECONDS = float(os.getenv('MENU_BREAKER_RESET_SECONDS', 30))
+
+MENU_CLIENT_REQUESTS = Counter(
+    'menu_client_requests', 'Chamadas ao menu-service por resultado', ['result']
+)
+MENU_CLIENT_SECONDS = Histogram(
+    'menu_client_request_seconds', 'Latência de cada tentativa de chamada ao menu-service'
+)
+MENU_CLIENT_IN_FLIGHT = Gauge(
+    'menu_client_in_flight', 'Chamadas ao menu-service em andamento (conexões do pool em uso)'
+)
+MENU_CLIENT_POOL_SIZE = Gauge(
+    'menu_client_pool_size', 'Conexões keep-alive configuradas por pool'
+)
+MENU_BREAKER_STATE = Gauge(
+    'menu_breaker_state', 'Estado do circuit breaker do menu-service (0=fechado, 1=meio-aberto, 2=aberto)'
+)
+MENU_BREAKER_TRANSITIONS = Counter(
+    'menu_breaker_transitions', 'Mudanças de estado do circuit breaker do menu-service', ['state']
+)
+
+class MenuServiceUnavailable(Exception):
+    """menu-service fora do ar, lento demais ou com o circuito aberto"""
+
+class CircuitBreaker:
+    """Abre após falhas consecutivas; depois de reset_seconds deixa passar uma chamada de teste"""
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        MENU_BREAKER_STATE.set(0)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _transition(self, state: str):
+        if state != self._state:
+            logger.warning(f"Circuit breaker do menu-service: {self._state} -> {state}")
+            self._state = state
+            MENU_BREAKER_STATE.set(self._STATE_VALUES[state])
+            MENU_BREAKER_TRANSITIONS.labels(state).inc()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            # Aberto há reset_seconds, ou meio-aberto sem resultado da chamada de teste nesse tempo
+            # (chamador perdido): libera uma nova chamada de teste
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._opened_at = time.monotonic()
+                self._transition(self.HALF_OPEN)
+                return True
+            # Meio-aberto: só a chamada de teste já liberada passa
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+class MenuClient:
+    """Cliente HTTP do menu-service com pool keep-alive, timeouts, retries com jitter e circuit breaker.
+
+    Respostas 5xx e erros de rede são repetidos; 4xx voltam para o chamador. Esgotadas as
+    tentativas, ou com o circuito aberto, levanta MenuServiceUnavailable sem esperar timeout.
+    """
+
+    def __init__(self, base_url: str = MENU_SERVICE_URL, breaker: Optional[CircuitBreaker] = None,
+                 retries: int = MENU_SERVICE_RETRIES, backoff_seconds: float = MENU_SERVICE_RETRY_BACKOFF_SECONDS,
+                 pool_size: int = MENU_SERVICE_POOL_SIZE):
+        self.base_url = base_url
+        self.breaker = breaker or CircuitBreaker(MENU_BREAKER_FAILURE_THRESHOLD, MENU_BREAKER_RESET_SECONDS)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.pool_size = pool_size
+        self.timeout = (MENU_SERVICE_CONNECT_TIMEOUT_SECONDS, MENU_SERVICE_READ_TIMEOUT_SECONDS)
+        self._session = requests.Session()
+        self._session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._async_client: Optional[httpx.AsyncClient] = None
+        MENU_CLIENT_POOL_SIZE.set(pool_size)
+
+    def _async(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._async_client
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: réplicas não repetem em sincronia contra um menu-service já sobrecarregado
+        return random.uniform(0, self.backoff_seconds * (2 ** attempt))
+
+    def _short_circuit(self, path: str):
+        if not self.breaker.allow():
+            MENU_CLIENT_REQUESTS.labels('short_circuit').inc()
+            raise MenuServiceUnavailable(f"Circuito aberto para o menu-service ({path})")
+
+    def _finish(self, path: str, response, error: Optional[Exception]):
+        if response is not None and response.status_code < 500:
+            self.breaker.record_success()
+            MENU_CLIENT_REQUESTS.labels('success').inc()
+            return response
+        self.breaker.record_failure()
+        MENU_CLIENT_REQUESTS.labels('error').inc()
+        reason = str(error) if error is not None else f"status {response.status_code}"
+        raise MenuServiceUnavailable(f"menu-service indisponível em {path}: {reason}")
+
+    def _abort(self):
+        # Exceção inesperada ou cancelamento: o resultado ainda precisa chegar ao breaker,
+        # senão uma chamada de teste perdida deixaria o circuito meio-aberto
+        self.breaker.record_failure()
+        MENU_CLIENT_REQUESTS.labels('error').inc()
+
+    def get(self, path: str = "", params: Optional[dict] = None) -> requests.Response:
+        self._short_circuit(path)
+        response, error = None, None
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    MENU_CLIENT_REQUESTS.labels('retry').inc()
+                    time.sleep(self._backoff(attempt - 1))
+                try:
+                    with MENU_CLIENT_IN_FLIGHT.track_inprogress(), MENU_CLIENT_SECONDS.time():
+                        response = self._session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+                    error = None
+                    if response.status_code < 500:
+                        break
+                except requests.RequestException as e:
+                    response, error = None, e
+        except BaseException:
+            self._abort()
+            raise
+        return self._finish(path, response, error)
+
+    async def aget(self, path: str = "", params: Optional[dict] = None) -> httpx.Response:
+        self._short_circuit(path)
+        response, error = None, None
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    MENU_CLIENT_REQUESTS.labels('retry').inc()
+                    await asyncio.sleep(self._backoff(attempt - 1))
+                try:
+                    with MENU_CLIENT_IN_FLIGHT.track_inprogress(), MENU_CLIENT_SECONDS.time():
+                        response = await self._async().get(f"{self.base_url}{path}", params=params)
+                    error = None
+                    if response.status_code < 500:
+                        break
+                except httpx.HTTPError as e:
+                    response, error = None, e
+        except BaseException:
+            self._abort()
+            raise
+        return self._finish(path, response, error)
+
+    async def aclose(self):
+        self._session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+        self._async_client = None
+
+menu_client = MenuClient()
@@ -0,0 +1,142 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from shared.kafka.consumer import KafkaConsumerWrapper
+from shared.kafka.routing import EventRouter
+from cache import local_menu_cache
+from menu_client import MenuServiceUnavailable, menu_client
+
+logger = logging.getLogger("order-menu-replica")
+
+MENU_REPLICA_ENABLED = os.getenv('MENU_REPLICA_ENABLED', 'false').lower() == 'true'
+MENU_REPLICA_LOAD_RETRY_SECONDS = float(os.getenv('MENU_REPLICA_LOAD_RETRY_SECONDS', 5))
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+class MenuReplica:
+    """Cópia completa do cardápio em memória, carregada do menu-service e mantida pelo menu_updated.
+
+    Cada item guarda o updated_at de origem: eventos reentregues ou mais antigos que o
+    snapshot não sobrescrevem dados novos, e remoções ficam como tombstone pelo mesmo motivo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: Dict[str, dict] = {}
+        self._versions: Dict[str, Optional[datetime]] = {}
+        self._deleted: Dict[str, Optional[datetime]] = {}
+        self._warm = False
+
+    @property
+    def warm(self) -> bool:
+        return self._warm
+
+    def __len__(self):
+        return len(self._items)
+
+    def _is_stale(self, item_id: str, updated_at: Optional[datetime]) -> bool:
+        if updated_at is None:
+            return False
+        current = self._versions.get(item_id) or self._deleted.get(item_id)
+        return current is not None and updated_at < current
+
+    def load(self, items: List[dict]):
+        """Aplica o snapshot; itens já atualizados por eventos mais novos são mantidos"""
+        with self._lock:
+            for item in items:
+                item_id = str(item['item_id'])
+                updated_at = _parse_timestamp(item.get('updated_at'))
+                if not self._is_stale(item_id, updated_at):
+                    self._items[item_id] = item
+                    self._versions[item_id] = updated_at
+                    self._deleted.pop(item_id, None)
+            self._warm = True
+        logger.info(f"Réplica do cardápio carregada com {len(self._items)} item(ns)")
+
+    def apply(self, payload: dict) -> bool:
+        """Aplica um menu_updated; retorna False quando o evento é mais antigo que o estado atual"""
+        item_id = str(payload['item_id'])
+        updated_at = _parse_timestamp(payload.get('updated_at'))
+        with self._lock:
+            if self._is_stale(item_id, updated_at):
+                return False
+            if payload.get('deleted'):
+                self._items.pop(item_id, None)
+                self._versions.pop(item_id, None)
+                self._deleted[item_id] = updated_at
+            else:
+                self._items[item_id] = {key: value for key, value in payload.items() if key != 'deleted'}
+                self._versions[item_id] = updated_at
+                self._deleted.pop(item_id, None)
+        return True
+
+    def get_many(self, item_ids: List[str]) -> Optional[Dict[str, dict]]:
+        """Itens conhecidos pela réplica; None enquanto o snapshot inicial não foi carregado"""
+        if not self._warm:
+            return None
+        with self._lock:
+            return {item_id: self._items[item_id] for item_id in item_ids if item_id in self._items}
+
+    def is_deleted(self, item_id: str) -> bool:
+        return item_id in self._deleted
+
+menu_replica = MenuReplica()
+
+def load_snapshot(replica: MenuReplica = menu_replica, stop_event: Optional[threading.Event] = None) -> bool:
+    """Carrega o cardápio completo, tentando de novo até o menu-service responder"""
+    while not (stop_event and stop_event.is_set()):
+        try:
+            response = menu_client.get()
+            if response.status_code == 200:
+                replica.load(response.json())
+                return True
+            logger.warning(f"menu-service respondeu {response.status_code} ao carregar a réplica")
+        except MenuServiceUnavailable as e:
+            logger.warning(f"Falha ao carregar a réplica do cardápio: {str(e)}")
+        if stop_event:
+            stop_event.wait(MENU_REPLICA_LOAD_RETRY_SECONDS)
+        else:
+            time.sleep(MENU_REPLICA_LOAD_RETRY_SECONDS)
+    return False
+
+def process_replica_event(message: dict, replica: MenuReplica = menu_replica):
+    try:
+        payload = message['payload']
+        if replica.apply(payload):
+            # O cache em memória desta instância também não pode servir a versão anterior
+            local_menu_cache.delete(str(payload['item_id']))
+    except Exception as e:
+        logger.error(f"Erro ao aplicar menu_updated na réplica: {str(e)}")
+
+_consumer = None
+_stop_event = threading.Event()
+
+def replica_group_id() -> str:
+    """Grupo exclusivo por instância: toda réplica precisa receber todos os eventos do cardápio"""
+    return os.getenv('MENU_REPLICA_GROUP_ID') or f"order-menu-replica-{socket.gethostname()}"
+
+def start_menu_replica():
+    """Consome menu_updated desde o início do tópico e carrega o snapshot em paralelo"""
+    global _consumer
+    _stop_event.clear()
+    _consumer = KafkaConsumerWrapper(group_id=replica_group_id())
+    threading.Thread(target=load_snapshot, kwargs={'stop_event': _stop_event},
+                     daemon=True, name="order-menu-replica-loader").start()
+    _consumer.subscribe_and_consume_multiple({
+        'menu_updated': EventRouter({'menu_updated': process_replica_event})
+    })
+
+def stop_menu_replica():
+    _stop_event.set()
+    if _consumer is not None:
+        _consumer.stop()
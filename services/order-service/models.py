@@ -1,9 +1,11 @@
 import uuid
-from sqlalchemy import Column, Integer, String, Numeric, Enum, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, Enum, DateTime, ForeignKey, Index, JSON, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 from shared.enums import PaymentType, PaymentStatus
+from shared.kafka.outbox import OutboxMixin
 
 class Order(Base):
     __tablename__ = 'orders'
@@ -29,3 +31,35 @@ class OrderItem(Base):
     unit_price = Column(Numeric(10, 2), nullable=False)
 
     order = relationship("Order", back_populates="items")
+
+
+class OrderView(Base):
+    """Read model do pedido: uma linha com os itens embutidos, no formato da resposta da API.
+
+    Escrito na mesma transação que orders/order_items (fonte da verdade); listagem e
+    detalhe leem só daqui, sem join nem montagem do aninhamento em Python.
+    """
+    __tablename__ = 'order_views'
+
+    order_id = Column(String, ForeignKey('orders.order_id', ondelete="CASCADE"), primary_key=True, nullable=False)
+    customer_name = Column(String(100), nullable=False)
+    total_price = Column(Numeric(10, 2), nullable=False)
+    payment_type = Column(Enum(PaymentType, name='payment_type_enum'), nullable=False)
+    status = Column(Enum(PaymentStatus, name='payment_status_enum'), nullable=False)
+    items = Column(JSON().with_variant(JSONB(), 'postgresql'), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Índices da listagem paginada por keyset (mantidos em sincronia com o init.sql)
+    __table_args__ = (
+        Index('ix_order_views_created_at_order_id', created_at.desc(), order_id.desc()),
+        Index('ix_order_views_status_created_at', status, created_at.desc(), order_id.desc()),
+        Index('ix_order_views_payment_type_created_at', payment_type, created_at.desc(), order_id.desc()),
+        # text_pattern_ops: o filtro lower(customer_name) LIKE 'prefixo%' usa o índice mesmo com collation não-C
+        Index('ix_order_views_customer_lower', func.lower(customer_name).label('customer_lower'), created_at.desc(),
+              postgresql_ops={'customer_lower': 'text_pattern_ops'}),
+    )
+
+
+class OutboxEvent(OutboxMixin, Base):
+    __tablename__ = 'outbox_events'
@@ -1,42 +1,98 @@
+import logging
+import os
+from typing import Dict
 from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+UPSTREAMS = {
+    "payment-service": os.getenv("PAYMENT_SERVICE_URL", "http://payment-service:5002"),
+}
+PROXY_CONNECT_TIMEOUT_SECONDS = float(os.getenv("PROXY_CONNECT_TIMEOUT_SECONDS", 2))
+PROXY_READ_TIMEOUT_SECONDS = float(os.getenv("PROXY_READ_TIMEOUT_SECONDS", 30))
+PROXY_POOL_TIMEOUT_SECONDS = float(os.getenv("PROXY_POOL_TIMEOUT_SECONDS", 5))
+PROXY_MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", 50))
+PROXY_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROXY_MAX_KEEPALIVE_CONNECTIONS", 20))
+
+# Hop-by-hop (RFC 7230): valem só para a conexão atual e não são repassados
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade"
+}
+
+# Um cliente (pool de conexões) por upstream, criado no lifespan e reutilizado por todas as requisições
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+def _new_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(PROXY_READ_TIMEOUT_SECONDS, connect=PROXY_CONNECT_TIMEOUT_SECONDS,
+                              pool=PROXY_POOL_TIMEOUT_SECONDS),
+        limits=httpx.Limits(max_connections=PROXY_MAX_CONNECTIONS,
+                            max_keepalive_connections=PROXY_MAX_KEEPALIVE_CONNECTIONS)
+    )
+
+def start_proxy_clients():
+    for upstream, base_url in UPSTREAMS.items():
+        if upstream not in _clients:
+            _clients[upstream] = _new_client(base_url)
+
+async def close_proxy_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
 
-async def proxy_request(request: Request, upstream_url: str):
+def get_upstream_client(upstream: str) -> httpx.AsyncClient:
+    """Pool do upstream; criado sob demanda se o lifespan ainda não rodou"""
+    if upstream not in _clients:
+        _clients[upstream] = _new_client(UPSTREAMS[upstream])
+    return _clients[upstream]
+
+def _forward_headers(headers, extra_skip=()) -> Dict[str, str]:
+    skip = HOP_BY_HOP_HEADERS.union(extra_skip)
+    return {key: value for key, value in headers.items() if key.lower() not in skip}
+
+def _has_body(request: Request) -> bool:
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+async def proxy_request(request: Request, upstream: str, path: str):
+    """Repassa a requisição em streaming nos dois sentidos: o corpo nunca é bufferizado inteiro"""
+    client = get_upstream_client(upstream)
+    upstream_request = client.build_request(
+        method=request.method,
+        url=path,
+        params=request.query_params,
+        headers=_forward_headers(request.headers, extra_skip=("host",)),
+        content=request.stream() if _has_body(request) else None
+    )
     try:
-        async with httpx.AsyncClient() as client:
-            body = await request.body()
-            proxy_response = await client.request(
-                method=request.method,
-                url=upstream_url,
-                headers={
-                    key: value for key, value in request.headers.items()
-                    if key.lower() not in ["host", "content-length", "transfer-encoding", "connection"]
-                },
-                content=body
-            )
-            return Response(
-                content=proxy_response.content,
-                status_code=proxy_response.status_code,
-                headers={
-                    key: value for key, value in proxy_response.headers.items()
-                    if key.lower() not in ["content-encoding", "transfer-encoding", "connection"]
-                },
-            )
+        upstream_response = await client.send(upstream_request, stream=True)
+    except httpx.TimeoutException as e:
+        logger.warning(f"Timeout no upstream {upstream}{path}: {str(e)}")
+        return Response(content=f"Timeout ao redirecionar requisição: {str(e)}", status_code=504)
     except Exception as e:
         return Response(content=f"Erro ao redirecionar requisição: {str(e)}", status_code=500)
 
+    # Bytes crus: content-encoding e content-length do upstream continuam válidos
+    return StreamingResponse(
+        upstream_response.aiter_raw(),
+        status_code=upstream_response.status_code,
+        headers=_forward_headers(upstream_response.headers),
+        background=BackgroundTask(upstream_response.aclose)
+    )
+
 
 @router.api_route("/payments", methods=["GET"])
 async def list_payments_proxy(request: Request):
-    upstream_url = f"http://payment-service:5002/api/v1/payments"
-    return await proxy_request(request, upstream_url)
+    return await proxy_request(request, "payment-service", "/api/v1/payments")
 
 
 @router.api_route("/payments/confirm/{order_id}", methods=["PUT"])
 async def confirm_payment_proxy(order_id: str, request: Request):
-    upstream_url = f"http://payment-service:5002/api/v1/payments/confirm/{order_id}"
-    return await proxy_request(request, upstream_url)
-
+    return await proxy_request(request, "payment-service", f"/api/v1/payments/confirm/{order_id}")
@@ -1,51 +1,94 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Optional, Union
+from database import get_db, get_async_sessionmaker
 from schemas import OrderCreate, OrderResponse
-from controllers import create_order, get_orders
+from controllers import (
+    InvalidCursor, create_order, create_order_async, create_orders_batch, get_order_row, list_order_rows
+)
+from shared.enums import PaymentStatus, PaymentType
+from shared.responses import FastJSONResponse
 from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/orders", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def add_order(request: Request, db: Session = Depends(get_db)):
+# Caminho assíncrono (asyncpg, redis.asyncio, httpx); no modo síncrono o trabalho vai para o threadpool
+ORDER_ASYNC_PATH = os.getenv('ORDER_ASYNC_PATH', 'false').lower() == 'true'
 
-    try:
-        data = await request.json()
+MAX_PAGE_SIZE = 500
+ORDER_BATCH_MAX_SIZE = int(os.getenv('ORDER_BATCH_MAX_SIZE', 500))
 
-        required_fields = ['customer_name', 'items', 'payment_type']
-        missing_fields = [f for f in required_fields if f not in data]
-        if missing_fields:
+def _check_order_payload(data):
+    """Validações do corpo de um pedido anteriores ao OrderCreate (mensagens 400 da API)"""
+    if not isinstance(data, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O pedido deve ser um objeto com 'customer_name', 'items' e 'payment_type'."
+        )
+
+    required_fields = ['customer_name', 'items', 'payment_type']
+    missing_fields = [f for f in required_fields if f not in data]
+    if missing_fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos obrigatórios ausentes: {missing_fields}."
+        )
+
+    if not isinstance(data['items'], list) or not data['items']:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O campo 'items' deve ser uma lista não vazia."
+        )
+
+    for item in data['items']:
+        if not isinstance(item, dict):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Campos obrigatórios ausentes: {missing_fields}."
+                detail="Cada item na lista deve ser um objeto com 'item_id' e 'quantity'."
             )
-
-        if not isinstance(data['items'], list) or not data['items']:
+        if 'item_id' not in item or 'quantity' not in item:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="O campo 'items' deve ser uma lista não vazia."
+                detail="Cada item na lista deve ser um objeto com 'item_id' e 'quantity'."
             )
 
-        for item in data['items']:
-            if not isinstance(item, dict):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Cada item na lista deve ser um objeto com 'item_id' e 'quantity'."
-                )
-            if 'item_id' not in item or 'quantity' not in item:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Cada item na lista deve ser um objeto com 'item_id' e 'quantity'."
-                )
+def _validation_detail(ve: ValidationError) -> str:
+    return ve.errors()[0].get('msg')
+
+async def get_order_db():
+    """Sessão do POST /orders: só a do modo ativo é aberta (AsyncSession ou Session síncrona)"""
+    if ORDER_ASYNC_PATH:
+        async with get_async_sessionmaker()() as async_db:
+            yield async_db
+        return
+    sessions = get_db()
+    try:
+        yield next(sessions)
+    finally:
+        # Fechar a sessão devolve a conexão ao pool (pode fazer rollback): fora do event loop
+        await run_in_threadpool(sessions.close)
+
+@router.post("/orders", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def add_order(request: Request, db: Union[Session, AsyncSession] = Depends(get_order_db)):
+
+    try:
+        data = await request.json()
+
+        _check_order_payload(data)
 
         order = OrderCreate(**data)
 
-        return create_order(db, order)
+        if ORDER_ASYNC_PATH:
+            return await create_order_async(db, order)
+        # create_order bloqueia (SQLAlchemy, redis, requests): fora do event loop
+        return await run_in_threadpool(create_order, db, order)
 
     except HTTPException:
         raise
@@ -60,7 +103,7 @@ async def add_order(request: Request, db: Session = Depends(get_db)):
                 )
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=ve.errors()[0].get('msg')
+            detail=_validation_detail(ve)
         )
 
     except Exception as e:
@@ -70,12 +113,101 @@ async def add_order(request: Request, db: Session = Depends(get_db)):
             detail="Ocorreu um erro interno ao processar o pedido"
         )
 
+@router.post("/orders/batch")
+async def add_orders_batch(request: Request, db: Session = Depends(get_db)):
+    """Cria até ORDER_BATCH_MAX_SIZE pedidos em uma transação; cada pedido tem o próprio resultado.
+
+    Pedidos inválidos são recusados sem afetar os demais. A resposta traz, na ordem da
+    entrada, o pedido criado ou o status/erro que o POST /orders teria retornado.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Corpo JSON inválido.")
+
+    raw_orders = data.get('orders') if isinstance(data, dict) else None
+    if not isinstance(raw_orders, list) or not raw_orders:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O campo 'orders' deve ser uma lista não vazia."
+        )
+    if len(raw_orders) > ORDER_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {ORDER_BATCH_MAX_SIZE} pedidos por lote."
+        )
+
+    results: List[Optional[dict]] = []
+    valid: List[OrderCreate] = []
+    for raw in raw_orders:
+        try:
+            _check_order_payload(raw)
+            valid.append(OrderCreate(**raw))
+            results.append(None)
+        except HTTPException as e:
+            results.append({"status": "error", "status_code": e.status_code, "detail": e.detail})
+        except ValidationError as ve:
+            results.append({"status": "error", "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            "detail": _validation_detail(ve)})
+
+    try:
+        created = await run_in_threadpool(create_orders_batch, db, valid) if valid else []
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado no lote de pedidos: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Ocorreu um erro interno ao processar o lote de pedidos"
+        )
+
+    created_iter = iter(created)
+    results = [
+        {"index": index, **(result if result is not None else next(created_iter))}
+        for index, result in enumerate(results)
+    ]
+    return FastJSONResponse(content={
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "failed": sum(1 for result in results if result["status"] == "error"),
+        "results": results
+    })
+
+# O response_model documenta o formato; a resposta é montada direto em bytes (sem validação do Pydantic)
 @router.get("/orders", response_model=List[OrderResponse])
-def list_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_orders(
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, description="Paginação por offset (legado); ignorado com cursor"),
+    order_status: Optional[PaymentStatus] = Query(None, alias="status"),
+    payment_type: Optional[PaymentType] = None,
+    customer: Optional[str] = Query(None, description="Prefixo do nome do cliente"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
     try:
-        return get_orders(db, skip, limit)
+        orders, next_cursor = list_order_rows(
+            db, skip=skip, limit=limit, cursor=cursor, order_status=order_status, payment_type=payment_type,
+            customer=customer, created_from=created_from, created_to=created_to
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao buscar pedidos: {str(e)}"
-        )
\ No newline at end of file
+        )
+    return FastJSONResponse(content=orders, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@router.get("/orders/{order_id}", response_model=OrderResponse)
+def get_order(order_id: str, db: Session = Depends(get_db)):
+    try:
+        order = get_order_row(db, order_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar pedido: {str(e)}"
+        )
+    if order is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Pedido {order_id} não encontrado")
+    return FastJSONResponse(content=order)
@@ -1,9 +1,12 @@
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from database import Base, get_db
 from main import app as fastapi_app
+from routes import get_order_db
+from cache import local_menu_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_order.db"
 engine = create_engine(
@@ -19,11 +22,13 @@ def override_get_db():
         db.close()
 
 fastapi_app.dependency_overrides[get_db] = override_get_db
+fastapi_app.dependency_overrides[get_order_db] = override_get_db
 
 @pytest.fixture(scope="module")
 def client():
     Base.metadata.create_all(bind=engine)
-    with TestClient(fastapi_app) as c:
+    # Sem a assinatura do pub/sub: ela esvaziaria o cache em memória no meio dos testes
+    with patch("main.start_local_cache_invalidation"), TestClient(fastapi_app) as c:
         yield c
     Base.metadata.drop_all(bind=engine)
 
@@ -35,3 +40,10 @@ def db_session():
     finally:
         db.rollback()
         db.close()
+
+@pytest.fixture(autouse=True)
+def clear_local_menu_cache():
+    # A camada em memória é global ao processo; sem isso um teste vê o cache do anterior
+    local_menu_cache.clear()
+    yield
+    local_menu_cache.clear()
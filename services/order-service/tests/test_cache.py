@@ -1,6 +1,14 @@
+import threading
 import pytest
-from unittest.mock import patch, MagicMock
-from cache import set_cached_menu_item, get_cached_menu_item
+import redis
+from unittest.mock import patch, MagicMock, AsyncMock
+from prometheus_client import REGISTRY
+from cache import (
+    LocalCache, local_menu_cache, set_cached_menu_item, get_cached_menu_item, get_cached_menu_items,
+    set_cached_menu_items, get_cached_menu_items_async, set_cached_menu_items_async, get_stale_menu_items,
+    listen_menu_invalidations, LOCAL_CACHE_INVALIDATION_CHANNEL
+)
+from kafka_consumer import process_menu_updated_event
 
 @patch("cache.redis_client")
 def test_set_cached_menu_item(mock_redis):
@@ -39,4 +47,173 @@ def test_get_cached_menu_item_miss(mock_redis):
 
     # Verificações
     mock_redis.get.assert_called_once_with("menu:item:item123")
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+@patch("cache.redis_client")
+def test_get_cached_menu_items_uses_single_mget(mock_redis):
+    mock_redis.mget.return_value = ['{"name": "Pizza"}', None]
+
+    result = get_cached_menu_items(["a", "b"])
+
+    mock_redis.mget.assert_called_once_with(["menu:item:a", "menu:item:b"])
+    assert result == {"a": {"name": "Pizza"}}
+
+@patch("cache.redis_client")
+def test_set_cached_menu_items_uses_pipeline(mock_redis):
+    pipe = mock_redis.pipeline.return_value
+
+    set_cached_menu_items({"a": {"name": "Pizza"}, "b": {"name": "Suco"}})
+
+    mock_redis.pipeline.assert_called_once_with(transaction=False)
+    assert pipe.setex.call_count == 2
+    pipe.execute.assert_called_once()
+
+def _cache_count(tier, result):
+    return REGISTRY.get_sample_value('menu_cache_requests_total', {'tier': tier, 'result': result}) or 0
+
+@patch("cache.redis_client")
+def test_get_cached_menu_item_local_hit_skips_redis(mock_redis):
+    set_cached_menu_item("item123", {"name": "Test Item"})
+    local_hits = _cache_count('local', 'hit')
+
+    result = get_cached_menu_item("item123")
+
+    assert result == {"name": "Test Item"}
+    mock_redis.get.assert_not_called()
+    assert _cache_count('local', 'hit') == local_hits + 1
+
+@patch("cache.redis_client")
+def test_get_cached_menu_item_redis_hit_fills_local(mock_redis):
+    mock_redis.get.return_value = '{"name": "Test Item"}'
+    redis_hits = _cache_count('redis', 'hit')
+
+    get_cached_menu_item("item123")
+    get_cached_menu_item("item123")
+
+    mock_redis.get.assert_called_once()
+    assert _cache_count('redis', 'hit') == redis_hits + 1
+
+@patch("cache.redis_client")
+def test_get_cached_menu_items_only_mgets_local_misses(mock_redis):
+    local_menu_cache.set("a", {"name": "Pizza"})
+    mock_redis.mget.return_value = ['{"name": "Suco"}']
+
+    result = get_cached_menu_items(["a", "b"])
+
+    mock_redis.mget.assert_called_once_with(["menu:item:b"])
+    assert result == {"a": {"name": "Pizza"}, "b": {"name": "Suco"}}
+    assert local_menu_cache.get("b") == {"name": "Suco"}
+
+@patch("cache.redis_client")
+def test_get_cached_menu_items_all_local_skips_redis(mock_redis):
+    local_menu_cache.set("a", {"name": "Pizza"})
+
+    assert get_cached_menu_items(["a"]) == {"a": {"name": "Pizza"}}
+    mock_redis.mget.assert_not_called()
+
+def test_local_cache_expires_after_ttl():
+    cache = LocalCache(maxsize=10, ttl_seconds=30)
+    with patch("cache.time.monotonic", return_value=100):
+        cache.set("a", 1)
+    with patch("cache.time.monotonic", return_value=129):
+        assert cache.get("a") == 1
+    with patch("cache.time.monotonic", return_value=131):
+        assert cache.get("a") is None
+    # Continua disponível como cópia expirada para quando o menu-service cair
+    assert cache.get_stale("a") == 1
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(maxsize=2, ttl_seconds=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+@pytest.mark.asyncio
+@patch("cache.async_redis_client")
+async def test_get_cached_menu_items_async_only_mgets_local_misses(mock_redis):
+    local_menu_cache.set("a", {"name": "Pizza"})
+    mock_redis.mget = AsyncMock(return_value=['{"name": "Suco"}'])
+
+    result = await get_cached_menu_items_async(["a", "b"])
+
+    mock_redis.mget.assert_awaited_once_with(["menu:item:b"])
+    assert result == {"a": {"name": "Pizza"}, "b": {"name": "Suco"}}
+
+@pytest.mark.asyncio
+@patch("cache.async_redis_client")
+async def test_set_cached_menu_items_async_uses_pipeline(mock_redis):
+    mock_redis.pipeline = MagicMock()
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute = AsyncMock()
+
+    await set_cached_menu_items_async({"a": {"name": "Pizza"}})
+
+    mock_redis.pipeline.assert_called_once_with(transaction=False)
+    pipe.setex.assert_called_once_with("menu:item:a", 300, '{"name": "Pizza"}')
+    pipe.execute.assert_awaited_once()
+    assert local_menu_cache.get("a") == {"name": "Pizza"}
+
+def test_get_stale_menu_items_ignores_ttl():
+    with patch("cache.time.monotonic", return_value=0):
+        local_menu_cache.set("a", {"name": "Pizza"})
+
+    assert local_menu_cache.get("a") is None
+    assert get_stale_menu_items(["a", "b"]) == {"a": {"name": "Pizza"}}
+
+def test_menu_updated_invalidates_local_tier_on_replica_without_the_partition():
+    published = []
+    owner_redis = MagicMock()
+    owner_redis.publish.side_effect = lambda channel, data: published.append(
+        {"type": "message", "channel": channel, "data": data}
+    )
+    # Réplica sem a partição do menu_updated: só recebe o aviso pelo pub/sub
+    other_cache = LocalCache()
+    stop = threading.Event()
+
+    def replica_caches_old_version():
+        other_cache.set("item123", {"item_id": "item123", "price": 10.0, "available": True})
+
+    def owner_consumes_event():
+        with patch("cache.redis_client", owner_redis):
+            process_menu_updated_event({"event_type": "menu_updated",
+                                        "payload": {"item_id": "item123", "price": 10.0, "available": False}})
+
+    steps = iter([replica_caches_old_version, owner_consumes_event])
+
+    def get_message(timeout):
+        step = next(steps, None)
+        if step is None:
+            stop.set()
+            return None
+        step()
+        return published.pop(0) if published else None
+
+    other_redis = MagicMock()
+    pubsub = other_redis.pubsub.return_value
+    pubsub.get_message.side_effect = get_message
+
+    listen_menu_invalidations(stop, client=other_redis, cache=other_cache)
+
+    pubsub.subscribe.assert_called_once_with(LOCAL_CACHE_INVALIDATION_CHANNEL)
+    assert other_cache.get("item123") is None
+    pubsub.close.assert_called_once()
+
+def test_listen_menu_invalidations_clears_local_tier_on_resubscribe():
+    cache = LocalCache()
+    cache.set("item123", {"price": 10.0})
+    stop = threading.Event()
+    client = MagicMock()
+    client.pubsub.return_value.subscribe.side_effect = [redis.ConnectionError("redis fora"), None]
+    client.pubsub.return_value.get_message.side_effect = lambda timeout: stop.set()
+
+    with patch("cache.LOCAL_CACHE_INVALIDATION_RETRY_SECONDS", 0):
+        listen_menu_invalidations(stop, client=client, cache=cache)
+
+    # Invalidações publicadas durante a queda se perderam: a camada local recomeça vazia
+    assert client.pubsub.return_value.subscribe.call_count == 2
+    assert len(cache) == 0
@@ -1,48 +1,179 @@
+import uuid
 import pytest
 from fastapi import HTTPException
-from controllers import fetch_menu_item, create_order, update_order_status
-from schemas import OrderCreate, OrderItemCreate
+import httpx
+from unittest.mock import AsyncMock, MagicMock
+from controllers import (
+    fetch_menu_items, fetch_menu_items_async, create_order, create_order_async, update_order_status
+)
+from models import OutboxEvent, OrderView
+from menu_client import MenuClient, MenuServiceUnavailable
+from cache import local_menu_cache
+from schemas import OrderCreate, OrderItemCreate, OrderResponse
+from sqlalchemy import event
 from shared.enums import PaymentStatus
 from main import app as fastapi_app
 
-def test_fetch_menu_item_cache_hit(mocker):
-    item_id = "123"
-    fake_item = {"name": "Pizza", "price": 20.0, "available": True}
+def test_fetch_menu_items_uses_one_mget_and_one_batch_call(mocker):
+    cached_id, missing_id = "11111111-1111-1111-1111-111111111111", "22222222-2222-2222-2222-222222222222"
+    mock_mget = mocker.patch("controllers.get_cached_menu_items", return_value={cached_id: {"item_id": cached_id}})
+    mock_response = mocker.Mock(status_code=200)
+    mock_response.json.return_value = [{"item_id": missing_id, "name": "Suco"}]
+    mock_get = mocker.patch("controllers.menu_client.get", return_value=mock_response)
+    mock_fill = mocker.patch("controllers.set_cached_menu_items")
 
-    mocker.patch("controllers.get_cached_menu_item", return_value=fake_item)
-    result = fetch_menu_item(item_id)
+    result = fetch_menu_items([cached_id, missing_id, missing_id])
 
-    assert result == fake_item
+    mock_mget.assert_called_once_with([cached_id, missing_id])
+    mock_get.assert_called_once_with("/batch", params={"ids": missing_id})
+    mock_fill.assert_called_once_with({missing_id: {"item_id": missing_id, "name": "Suco"}})
+    assert set(result) == {cached_id, missing_id}
 
+def test_fetch_menu_items_splits_misses_into_menu_service_batches(mocker):
+    from controllers import MENU_BATCH_MAX_IDS
+    item_ids = [str(uuid.UUID(int=i)) for i in range(MENU_BATCH_MAX_IDS * 2 + 1)]
+    mocker.patch("controllers.get_cached_menu_items", return_value={})
+    mocker.patch("controllers.set_cached_menu_items")
 
-def test_fetch_menu_item_cache_miss_success(mocker):
-    item_id = "123"
-    fake_item = {"name": "Pizza", "price": 20.0, "available": True}
+    def batch(path, params):
+        ids = params["ids"].split(",")
+        assert len(ids) <= MENU_BATCH_MAX_IDS
+        return mocker.Mock(status_code=200, json=lambda: [{"item_id": item_id} for item_id in ids])
 
-    mocker.patch("controllers.get_cached_menu_item", return_value=None)
-    mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = fake_item
-    mocker.patch("controllers.requests.get", return_value=mock_response)
-    mock_set_cache = mocker.patch("controllers.set_cached_menu_item")
+    mock_get = mocker.patch("controllers.menu_client.get", side_effect=batch)
 
-    result = fetch_menu_item(item_id)
+    result = fetch_menu_items(item_ids)
 
-    assert result == fake_item
-    mock_set_cache.assert_called_once_with(item_id, fake_item)
+    assert mock_get.call_count == 3
+    assert set(result) == set(item_ids)
 
+def test_fetch_menu_items_error_status_is_not_item_not_found(mocker):
+    item_id = "11111111-1111-1111-1111-111111111111"
+    local_menu_cache.set(item_id, {"item_id": item_id, "name": "Pizza"})
+    mocker.patch("controllers.get_cached_menu_items", return_value={})
+    mocker.patch("controllers.menu_client.get", return_value=mocker.Mock(status_code=422))
 
-def test_fetch_menu_item_not_found(mocker):
-    item_id = "123"
+    # A resposta de erro cai no mesmo fallback de indisponibilidade: cópia expirada ou 503
+    assert fetch_menu_items([item_id]) == {item_id: {"item_id": item_id, "name": "Pizza"}}
+    with pytest.raises(HTTPException) as exc_info:
+        fetch_menu_items(["22222222-2222-2222-2222-222222222222"])
+    assert exc_info.value.status_code == 503
+
+def test_fetch_menu_items_all_cached_skips_http(mocker):
+    item_id = "11111111-1111-1111-1111-111111111111"
+    mocker.patch("controllers.get_cached_menu_items", return_value={item_id: {"item_id": item_id}})
+    mock_get = mocker.patch("controllers.menu_client.get")
+
+    assert fetch_menu_items([item_id]) == {item_id: {"item_id": item_id}}
+    mock_get.assert_not_called()
+
+def test_fetch_menu_items_warm_replica_skips_cache_and_http(mocker):
+    from menu_replica import MenuReplica
+    item_id = "11111111-1111-1111-1111-111111111111"
+    replica = MenuReplica()
+    replica.load([{"item_id": item_id, "name": "Pizza"}])
+    mocker.patch("controllers.menu_replica", replica)
+    mock_mget = mocker.patch("controllers.get_cached_menu_items")
+    mock_get = mocker.patch("controllers.menu_client.get")
+
+    assert fetch_menu_items([item_id]) == {item_id: {"item_id": item_id, "name": "Pizza"}}
+    mock_mget.assert_not_called()
+    mock_get.assert_not_called()
+
+def test_fetch_menu_items_warm_replica_treats_deleted_as_missing(mocker):
+    from menu_replica import MenuReplica
+    item_id = "11111111-1111-1111-1111-111111111111"
+    replica = MenuReplica()
+    replica.load([{"item_id": item_id, "name": "Pizza"}])
+    replica.apply({"item_id": item_id, "deleted": True})
+    mocker.patch("controllers.menu_replica", replica)
+    mock_mget = mocker.patch("controllers.get_cached_menu_items")
+
+    assert fetch_menu_items([item_id]) == {}
+    mock_mget.assert_not_called()
+
+def test_fetch_menu_items_serves_stale_when_menu_service_is_down(mocker):
+    item_id = "11111111-1111-1111-1111-111111111111"
+    local_menu_cache.set(item_id, {"item_id": item_id, "name": "Pizza"})
+    mocker.patch("controllers.get_cached_menu_items", return_value={})
+    mocker.patch("controllers.menu_client.get", side_effect=MenuServiceUnavailable("circuito aberto"))
+
+    assert fetch_menu_items([item_id]) == {item_id: {"item_id": item_id, "name": "Pizza"}}
+
+def test_fetch_menu_items_without_stale_copy_returns_503(mocker):
+    mocker.patch("controllers.get_cached_menu_items", return_value={})
+    mocker.patch("controllers.menu_client.get", side_effect=MenuServiceUnavailable("timeout"))
+
+    with pytest.raises(HTTPException) as exc_info:
+        fetch_menu_items(["11111111-1111-1111-1111-111111111111"])
+
+    assert exc_info.value.status_code == 503
+
+@pytest.mark.asyncio
+async def test_fetch_menu_items_async_uses_async_cache_and_client(mocker):
+    cached_id, missing_id = "11111111-1111-1111-1111-111111111111", "22222222-2222-2222-2222-222222222222"
+    mocker.patch("controllers.get_cached_menu_items_async", AsyncMock(return_value={cached_id: {"item_id": cached_id}}))
+    mock_fill = mocker.patch("controllers.set_cached_menu_items_async", AsyncMock())
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json=[{"item_id": missing_id, "name": "Suco"}])
+
+    client = MenuClient(base_url="http://menu-service/api/v1/menu")
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    mocker.patch("controllers.menu_client", client)
 
-    mocker.patch("controllers.get_cached_menu_item", return_value=None)
-    mock_response = mocker.Mock(status_code=404)
-    mocker.patch("controllers.requests.get", return_value=mock_response)
+    result = await fetch_menu_items_async([cached_id, missing_id])
 
-    result = fetch_menu_item(item_id)
+    assert len(requests_seen) == 1
+    assert requests_seen[0].url.params["ids"] == missing_id
+    mock_fill.assert_awaited_once_with({missing_id: {"item_id": missing_id, "name": "Suco"}})
+    assert set(result) == {cached_id, missing_id}
+    await client.aclose()
 
-    assert result is None
+def _async_session():
+    session = MagicMock()
+    session.flush = AsyncMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    return session
 
+@pytest.mark.asyncio
+async def test_create_order_async_commits_order_and_outbox(mocker):
+    item_id = "123e4567-e89b-12d3-a456-426614174000"
+    mocker.patch("controllers.fetch_menu_items_async", AsyncMock(return_value={
+        item_id: {"name": "Pizza", "price": 20.0, "available": True}
+    }))
+    session = _async_session()
+    order_data = OrderCreate(customer_name="Cliente", payment_type="manual", items=[{"item_id": item_id, "quantity": 2}])
+
+    order = await create_order_async(session, order_data)
+
+    assert order.total_price == 40.0
+    added = [call.args[0] for call in session.add.call_args_list]
+    assert added[0] is order
+    assert isinstance(added[1], OutboxEvent)
+    assert isinstance(added[2], OrderView) and added[2].items[0]["quantity"] == 2
+    session.flush.assert_awaited_once()
+    session.commit.assert_awaited_once()
+    session.rollback.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_create_order_async_rolls_back_on_missing_item(mocker):
+    mocker.patch("controllers.fetch_menu_items_async", AsyncMock(return_value={}))
+    session = _async_session()
+    order_data = OrderCreate(
+        customer_name="Cliente", payment_type="manual",
+        items=[{"item_id": "123e4567-e89b-12d3-a456-426614174000", "quantity": 1}]
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await create_order_async(session, order_data)
+
+    assert exc_info.value.status_code == 404
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
 
 def test_create_order_item_unavailable(mocker, db_session):
     fake_item_id = "e92b6f58-36d1-4de0-bb53-77153d6cd4e5"
@@ -52,7 +183,7 @@ def test_create_order_item_unavailable(mocker, db_session):
         items=[{"item_id": fake_item_id, "quantity": 1}]
     )
     unavailable_item = {"name": "Pizza", "price": 20.0, "available": False}
-    mocker.patch("controllers.fetch_menu_item", return_value=unavailable_item)
+    mocker.patch("controllers.fetch_menu_items", return_value={fake_item_id: unavailable_item})
 
     with pytest.raises(HTTPException) as exc_info:
         create_order(db_session, order_data)
@@ -60,19 +191,40 @@ def test_create_order_item_unavailable(mocker, db_session):
     assert exc_info.value.status_code == 400
     assert "não está disponível" in exc_info.value.detail
 
+def test_create_order_response_needs_no_query_after_return(client, db_session, monkeypatch):
+    item_id = "123e4567-e89b-12d3-a456-426614174001"
+    monkeypatch.setattr("controllers.fetch_menu_items", lambda ids: {
+        item_id: {"name": "Pizza", "price": 30.0, "available": True}
+    })
+    order_data = OrderCreate(
+        items=[OrderItemCreate(item_id=item_id, quantity=2)], customer_name="Cliente Teste", payment_type="manual"
+    )
+
+    created = create_order(db_session, order_data)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.bind, "before_cursor_execute", listener)
+    try:
+        # A rota valida o response_model no event loop: não pode haver lazy load aqui
+        response = OrderResponse.model_validate(created)
+    finally:
+        event.remove(db_session.bind, "before_cursor_execute", listener)
+
+    assert statements == []
+    assert response.total_price == 60.0
+    assert [(item.item_name, item.quantity) for item in response.items] == [("Pizza", 2)]
+
 def test_update_order_status_with_mocked_menu(client, db_session, monkeypatch):
-    def mock_get_menu_item(item_id: str):
+    def mock_get_menu_items(item_ids):
         return {
-            "id": item_id,
-            "name": "Mocked Pizza",
-            "price": 39.99,
-            "available": True
+            item_id: {"id": item_id, "name": "Mocked Pizza", "price": 39.99, "available": True}
+            for item_id in item_ids
         }
 
     mocked_item_id = "123e4567-e89b-12d3-a456-426614174000"
 
-    monkeypatch.setattr("controllers.get_cached_menu_item", lambda item_id: None)
-    monkeypatch.setattr("controllers.fetch_menu_item", mock_get_menu_item)
+    monkeypatch.setattr("controllers.fetch_menu_items", mock_get_menu_items)
 
     order_data = OrderCreate(
         items=[OrderItemCreate(item_id=mocked_item_id, quantity=1)],
@@ -81,10 +233,29 @@ def test_update_order_status_with_mocked_menu(client, db_session, monkeypatch):
     )
     created_order = create_order(db_session, order_data)
 
-    updated_order = update_order_status(db_session, created_order.order_id, "paid")
+    updated_order = update_order_status(db_session, created_order["order_id"], "paid")
 
     assert updated_order.status == PaymentStatus.paid
-    assert updated_order.order_id == created_order.order_id
+    assert updated_order.order_id == created_order["order_id"]
+    view = db_session.get(OrderView, created_order["order_id"])
+    db_session.refresh(view)
+    assert view.status == PaymentStatus.paid
+    assert view.items == [
+        {"item_id": mocked_item_id, "item_name": "Mocked Pizza", "unit_price": 39.99, "quantity": 1}
+    ]
+
+def test_update_order_status_backfills_missing_view(client, db_session):
+    from models import Order, OrderItem
+    order = Order(customer_name="Pedido Antigo", total_price=10, payment_type="manual",
+                  items=[OrderItem(item_id="i-1", item_name="Pizza", quantity=1, unit_price=10)])
+    db_session.add(order)
+    db_session.commit()
+
+    update_order_status(db_session, order.order_id, "paid")
+
+    view = db_session.get(OrderView, order.order_id)
+    assert view.status == PaymentStatus.paid
+    assert view.items == [{"item_id": "i-1", "item_name": "Pizza", "unit_price": 10.0, "quantity": 1}]
 
 def test_update_order_status_not_found(mocker, db_session):
     mocker.patch("controllers.select")
@@ -105,4 +276,168 @@ def test_update_order_status_exception(mocker, db_session):
         update_order_status(db_session, "any-id", "paid")
 
     mock_rollback.assert_called_once()
-    assert "erro inesperado" in str(exc_info.value)
\ No newline at end of file
+    assert "erro inesperado" in str(exc_info.value)
+def _seed_orders(db_session, prefix, count, **overrides):
+    from datetime import datetime, timedelta
+    from controllers import build_order_view
+    from models import Order
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    orders = [
+        Order(customer_name=f"{prefix} {i}", total_price=10, payment_type=overrides.get("payment_type", "manual"),
+              status=overrides.get("status", PaymentStatus.pending),
+              # Pares com o mesmo created_at exercitam o desempate por order_id
+              created_at=base + timedelta(minutes=i // 2))
+        for i in range(count)
+    ]
+    db_session.add_all(orders)
+    db_session.flush()
+    # A listagem lê o read model, escrito junto com o pedido como no create_order
+    db_session.add_all([build_order_view(order) for order in orders])
+    db_session.commit()
+    return orders
+
+def test_list_order_rows_keyset_pages_are_stable_and_complete(client, db_session):
+    from controllers import list_order_rows
+    seeded = _seed_orders(db_session, "Keyset", 7)
+    expected = [o.order_id for o in sorted(seeded, key=lambda o: (o.created_at, o.order_id), reverse=True)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = list_order_rows(db_session, limit=3, cursor=cursor, customer="keyset")
+        seen += [row["order_id"] for row in page]
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+def test_list_order_rows_last_page_has_no_cursor(client, db_session):
+    from controllers import list_order_rows
+    _seed_orders(db_session, "Pagina Unica", 2)
+
+    page, cursor = list_order_rows(db_session, limit=2, customer="pagina unica")
+
+    assert len(page) == 2
+    assert cursor is None
+
+def test_list_order_rows_filters(client, db_session):
+    from datetime import datetime
+    from controllers import list_order_rows
+    _seed_orders(db_session, "Filtro", 4, status=PaymentStatus.paid, payment_type="online")
+    _seed_orders(db_session, "Filtro", 2)
+
+    paid, _ = list_order_rows(db_session, customer="filtro", order_status=PaymentStatus.paid)
+    online, _ = list_order_rows(db_session, customer="filtro", payment_type="online")
+    window, _ = list_order_rows(db_session, customer="filtro", created_from=datetime(2026, 1, 1, 12, 1),
+                                created_to=datetime(2026, 1, 1, 12, 2))
+
+    assert len(paid) == 4 and all(row["status"] == PaymentStatus.paid for row in paid)
+    assert len(online) == 4
+    assert {row["customer_name"] for row in window} == {"Filtro 2", "Filtro 3"}
+
+def test_list_order_rows_customer_prefix_escapes_wildcards(client, db_session):
+    from controllers import list_order_rows
+    _seed_orders(db_session, "Cem%", 1)
+    _seed_orders(db_session, "Cemiterio", 1)
+
+    page, _ = list_order_rows(db_session, customer="cem%")
+
+    assert [row["customer_name"] for row in page] == ["Cem% 0"]
+
+def test_decode_cursor_rejects_garbage():
+    from controllers import InvalidCursor, decode_cursor
+    with pytest.raises(InvalidCursor):
+        decode_cursor("nao-e-um-cursor")
+
+def test_order_view_indexes_match_init_sql():
+    import os
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "init.sql")) as f:
+        init_sql = " ".join(f.read().split())
+    for index in OrderView.__table__.indexes:
+        ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=postgresql.dialect()))
+        # O create_all tem que gerar o mesmo índice do init.sql (ex.: text_pattern_ops no filtro por cliente)
+        assert ddl in init_sql
+
+def test_list_order_rows_returns_plain_rows_with_items(client, db_session):
+    from controllers import build_order_view, list_order_rows
+    from models import OrderItem
+    orders = _seed_orders(db_session, "Linhas", 3)
+    orders[0].items.append(OrderItem(item_id="i-1", item_name="Pizza", quantity=2, unit_price=5))
+    db_session.merge(build_order_view(orders[0]))
+    db_session.commit()
+
+    rows, cursor = list_order_rows(db_session, limit=2, customer="linhas")
+
+    assert cursor is not None
+    assert all(isinstance(row, dict) and isinstance(row["total_price"], float) for row in rows)
+
+    rest, _ = list_order_rows(db_session, limit=2, cursor=cursor, customer="linhas")
+    by_id = {row["order_id"]: row for row in rows + rest}
+    assert set(by_id) == {order.order_id for order in orders}
+    assert by_id[orders[0].order_id]["items"] == [
+        {"item_id": "i-1", "item_name": "Pizza", "unit_price": 5.0, "quantity": 2}
+    ]
+    assert by_id[orders[1].order_id]["items"] == []
+
+def test_get_order_row_reads_view(client, db_session):
+    from controllers import get_order_row
+    order = _seed_orders(db_session, "Detalhe", 1)[0]
+
+    row = get_order_row(db_session, order.order_id)
+
+    assert row["order_id"] == order.order_id
+    assert row["total_price"] == 10.0 and row["items"] == []
+    assert get_order_row(db_session, "inexistente") is None
+
+def test_create_orders_batch_single_flush_and_commit(client, db_session, mocker):
+    from controllers import create_orders_batch
+    item_id = "123e4567-e89b-12d3-a456-426614174000"
+    fetch = mocker.patch("controllers.fetch_menu_items", return_value={
+        item_id: {"name": "Pizza", "price": 20.0, "available": True}
+    })
+    from sqlalchemy import event
+    inserts = []
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO orders "):
+            inserts.append(executemany)
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_inserts)
+    commit = mocker.spy(db_session, "commit")
+    orders = [
+        OrderCreate(customer_name=f"Lote {i}", payment_type="manual", items=[{"item_id": item_id, "quantity": 1}])
+        for i in range(3)
+    ]
+    orders.append(OrderCreate(customer_name="Lote Invalido", payment_type="manual",
+                              items=[{"item_id": "e92b6f58-36d1-4de0-bb53-77153d6cd4e5", "quantity": 1}]))
+
+    try:
+        results = create_orders_batch(db_session, orders)
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_inserts)
+
+    assert [result["status"] for result in results] == ["created"] * 3 + ["error"]
+    assert results[3]["status_code"] == 404
+    fetch.assert_called_once_with([item_id, "e92b6f58-36d1-4de0-bb53-77153d6cd4e5"])
+    # Os três pedidos em um único INSERT (executemany) e um commit
+    assert inserts == [True]
+    commit.assert_called_once()
+    order_ids = [result["order"]["order_id"] for result in results[:3]]
+    outbox = db_session.query(OutboxEvent).filter(OutboxEvent.key.in_(order_ids)).all()
+    assert len(outbox) == 3
+    assert db_session.query(OrderView).filter(OrderView.order_id.in_(order_ids)).count() == 3
+
+def test_create_orders_batch_rolls_back_everything_on_error(client, db_session, mocker):
+    from controllers import create_orders_batch
+    item_id = "123e4567-e89b-12d3-a456-426614174000"
+    mocker.patch("controllers.fetch_menu_items", return_value={
+        item_id: {"name": "Pizza", "price": 20.0, "available": True}
+    })
+    mocker.patch("controllers.enqueue_order_created_event", side_effect=Exception("falha na outbox"))
+    rollback = mocker.spy(db_session, "rollback")
+    orders = [OrderCreate(customer_name="Lote", payment_type="manual", items=[{"item_id": item_id, "quantity": 1}])]
+
+    with pytest.raises(Exception, match="falha na outbox"):
+        create_orders_batch(db_session, orders)
+
+    rollback.assert_called_once()
@@ -1,6 +1,15 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from kafka_consumer import process_payment_event, process_menu_updated_event, start_consumer
+from kafka_consumer import (
+    process_payment_event, process_menu_updated_event, process_event_batch, start_consumer, stop_consumer, process_in_own_session,
+    handle_payment_event, handle_menu_updated_event
+)
+
+@pytest.fixture(autouse=True)
+def mock_dead_letter_router():
+    # Evita criar o producer real ao montar o consumer nos testes de start_consumer
+    with patch("kafka_consumer.DeadLetterRouter") as mock_router:
+        yield mock_router
 
 def test_process_payment_event_success():
     db_mock = MagicMock()
@@ -16,6 +25,39 @@ def test_process_payment_event_success():
         process_payment_event(message, db_mock)
         mock_update.assert_called_once_with(db_mock, "abc123", "paid")
 
+def test_process_payment_event_skips_already_processed_event():
+    db_mock = MagicMock()
+    message = {
+        "event_type": "payment",
+        "payload": {"order_id": "abc123", "status": "paid"},
+        "metadata": {"event_id": "evt-1"}
+    }
+
+    with patch("kafka_consumer.update_order_status") as mock_update, \
+         patch("kafka_consumer.dedup_store") as mock_store:
+        mock_store.seen.return_value = True
+        process_payment_event(message, db_mock)
+
+    mock_store.seen.assert_called_once_with("evt-1")
+    mock_update.assert_not_called()
+    mock_store.mark.assert_not_called()
+
+def test_process_payment_event_marks_event_after_update():
+    db_mock = MagicMock()
+    message = {
+        "event_type": "payment",
+        "payload": {"order_id": "abc123", "status": "paid"},
+        "metadata": {"event_id": "evt-2"}
+    }
+
+    with patch("kafka_consumer.update_order_status") as mock_update, \
+         patch("kafka_consumer.dedup_store") as mock_store:
+        mock_store.seen.return_value = False
+        process_payment_event(message, db_mock)
+
+    mock_update.assert_called_once_with(db_mock, "abc123", "paid")
+    mock_store.mark.assert_called_once_with("evt-2")
+
 def test_process_payment_event_exception():
     db_mock = MagicMock()
     message = {
@@ -42,9 +84,33 @@ def test_process_menu_updated_event_success():
         }
     }
 
-    with patch("kafka_consumer.set_cached_menu_item") as mock_cache:
+    with patch("kafka_consumer.set_cached_menu_item") as mock_cache, \
+         patch("kafka_consumer.publish_menu_invalidation") as mock_publish:
         process_menu_updated_event(message)
         mock_cache.assert_called_once_with("item123", message["payload"])
+        mock_publish.assert_called_once_with("item123")
+
+def test_process_menu_updated_event_refreshes_local_tier():
+    from cache import local_menu_cache
+    local_menu_cache.set("item123", {"item_id": "item123", "price": 10.0})
+    payload = {"item_id": "item123", "price": 12.5}
+
+    with patch("cache.redis_client"):
+        process_menu_updated_event({"event_type": "menu_updated", "payload": payload})
+
+    assert local_menu_cache.get("item123") == payload
+
+def test_process_menu_updated_event_deleted_invalidates_cache():
+    message = {"event_type": "menu_updated", "payload": {"item_id": "item123", "deleted": True}}
+
+    with patch("kafka_consumer.invalidate_cached_menu_item") as mock_invalidate, \
+         patch("kafka_consumer.set_cached_menu_item") as mock_cache, \
+         patch("kafka_consumer.publish_menu_invalidation") as mock_publish:
+        process_menu_updated_event(message)
+
+    mock_invalidate.assert_called_once_with("item123")
+    mock_cache.assert_not_called()
+    mock_publish.assert_called_once_with("item123")
 
 def test_process_menu_updated_event_exception():
     # Falta item_id para causar erro
@@ -68,3 +134,77 @@ def test_start_consumer_closes_db():
         with patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
             start_consumer()
             assert db_mock.close.called
+
+def test_process_event_batch_routes_by_event_type():
+    db_mock = MagicMock()
+    messages = [
+        {"event_type": "payment", "payload": {"order_id": "1", "status": "paid"}},
+        {"event_type": "menu_updated", "payload": {"item_id": "abc", "name": "Pizza"}},
+    ]
+
+    with patch("kafka_consumer.update_order_status") as mock_update, \
+         patch("kafka_consumer.set_cached_menu_item") as mock_cache:
+        process_event_batch(messages, db_mock)
+
+    mock_update.assert_called_once_with(db_mock, "1", "paid")
+    mock_cache.assert_called_once_with("abc", messages[1]["payload"])
+
+def test_start_consumer_batch_mode(monkeypatch):
+    monkeypatch.setenv("KAFKA_CONSUMER_BATCH_MODE", "true")
+    monkeypatch.setenv("KAFKA_CONSUMER_BATCH_SIZE", "200")
+    db_mock = MagicMock()
+    mock_consumer = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([db_mock])):
+        with patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
+            start_consumer()
+
+    mock_consumer.consume_batches.assert_called_once()
+    assert mock_consumer.consume_batches.call_args.kwargs["max_messages"] == 200
+    mock_consumer.subscribe_and_consume_multiple.assert_not_called()
+    assert db_mock.close.called
+
+def test_start_consumer_parallel_mode(monkeypatch):
+    monkeypatch.setenv("KAFKA_CONSUMER_WORKERS", "4")
+    db_mock = MagicMock()
+    mock_consumer = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([db_mock])), \
+         patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
+        start_consumer()
+
+    mock_consumer.consume_parallel.assert_called_once()
+    assert mock_consumer.consume_parallel.call_args.kwargs["num_workers"] == 4
+    mock_consumer.subscribe_and_consume_multiple.assert_not_called()
+
+def test_process_in_own_session_closes_session():
+    session = MagicMock()
+    handler = MagicMock()
+
+    with patch("kafka_consumer.SessionLocal", return_value=session):
+        process_in_own_session(handler, {"event_type": "x"})
+
+    handler.assert_called_once_with({"event_type": "x"}, session)
+    session.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_async_handlers_run_sync_processing_off_loop():
+    message = {"event_type": "payment", "payload": {"order_id": "1", "status": "paid"}}
+
+    with patch("kafka_consumer.process_in_own_session") as mock_run, \
+         patch("kafka_consumer.process_menu_updated_event") as mock_menu:
+        await handle_payment_event(message)
+        await handle_menu_updated_event(message)
+
+    mock_run.assert_called_once_with(process_payment_event, message)
+    mock_menu.assert_called_once_with(message)
+
+def test_stop_consumer_signals_running_consumer():
+    mock_consumer = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([MagicMock()])), \
+         patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
+        start_consumer()
+
+    stop_consumer()
+    mock_consumer.stop.assert_called_once()
@@ -1,43 +1,42 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from kafka_producer import publish_order_created_event
+from kafka_producer import enqueue_order_created_event, build_order_created_event
+from models import OutboxEvent
 
-@patch("kafka_producer.get_kafka_producer")
-def test_publish_event_success(mock_get_producer):
-    # Configura o mock
-    mock_producer = MagicMock()
-    mock_get_producer.return_value = mock_producer
+def test_build_order_created_event():
+    order_data = {"order_id": "123", "status": "pending"}
 
-    # Dados de teste
+    event = build_order_created_event(order_data)
+
+    assert event["event_type"] == "orders"
+    assert event["payload"] == order_data
+    assert event["metadata"]["service"] == "order-service"
+
+def test_enqueue_event_success():
+    db_mock = MagicMock()
     order_data = {"order_id": "123", "status": "completed"}
 
-    # Chama a função
-    publish_order_created_event(order_data)
+    enqueue_order_created_event(db_mock, order_data)
 
-    # Verifica se o producer foi chamado corretamente
-    mock_get_producer.assert_called_once()
-    mock_producer.publish_message.assert_called_once()
+    # Apenas adiciona à sessão: o commit é feito junto com o pedido
+    db_mock.add.assert_called_once()
+    db_mock.commit.assert_not_called()
 
-    # Verifica os parâmetros da mensagem
-    args, _ = mock_producer.publish_message.call_args
-    assert args[0] == "order_created"
-    assert args[1]["payload"] == order_data
-    assert args[1]["event_type"] == "orders"
+    outbox_event = db_mock.add.call_args[0][0]
+    assert isinstance(outbox_event, OutboxEvent)
+    assert outbox_event.topic == "order_created"
+    assert outbox_event.payload["payload"] == order_data
+    assert outbox_event.payload["event_type"] == "orders"
+    assert outbox_event.key == "123"
 
-@patch("kafka_producer.get_kafka_producer")
 @patch("kafka_producer.logger.error")
-def test_publish_event_failure(mock_logger, mock_get_producer):
-    # Configura o mock para simular erro
-    mock_producer = MagicMock()
-    mock_producer.publish_message.side_effect = Exception("Kafka error")
-    mock_get_producer.return_value = mock_producer
+def test_enqueue_event_failure(mock_logger):
+    db_mock = MagicMock()
+    db_mock.add.side_effect = Exception("DB error")
 
-    # Dados de teste
     order_data = {"order_id": "123", "status": "completed"}
 
-    # Verifica se a exceção é levantada
-    with pytest.raises(Exception, match="Kafka error"):
-        publish_order_created_event(order_data)
+    with pytest.raises(Exception, match="DB error"):
+        enqueue_order_created_event(db_mock, order_data)
 
-    # Verifica se o erro foi logado
-    mock_logger.assert_called_once_with("Falha ao publicar evento: Kafka error")
\ No newline at end of file
+    mock_logger.assert_called_once_with("Falha ao registrar evento na outbox: DB error")
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import pytest
 from unittest.mock import patch, MagicMock, ANY
@@ -12,7 +13,12 @@ async def test_lifespan_success():
     mock_app = MagicMock(spec=FastAPI)
 
     with patch('main.threading.Thread') as mock_thread, \
-         patch('main.start_consumer') as mock_consumer:
+         patch('main.start_consumer') as mock_consumer, \
+         patch('main.stop_consumer') as mock_stop_consumer, \
+         patch('main.get_kafka_producer') as mock_get_producer, \
+         patch('main.OutboxRelay') as mock_relay, \
+         patch('main.start_local_cache_invalidation') as mock_invalidation, \
+         patch('main.stop_local_cache_invalidation') as mock_stop_invalidation:
 
         mock_thread_instance = MagicMock()
         mock_thread.return_value = mock_thread_instance
@@ -22,13 +28,23 @@ async def test_lifespan_success():
 
         mock_thread.assert_called_once()
         mock_thread_instance.start.assert_called_once()
+        mock_relay.return_value.start.assert_called_once()
+        mock_relay.return_value.stop.assert_called_once()
+        mock_get_producer.assert_called_once()
+        mock_stop_consumer.assert_called_once()
+        mock_thread_instance.join.assert_called_once_with(timeout=10.0)
+        mock_invalidation.assert_called_once()
+        mock_stop_invalidation.assert_called_once()
 
 @pytest.mark.asyncio
 async def test_lifespan_failure(caplog):
     mock_app = MagicMock(spec=FastAPI)
 
     with patch('main.threading.Thread') as mock_thread, \
-         patch('main.start_consumer', side_effect=Exception("Test error")):
+         patch('main.start_consumer', side_effect=Exception("Test error")), \
+         patch('main.get_kafka_producer'), \
+         patch('main.OutboxRelay'), \
+         patch('main.start_local_cache_invalidation'):
 
         mock_thread_instance = MagicMock()
         mock_thread.return_value = mock_thread_instance
@@ -42,6 +58,33 @@ async def test_lifespan_failure(caplog):
         assert any("❌ Falha ao iniciar consumer: Test error" in record.message
                  for record in caplog.records)
 
+@pytest.mark.asyncio
+async def test_lifespan_async_consumer(monkeypatch):
+    monkeypatch.setenv("KAFKA_CONSUMER_ASYNC", "true")
+    mock_app = MagicMock(spec=FastAPI)
+    started = asyncio.Event()
+    cancelled = []
+
+    async def fake_consumer():
+        started.set()
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with patch('main.threading.Thread') as mock_thread, \
+         patch('main.start_async_consumer', fake_consumer), \
+         patch('main.get_kafka_producer'), \
+         patch('main.OutboxRelay'), \
+         patch('main.start_local_cache_invalidation'):
+
+        async with lifespan(mock_app) as _:
+            await asyncio.wait_for(started.wait(), timeout=1)
+
+        mock_thread.assert_not_called()
+        assert cancelled == [True]
+
 @pytest.mark.asyncio
 async def test_http_exception_handler():
     mock_request = MagicMock()
@@ -51,4 +94,20 @@ async def test_http_exception_handler():
 
     assert isinstance(response, JSONResponse)
     assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert response.body.decode() == '{"detail":"Not Found"}'
\ No newline at end of file
+    assert response.body.decode() == '{"detail":"Not Found"}'
+
+def test_readiness_returns_503_until_producer_ready():
+    client = TestClient(app)
+
+    with patch('main.is_kafka_producer_ready', return_value=False):
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["kafka_producer_ready"] is False
+
+        # Liveness continua respondendo mesmo sem Kafka
+        assert client.get("/health").status_code == 200
+
+    with patch('main.is_kafka_producer_ready', return_value=True):
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
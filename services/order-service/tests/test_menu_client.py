@@ -0,0 +1,154 @@
+import pytest
+import httpx
+import requests
+from unittest.mock import patch, MagicMock
+from prometheus_client import REGISTRY
+from menu_client import CircuitBreaker, MenuClient, MenuServiceUnavailable
+
+def _response(status_code):
+    return MagicMock(status_code=status_code)
+
+def _client(breaker=None, retries=2):
+    client = MenuClient(base_url="http://menu-service/api/v1/menu", breaker=breaker or CircuitBreaker(3, 30),
+                        retries=retries, backoff_seconds=0.01)
+    client._session = MagicMock()
+    return client
+
+def test_breaker_opens_after_threshold_and_half_opens_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    with patch("menu_client.time.monotonic", return_value=100):
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+    with patch("menu_client.time.monotonic", return_value=131):
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Só a chamada de teste passa enquanto meio-aberto
+        assert not breaker.allow()
+        breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert REGISTRY.get_sample_value('menu_breaker_state') == 0
+
+def test_breaker_reopens_when_trial_call_fails():
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=0)
+    for _ in range(5):
+        breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_breaker_half_open_releases_new_trial_after_reset_without_result():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    with patch("menu_client.time.monotonic", return_value=100):
+        breaker.record_failure()
+    with patch("menu_client.time.monotonic", return_value=131):
+        assert breaker.allow()
+        assert not breaker.allow()
+
+    # A chamada de teste nunca reportou: depois de reset_seconds outra é liberada
+    with patch("menu_client.time.monotonic", return_value=162):
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+def test_get_unexpected_error_in_trial_call_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    client = _client(breaker=breaker)
+    client._session.get.side_effect = KeyError("inesperado")
+
+    with pytest.raises(KeyError):
+        client.get("/x")
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_get_retries_server_errors_with_backoff():
+    client = _client()
+    client._session.get.side_effect = [_response(503), requests.ConnectionError("reset"), _response(200)]
+
+    with patch("menu_client.time.sleep") as mock_sleep:
+        response = client.get("/batch", params={"ids": "a"})
+
+    assert response.status_code == 200
+    assert client._session.get.call_count == 3
+    assert mock_sleep.call_count == 2
+    client._session.get.assert_called_with(
+        "http://menu-service/api/v1/menu/batch", params={"ids": "a"}, timeout=client.timeout
+    )
+
+def test_get_does_not_retry_client_errors():
+    client = _client()
+    client._session.get.return_value = _response(404)
+
+    assert client.get("/x").status_code == 404
+    client._session.get.assert_called_once()
+
+def test_get_raises_after_exhausting_retries_and_counts_failure():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    client = _client(breaker=breaker, retries=1)
+    client._session.get.side_effect = requests.Timeout("read timeout")
+
+    with patch("menu_client.time.sleep"):
+        with pytest.raises(MenuServiceUnavailable):
+            client.get("/x")
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_get_fails_fast_when_circuit_is_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    client = _client(breaker=breaker)
+
+    with pytest.raises(MenuServiceUnavailable, match="Circuito aberto"):
+        client.get("/x")
+    client._session.get.assert_not_called()
+
+def test_backoff_is_bounded_by_exponential_cap():
+    client = _client()
+    with patch("menu_client.random.uniform", side_effect=lambda low, high: high) as mock_uniform:
+        assert client._backoff(2) == pytest.approx(0.04)
+    mock_uniform.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_aget_retries_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(502 if len(calls) == 1 else 200, json=[])
+
+    client = _client()
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    response = await client.aget("/batch", params={"ids": "a"})
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_aget_cancelled_trial_call_reopens_circuit():
+    import asyncio
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    with patch("menu_client.time.monotonic", return_value=100):
+        breaker.record_failure()
+    client = _client(breaker=breaker)
+
+    async def handler(request):
+        raise asyncio.CancelledError()
+
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("menu_client.time.monotonic", return_value=131):
+        with pytest.raises(asyncio.CancelledError):
+            await client.aget("/x")
+
+        assert breaker.state == CircuitBreaker.OPEN
+    # Cancelamento conta como falha: depois do reset uma nova chamada de teste é liberada
+    with patch("menu_client.time.monotonic", return_value=162):
+        assert breaker.allow()
+    await client.aclose()
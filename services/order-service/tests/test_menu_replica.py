@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import patch, MagicMock
+from menu_replica import MenuReplica, load_snapshot, process_replica_event, replica_group_id
+from cache import local_menu_cache
+
+ITEM_ID = "11111111-1111-1111-1111-111111111111"
+
+def _item(price, updated_at, **extra):
+    return {"item_id": ITEM_ID, "name": "Pizza", "price": price, "available": True, "updated_at": updated_at, **extra}
+
+def test_replica_is_cold_until_loaded():
+    replica = MenuReplica()
+    assert replica.get_many([ITEM_ID]) is None
+
+    replica.load([_item(10.0, "2026-01-01T10:00:00")])
+
+    assert replica.warm
+    assert replica.get_many([ITEM_ID, "outro"]) == {ITEM_ID: _item(10.0, "2026-01-01T10:00:00")}
+
+def test_replica_applies_newer_event_and_ignores_older():
+    replica = MenuReplica()
+    replica.load([_item(10.0, "2026-01-01T10:00:00")])
+
+    assert replica.apply(_item(12.0, "2026-01-01T11:00:00", deleted=False))
+    assert not replica.apply(_item(9.0, "2026-01-01T09:00:00", deleted=False))
+
+    assert replica.get_many([ITEM_ID])[ITEM_ID]["price"] == 12.0
+    assert "deleted" not in replica.get_many([ITEM_ID])[ITEM_ID]
+
+def test_replica_snapshot_does_not_override_newer_events():
+    replica = MenuReplica()
+    replica.apply(_item(12.0, "2026-01-01T11:00:00"))
+
+    replica.load([_item(10.0, "2026-01-01T10:00:00")])
+
+    assert replica.get_many([ITEM_ID])[ITEM_ID]["price"] == 12.0
+
+def test_replica_tombstone_blocks_replayed_upsert():
+    replica = MenuReplica()
+    replica.load([_item(10.0, "2026-01-01T10:00:00")])
+
+    replica.apply({"item_id": ITEM_ID, "updated_at": "2026-01-01T12:00:00", "deleted": True})
+    replica.apply(_item(12.0, "2026-01-01T11:00:00"))
+
+    assert replica.get_many([ITEM_ID]) == {}
+    assert replica.is_deleted(ITEM_ID)
+
+def test_process_replica_event_drops_local_cache_entry():
+    replica = MenuReplica()
+    local_menu_cache.set(ITEM_ID, {"price": 10.0})
+
+    process_replica_event({"event_type": "menu_updated", "payload": _item(12.0, "2026-01-01T11:00:00")}, replica)
+
+    assert local_menu_cache.get(ITEM_ID) is None
+    assert len(replica) == 1
+
+def test_load_snapshot_retries_until_menu_service_answers():
+    replica = MenuReplica()
+    failure = MagicMock(status_code=503)
+    success = MagicMock(status_code=200)
+    success.json.return_value = [_item(10.0, "2026-01-01T10:00:00")]
+
+    with patch("menu_replica.menu_client.get", side_effect=[failure, success]) as mock_get, \
+         patch("menu_replica.time.sleep") as mock_sleep:
+        assert load_snapshot(replica)
+
+    assert mock_get.call_count == 2
+    mock_sleep.assert_called_once()
+    assert replica.warm
+
+def test_load_snapshot_stops_when_signalled():
+    stop_event = threading.Event()
+    stop_event.set()
+
+    with patch("menu_replica.menu_client.get") as mock_get:
+        assert not load_snapshot(MenuReplica(), stop_event=stop_event)
+    mock_get.assert_not_called()
+
+def test_replica_group_id_is_per_instance(monkeypatch):
+    monkeypatch.delenv("MENU_REPLICA_GROUP_ID", raising=False)
+    with patch("menu_replica.socket.gethostname", return_value="order-2"):
+        assert replica_group_id() == "order-menu-replica-order-2"
@@ -1,39 +1,90 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch
 from main import app
 import httpx
+import proxy_routes
+from proxy_routes import get_upstream_client, start_proxy_clients, close_proxy_clients
 
 client = TestClient(app)
 
-@pytest.mark.asyncio
-@patch("proxy_routes.httpx.AsyncClient")
-async def test_proxy_request_success(mock_async_client):
-    mock_client = AsyncMock()
-    mock_async_client.return_value.__aenter__.return_value = mock_client
-
-    mock_response = httpx.Response(
-        status_code=200,
-        content=b'{"status": "success"}',
-        headers={"content-type": "application/json"}
-    )
-    mock_client.request.return_value = mock_response
+# Respostas com stream=, como as de um transporte real (content= já chega lido e não pode ser repassado)
+def _upstream(handler):
+    return httpx.AsyncClient(base_url="http://payment-service:5002", transport=httpx.MockTransport(handler))
 
-    response = client.get("/api/v1/payments")
+def test_proxy_request_success():
+    def handler(request):
+        return httpx.Response(200, stream=httpx.ByteStream(b'{"status": "success"}'),
+                              headers={"content-type": "application/json"})
+
+    with patch("proxy_routes.get_upstream_client", return_value=_upstream(handler)):
+        response = client.get("/api/v1/payments")
     assert response.status_code == 200
     assert response.json() == {"status": "success"}
 
-@pytest.mark.asyncio
-@patch("proxy_routes.httpx.AsyncClient")
-async def test_proxy_request_failure(mock_async_client):
-    mock_client = AsyncMock()
-    mock_async_client.return_value.__aenter__.return_value = mock_client
-    mock_client.request.side_effect = httpx.ConnectError("Connection error")
+def test_proxy_request_failure():
+    def handler(request):
+        raise httpx.ConnectError("Connection error")
 
-    response = client.get("/api/v1/payments")
+    with patch("proxy_routes.get_upstream_client", return_value=_upstream(handler)):
+        response = client.get("/api/v1/payments")
     assert response.status_code == 500
     assert "Erro ao redirecionar requisição" in response.text
 
+def test_proxy_request_timeout_returns_504():
+    def handler(request):
+        raise httpx.ReadTimeout("lento")
+
+    with patch("proxy_routes.get_upstream_client", return_value=_upstream(handler)):
+        response = client.get("/api/v1/payments")
+    assert response.status_code == 504
+
+def test_proxy_streams_body_and_forwards_query_and_headers():
+    seen = {}
+
+    def handler(request):
+        seen["url"] = str(request.url)
+        seen["body"] = request.read()
+        seen["headers"] = request.headers
+        chunks = [b'{"order_id": ', b'"123"}']
+        return httpx.Response(200, stream=httpx.ByteStream(b"".join(chunks)),
+                              headers={"content-type": "application/json", "connection": "close"})
+
+    with patch("proxy_routes.get_upstream_client", return_value=_upstream(handler)):
+        response = client.put("/api/v1/payments/confirm/123?force=1", json={"status": "paid"},
+                              headers={"x-request-id": "abc"})
+
+    assert response.status_code == 200
+    assert response.json() == {"order_id": "123"}
+    assert seen["url"] == "http://payment-service:5002/api/v1/payments/confirm/123?force=1"
+    assert seen["body"] == b'{"status": "paid"}'
+    assert seen["headers"]["x-request-id"] == "abc"
+    assert seen["headers"]["host"] == "payment-service:5002"
+
+def test_proxy_get_does_not_send_chunked_body():
+    seen = {}
+
+    def handler(request):
+        seen["headers"] = request.headers
+        return httpx.Response(200, stream=httpx.ByteStream(b"[]"))
+
+    with patch("proxy_routes.get_upstream_client", return_value=_upstream(handler)):
+        client.get("/api/v1/payments")
+
+    assert "transfer-encoding" not in seen["headers"]
+
+@pytest.mark.asyncio
+async def test_upstream_client_is_shared_and_closed():
+    await close_proxy_clients()
+    start_proxy_clients()
+    pooled = get_upstream_client("payment-service")
+
+    assert get_upstream_client("payment-service") is pooled
+    assert pooled._transport._pool._max_connections == proxy_routes.PROXY_MAX_CONNECTIONS
+
+    await close_proxy_clients()
+    assert pooled.is_closed
+
 @patch("proxy_routes.proxy_request")
 def test_payments_proxy(mock_proxy):
     mock_proxy.return_value = "Mocked response"
@@ -1,9 +1,10 @@
 import pytest
 from fastapi import status
 from pydantic import ValidationError
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, MagicMock
 
 from schemas import OrderCreate
+from routes import get_order_db
 
 API_PREFIX = "/api/v1"
 
@@ -20,16 +21,16 @@ def mock_order_data():
         ]
     }
 
-@patch("controllers.fetch_menu_item", return_value={
+@patch("controllers.fetch_menu_items", return_value={"11111111-1111-1111-1111-111111111111": {
     "id": "11111111-1111-1111-1111-111111111111",
     "name": "Item Teste",
     "description": "Descrição",
     "price": 10.0,
     "available": True
-})
+}})
 
-@patch("controllers.publish_order_created_event")
-def test_create_order(mock_publish_event, mock_fetch_menu_item, mock_order_data, client):
+@patch("controllers.enqueue_order_created_event")
+def test_create_order(mock_enqueue_event, mock_fetch_menu_item, mock_order_data, client):
     response = client.post(f"{API_PREFIX}/orders", json=mock_order_data)
 
     assert response.status_code == status.HTTP_201_CREATED
@@ -38,18 +39,18 @@ def test_create_order(mock_publish_event, mock_fetch_menu_item, mock_order_data,
     assert data["customer_name"] == mock_order_data["customer_name"]
     assert data["payment_type"] == mock_order_data["payment_type"]
     assert len(data["items"]) == len(mock_order_data["items"])
-    mock_publish_event.assert_called_once()
+    mock_enqueue_event.assert_called_once()
 
-@patch("controllers.fetch_menu_item", return_value={
+@patch("controllers.fetch_menu_items", return_value={"11111111-1111-1111-1111-111111111111": {
     "id": "11111111-1111-1111-1111-111111111111",
     "name": "Item Teste",
     "description": "Descrição",
     "price": 10.0,
     "available": True
-})
+}})
 
-@patch("controllers.publish_order_created_event")
-def test_get_orders(mock_publish_event, mock_fetch_menu_item, mock_order_data, client):
+@patch("controllers.enqueue_order_created_event")
+def test_get_orders(mock_enqueue_event, mock_fetch_menu_item, mock_order_data, client):
     post_response = client.post(f"{API_PREFIX}/orders", json=mock_order_data)
     assert post_response.status_code == status.HTTP_201_CREATED
 
@@ -60,7 +61,7 @@ def test_get_orders(mock_publish_event, mock_fetch_menu_item, mock_order_data, c
     assert isinstance(orders, list)
     assert any(order["customer_name"] == mock_order_data["customer_name"] for order in orders)
 
-@patch("controllers.fetch_menu_item", return_value=None)
+@patch("controllers.fetch_menu_items", return_value={})
 def test_create_order_invalid_item(mock_fetch_menu_item, mock_order_data, client):
     response = client.post(f"{API_PREFIX}/orders", json=mock_order_data)
 
@@ -129,8 +130,7 @@ def test_create_order_value_error(mock_create, client):
     assert response.json()["detail"] == "O campo 'item_id' deve ser um UUID válido. Exemplo: '123e4567-e89b-12d3-a456-426614174000'."
 
 @patch("routes.create_order")
-@patch("controllers.fetch_menu_item", return_value={"available": True, "price": 10.0, "name": "Test Item"})
-def test_create_order_unexpected_error(mock_fetch, mock_create, client):
+def test_create_order_unexpected_error(mock_create, client):
     mock_create.side_effect = Exception("Erro inesperado")
 
     payload = {
@@ -172,7 +172,125 @@ def test_create_order_unexpected_error_logging(mock_logger, mock_create, client)
     mock_logger.assert_called_once()
     assert "Erro inesperado" in mock_logger.call_args[0][0]
 
-@patch("routes.get_orders")
+def test_create_order_async_path_uses_async_session(mock_order_data, client, monkeypatch):
+    async_db = MagicMock()
+    session_ctx = MagicMock()
+    session_ctx.__aenter__ = AsyncMock(return_value=async_db)
+    session_ctx.__aexit__ = AsyncMock(return_value=False)
+    created = {
+        "order_id": "22222222-2222-2222-2222-222222222222",
+        "customer_name": mock_order_data["customer_name"],
+        "items": [],
+        "total_price": 20.0,
+        "payment_type": "manual",
+        "status": "pending",
+        "created_at": "2026-01-01T10:00:00"
+    }
+    mock_create_async = AsyncMock(return_value=created)
+    monkeypatch.setattr("routes.ORDER_ASYNC_PATH", True)
+    monkeypatch.setattr("routes.get_async_sessionmaker", lambda: lambda: session_ctx)
+    monkeypatch.setattr("routes.create_order_async", mock_create_async)
+    # Resolve a dependência real de sessão do POST /orders
+    monkeypatch.delitem(client.app.dependency_overrides, get_order_db)
+
+    with patch("routes.create_order") as mock_create, patch("routes.get_db") as mock_get_db:
+        response = client.post(f"{API_PREFIX}/orders", json=mock_order_data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    mock_create_async.assert_awaited_once()
+    assert mock_create_async.await_args.args[0] is async_db
+    mock_create.assert_not_called()
+    # No modo assíncrono a sessão síncrona nem é aberta
+    mock_get_db.assert_not_called()
+    session_ctx.__aexit__.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_get_order_db_sync_mode_opens_only_sync_session(monkeypatch):
+    sync_db = MagicMock()
+    closed = []
+
+    def fake_get_db():
+        try:
+            yield sync_db
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr("routes.ORDER_ASYNC_PATH", False)
+    monkeypatch.setattr("routes.get_db", fake_get_db)
+    monkeypatch.setattr("routes.get_async_sessionmaker", MagicMock(side_effect=AssertionError("sessão assíncrona aberta")))
+
+    dependency = get_order_db()
+    assert await dependency.__anext__() is sync_db
+    with pytest.raises(StopAsyncIteration):
+        await dependency.__anext__()
+    assert closed == [True]
+
+@patch("routes.list_order_rows")
+def test_list_orders_sets_next_cursor_header(mock_get_orders, client):
+    mock_get_orders.return_value = ([], "abc")
+
+    response = client.get(f"{API_PREFIX}/orders?limit=10&status=paid&payment_type=online&customer=Jo")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Next-Cursor"] == "abc"
+    kwargs = mock_get_orders.call_args.kwargs
+    assert kwargs["limit"] == 10
+    assert kwargs["order_status"] == "paid"
+    assert kwargs["payment_type"] == "online"
+    assert kwargs["customer"] == "Jo"
+
+@patch("controllers.fetch_menu_items", return_value={"11111111-1111-1111-1111-111111111111": {
+    "name": "Item Teste",
+    "price": 10.0,
+    "available": True
+}})
+@patch("controllers.enqueue_order_created_event")
+def test_list_orders_read_path_matches_order_response(mock_enqueue_event, mock_fetch, mock_order_data, client):
+    created = client.post(f"{API_PREFIX}/orders", json=mock_order_data).json()
+
+    orders = client.get(f"{API_PREFIX}/orders", params={"customer": mock_order_data["customer_name"]}).json()
+
+    assert created in orders
+
+@patch("controllers.fetch_menu_items", return_value={"11111111-1111-1111-1111-111111111111": {
+    "name": "Item Teste",
+    "price": 10.0,
+    "available": True
+}})
+@patch("controllers.enqueue_order_created_event")
+def test_get_order_detail_matches_created_order(mock_enqueue_event, mock_fetch, mock_order_data, client):
+    created = client.post(f"{API_PREFIX}/orders", json=mock_order_data).json()
+
+    response = client.get(f"{API_PREFIX}/orders/{created['order_id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == created
+
+def test_get_order_detail_not_found(client):
+    response = client.get(f"{API_PREFIX}/orders/nao-existe")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "não encontrado" in response.json()["detail"]
+
+@patch("routes.get_order_row", side_effect=Exception("Erro no banco de dados"))
+def test_get_order_detail_error(mock_get_order, client):
+    response = client.get(f"{API_PREFIX}/orders/123")
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert "Erro ao buscar pedido" in response.json()["detail"]
+
+def test_list_orders_invalid_cursor(client):
+    response = client.get(f"{API_PREFIX}/orders?cursor=%%%")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Cursor inválido" in response.json()["detail"]
+
+def test_list_orders_limit_is_capped(client):
+    response = client.get(f"{API_PREFIX}/orders?limit=10000")
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+@patch("routes.list_order_rows")
 def test_list_orders_error(mock_get_orders, client):
     mock_get_orders.side_effect = Exception("Erro no banco de dados")
 
@@ -180,3 +298,95 @@ def test_list_orders_error(mock_get_orders, client):
 
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
     assert "Erro ao buscar pedidos" in response.json()["detail"]
+
+BATCH_ITEM = "11111111-1111-1111-1111-111111111111"
+UNAVAILABLE_ITEM = "22222222-2222-2222-2222-222222222222"
+
+@patch("controllers.fetch_menu_items", return_value={
+    BATCH_ITEM: {"name": "Item Teste", "price": 10.0, "available": True},
+    UNAVAILABLE_ITEM: {"name": "Item Esgotado", "price": 10.0, "available": False}
+})
+@patch("controllers.enqueue_order_created_event")
+def test_create_orders_batch_returns_per_order_results(mock_enqueue_event, mock_fetch, mock_order_data, client):
+    orders = [
+        mock_order_data,
+        {"customer_name": "Sem Itens", "payment_type": "manual"},
+        {**mock_order_data, "items": [{"item_id": UNAVAILABLE_ITEM, "quantity": 1}]},
+        {**mock_order_data, "items": [{"item_id": "33333333-3333-3333-3333-333333333333", "quantity": 1}]},
+        {**mock_order_data, "customer_name": "Cliente Lote", "payment_type": "online"},
+    ]
+
+    response = client.post(f"{API_PREFIX}/orders/batch", json={"orders": orders})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["created"], data["failed"]) == (2, 3)
+    results = data["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result.get("status_code") for result in results] == [None, 400, 400, 404, None]
+    assert results[4]["order"]["customer_name"] == "Cliente Lote"
+    assert results[4]["order"]["total_price"] == 20.0
+    # Uma resolução do cardápio para o lote inteiro, um evento por pedido criado
+    mock_fetch.assert_called_once()
+    assert mock_enqueue_event.call_count == 2
+
+    detail = client.get(f"{API_PREFIX}/orders/{results[0]['order']['order_id']}").json()
+    assert detail == results[0]["order"]
+
+def test_create_orders_batch_requires_orders_list(client):
+    response = client.post(f"{API_PREFIX}/orders/batch", json={"orders": []})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "'orders'" in response.json()["detail"]
+
+def test_create_orders_batch_size_is_capped(mock_order_data, client, monkeypatch):
+    monkeypatch.setattr("routes.ORDER_BATCH_MAX_SIZE", 2)
+
+    response = client.post(f"{API_PREFIX}/orders/batch", json={"orders": [mock_order_data] * 3})
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+@patch("routes.create_orders_batch", side_effect=Exception("Erro no banco de dados"))
+def test_create_orders_batch_unexpected_error(mock_create, mock_order_data, client):
+    response = client.post(f"{API_PREFIX}/orders/batch", json={"orders": [mock_order_data]})
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert "lote de pedidos" in response.json()["detail"]
+
+def _menu_batch_endpoint(max_ids):
+    """Imita o GET /menu/batch do menu-service, inclusive o 422 acima do limite de ids"""
+    def get(path, params):
+        ids = params["ids"].split(",")
+        if len(ids) > max_ids:
+            return MagicMock(status_code=422)
+        return MagicMock(status_code=200, json=lambda: [
+            {"item_id": item_id, "name": "Item", "price": 10.0, "available": True} for item_id in ids
+        ])
+    return get
+
+@patch("controllers.enqueue_order_created_event")
+@patch("controllers.set_cached_menu_items")
+@patch("controllers.get_cached_menu_items", return_value={})
+def test_create_orders_batch_with_more_distinct_items_than_menu_batch_limit(mock_mget, mock_fill, mock_enqueue, client):
+    import uuid
+    from shared.menu import MENU_BATCH_MAX_IDS
+    orders = [
+        {"customer_name": f"Parceiro {i}", "payment_type": "online",
+         "items": [{"item_id": str(uuid.uuid4()), "quantity": 1}]}
+        for i in range(MENU_BATCH_MAX_IDS + 50)
+    ]
+
+    with patch("controllers.menu_client.get", side_effect=_menu_batch_endpoint(MENU_BATCH_MAX_IDS)) as mock_get:
+        response = client.post(f"{API_PREFIX}/orders/batch", json={"orders": orders})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["created"] == len(orders)
+    assert mock_get.call_count == 2
+
+@patch("controllers.get_cached_menu_items", return_value={})
+def test_create_orders_batch_menu_service_error_is_not_item_not_found(mock_mget, mock_order_data, client):
+    with patch("controllers.menu_client.get", return_value=MagicMock(status_code=500)):
+        response = client.post(f"{API_PREFIX}/orders/batch", json={"orders": [mock_order_data]})
+
+    # Sem cópia local do cardápio o lote inteiro é 503, não pedidos recusados com 404
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -1,5 +1,6 @@
 import pytest
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, MagicMock, call, ANY
+from confluent_kafka import KafkaError, KafkaException
 from shared.kafka.consumer import KafkaConsumerWrapper
 import json
 
@@ -26,7 +27,10 @@ def test_initialization():
             'auto.offset.reset': 'earliest',
             'enable.auto.commit': False,
             'session.timeout.ms': 10000,
-            'heartbeat.interval.ms': 3000
+            'heartbeat.interval.ms': 3000,
+            'partition.assignment.strategy': 'cooperative-sticky',
+            'statistics.interval.ms': 15000,
+            'stats_cb': ANY
         })
 
         # Verifica se a configuração foi armazenada corretamente
@@ -52,7 +56,8 @@ def test_subscribe_and_consume(mock_kafka_consumer):
     except StopConsumer:
         pass  # Impede que a exceção pare o runner
 
-    mock_kafka_consumer.subscribe.assert_called_once_with(["test-topic"])
+    mock_kafka_consumer.subscribe.assert_called_once()
+    assert mock_kafka_consumer.subscribe.call_args[0][0] == ["test-topic"]
     callback_mock.assert_called_once_with({"test": "value"})
     mock_kafka_consumer.commit.assert_called_once_with(asynchronous=False)
     mock_kafka_consumer.close.assert_called_once()
@@ -86,7 +91,8 @@ def test_subscribe_and_consume_multiple(mock_kafka_consumer):
     except StopConsumer:
         pass
 
-    mock_kafka_consumer.subscribe.assert_called_once_with(["topic1", "topic2"])
+    mock_kafka_consumer.subscribe.assert_called_once()
+    assert mock_kafka_consumer.subscribe.call_args[0][0] == ["topic1", "topic2"]
     callback1.assert_called_once_with({"key1": "value1"})
     callback2.assert_called_once_with({"key2": "value2"})
     assert mock_kafka_consumer.commit.call_count == 2
@@ -114,4 +120,41 @@ def test_json_decode_error(mock_kafka_consumer, caplog):
     consumer.subscribe_and_consume(["test-topic"], MagicMock())
 
     # Verifica se o erro foi logado
-    assert "Erro ao decodificar mensagem" in caplog.text
\ No newline at end of file
+    assert "Erro ao decodificar mensagem" in caplog.text
+
+def test_stop_ends_loop_and_closes(mock_kafka_consumer):
+    consumer = KafkaConsumerWrapper(group_id="test-group")
+    callback = MagicMock()
+
+    mock_msg = MagicMock()
+    mock_msg.error.return_value = None
+    mock_msg.value.return_value = json.dumps({"n": 1}).encode()
+    mock_msg.headers.return_value = None
+
+    def poll(timeout):
+        # Shutdown pedido enquanto a mensagem é entregue
+        consumer.stop()
+        return mock_msg
+
+    mock_kafka_consumer.poll.side_effect = poll
+    consumer.subscribe_and_consume(["test-topic"], callback)
+
+    callback.assert_called_once_with({"n": 1})
+    mock_kafka_consumer.commit.assert_called_once_with(asynchronous=False)
+    mock_kafka_consumer.close.assert_called_once()
+    assert consumer.stopped
+
+def test_revoke_commits_before_handover(mock_kafka_consumer):
+    consumer = KafkaConsumerWrapper(group_id="test-group")
+    consumer.stop()
+    consumer.subscribe_and_consume(["test-topic"], MagicMock())
+
+    callbacks = mock_kafka_consumer.subscribe.call_args.kwargs
+    partition = MagicMock(topic="test-topic", partition=0)
+    callbacks["on_revoke"](mock_kafka_consumer, [partition])
+    mock_kafka_consumer.commit.assert_called_once_with(asynchronous=False)
+
+    # Sem offsets novos o commit falha com _NO_OFFSET, o que não é erro
+    mock_kafka_consumer.commit.side_effect = KafkaException(KafkaError(KafkaError._NO_OFFSET))
+    callbacks["on_revoke"](mock_kafka_consumer, [partition])
+    callbacks["on_assign"](mock_kafka_consumer, [partition])
@@ -0,0 +1,180 @@
+import pytest
+import json
+import zlib
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from confluent_kafka import KafkaException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import OutboxEvent
+from shared.kafka.outbox import OutboxRelay, add_outbox_event
+from shared.kafka.producer import KafkaProducerWrapper
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[OutboxEvent.__table__])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def _enqueue(session_factory, count):
+    db = session_factory()
+    for i in range(count):
+        add_outbox_event(db, OutboxEvent, "order_created", {"event_type": "orders", "payload": {"n": i}})
+        db.flush()
+    db.commit()
+    db.close()
+
+def test_add_outbox_event_does_not_commit():
+    db_mock = MagicMock()
+
+    event = add_outbox_event(db_mock, OutboxEvent, "order_created", {"event_type": "orders"})
+
+    db_mock.add.assert_called_once_with(event)
+    db_mock.commit.assert_not_called()
+    assert event.topic == "order_created"
+
+def test_add_outbox_event_stamps_event_id_in_metadata():
+    event = add_outbox_event(MagicMock(), OutboxEvent, "order_created",
+                             {"event_type": "orders", "metadata": {"service": "order-service"}})
+
+    assert event.payload["metadata"]["event_id"] == event.event_id
+    assert event.payload["metadata"]["service"] == "order-service"
+
+def test_relay_batch_publishes_and_marks_sent(session_factory):
+    _enqueue(session_factory, 3)
+    producer = MagicMock()
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer)
+
+    assert relay.relay_batch() == 3
+
+    # Um único lote com todos os eventos pendentes
+    producer.publish_batch.assert_called_once()
+    batch = producer.publish_batch.call_args[0][0]
+    assert [message["payload"]["n"] for _, message, _ in batch] == [0, 1, 2]
+    assert all(topic == "order_created" for topic, _, _ in batch)
+
+    db = session_factory()
+    assert db.query(OutboxEvent).filter(OutboxEvent.sent_at.is_(None)).count() == 0
+    db.close()
+
+    assert relay.relay_batch() == 0
+    producer.publish_batch.assert_called_once()
+
+def test_relay_batch_respects_batch_size(session_factory):
+    _enqueue(session_factory, 5)
+    producer = MagicMock()
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer, batch_size=2)
+
+    assert relay.relay_batch() == 2
+    assert relay.relay_batch() == 2
+    assert relay.relay_batch() == 1
+
+def test_relay_batch_keeps_events_on_publish_failure(session_factory):
+    _enqueue(session_factory, 2)
+    producer = MagicMock()
+    producer.publish_batch.side_effect = KafkaException("Broker indisponível")
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer)
+
+    with pytest.raises(KafkaException):
+        relay.relay_batch()
+
+    db = session_factory()
+    assert db.query(OutboxEvent).filter(OutboxEvent.sent_at.is_(None)).count() == 2
+    db.close()
+
+def test_relay_batch_waits_for_producer_warm_up(session_factory):
+    _enqueue(session_factory, 2)
+    producer = MagicMock(is_ready=False)
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer)
+
+    assert relay.relay_batch() == 0
+    producer.publish_batch.assert_not_called()
+
+def test_purge_sent_removes_old_events(session_factory):
+    _enqueue(session_factory, 2)
+    db = session_factory()
+    old_event, recent_event = db.query(OutboxEvent).all()
+    old_event.sent_at = datetime.utcnow() - timedelta(days=2)
+    recent_event.sent_at = datetime.utcnow()
+    db.commit()
+    db.close()
+
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=MagicMock())
+
+    assert relay.purge_sent() == 1
+
+def test_relay_start_and_stop(session_factory):
+    producer = MagicMock()
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer, poll_interval=0.01)
+
+    thread = relay.start()
+    relay.stop(timeout=1)
+
+    assert not thread.is_alive()
+
+def test_relay_keeps_per_order_ordering_across_partitions(session_factory):
+    num_partitions = 6
+    partitions = {p: [] for p in range(num_partitions)}
+
+    def produce(topic, key, value, headers, on_delivery):
+        # Simula o particionador: mesma key, mesma partição
+        partitions[zlib.crc32(key) % num_partitions].append((key.decode(), json.loads(value)))
+
+    order_ids = [f"order-{n}" for n in range(5)]
+    db = session_factory()
+    base = datetime.utcnow()
+    for seq in range(4):
+        for n, order_id in enumerate(order_ids):
+            event = add_outbox_event(db, OutboxEvent, "order_created",
+                                     {"payload": {"order_id": order_id, "seq": seq}}, key=order_id)
+            event.created_at = base + timedelta(milliseconds=seq * 10 + n)
+    db.commit()
+    db.close()
+
+    with patch('shared.kafka.producer.Producer') as mock_producer, \
+         patch('shared.kafka.producer.AdminClient'):
+        mock_producer.return_value.produce.side_effect = produce
+        mock_producer.return_value.flush.return_value = 0
+        producer = KafkaProducerWrapper()
+        relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer, batch_size=3)
+
+        while relay.relay_batch():
+            pass
+
+    assert len({p for p, messages in partitions.items() if messages}) > 1
+    for order_id in order_ids:
+        owners = [p for p, messages in partitions.items() if any(key == order_id for key, _ in messages)]
+        assert len(owners) == 1
+        seqs = [msg["payload"]["seq"] for key, msg in partitions[owners[0]] if key == order_id]
+        assert seqs == [0, 1, 2, 3]
+
+def test_relay_batch_publishes_in_sequence_order_not_created_at(session_factory):
+    _enqueue(session_factory, 3)
+    db = session_factory()
+    # created_at vem do relógio de cada réplica; a ordem de publicação é a sequence do banco
+    for sequence, event in zip((3, 1, 2), db.query(OutboxEvent).order_by(OutboxEvent.created_at)):
+        event.sequence = sequence
+    db.commit()
+    db.close()
+    producer = MagicMock()
+    relay = OutboxRelay(session_factory, OutboxEvent, producer_factory=lambda: producer)
+
+    relay.relay_batch()
+
+    batch = producer.publish_batch.call_args[0][0]
+    assert [message["payload"]["n"] for _, message, _ in batch] == [1, 2, 0]
+
+def test_relay_batch_skips_when_another_replica_holds_the_lock():
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    db.execute.return_value.scalar.return_value = False
+    producer = MagicMock()
+    relay = OutboxRelay(lambda: db, OutboxEvent, producer_factory=lambda: producer)
+
+    assert relay.relay_batch() == 0
+
+    producer.publish_batch.assert_not_called()
+    db.execute.assert_called_once()
+    db.rollback.assert_called_once()
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from shared.kafka.consumer import KafkaConsumerWrapper
+from shared.kafka.retry import RetryPolicy
+from shared.kafka.workers import KeyedWorkerPool, OffsetTracker
+
+def test_offset_tracker_commits_only_contiguous_offsets():
+    tracker = OffsetTracker()
+    for offset in range(5):
+        tracker.track("payment_processed", 0, offset)
+
+    tracker.complete("payment_processed", 0, 1)
+    tracker.complete("payment_processed", 0, 2)
+    # Offset 0 ainda em processamento: nada pode ser commitado
+    assert tracker.pop_committable() == {}
+
+    tracker.complete("payment_processed", 0, 0)
+    assert tracker.pop_committable() == {("payment_processed", 0): 3}
+
+    tracker.complete("payment_processed", 0, 4)
+    assert tracker.pop_committable() == {}
+    tracker.complete("payment_processed", 0, 3)
+    assert tracker.pop_committable() == {("payment_processed", 0): 5}
+    assert tracker.in_flight() == 0
+
+def test_offset_tracker_ignores_revoked_partitions():
+    tracker = OffsetTracker()
+    tracker.track("payment_processed", 1, 10)
+    tracker.reset([("payment_processed", 1)])
+
+    tracker.complete("payment_processed", 1, 10)
+    assert tracker.pop_committable() == {}
+
+def test_worker_pool_preserves_order_per_key():
+    pool = KeyedWorkerPool(4)
+    processed = {}
+    lock = threading.Lock()
+
+    def handler(key, seq):
+        time.sleep(0.001 * (seq % 3))
+        with lock:
+            processed.setdefault(key, []).append(seq)
+
+    for seq in range(20):
+        for key in (b"order-1", b"order-2", b"order-3"):
+            pool.submit(key, lambda key=key, seq=seq: handler(key, seq), lambda: None)
+
+    pool.drain()
+    pool.stop()
+    assert all(seqs == list(range(20)) for seqs in processed.values())
+    assert len(processed) == 3
+
+def test_worker_pool_stops_completing_after_failure():
+    pool = KeyedWorkerPool(1)
+    done = []
+
+    pool.submit(b"k", MagicMock(side_effect=RuntimeError("DB down")), lambda: done.append(1))
+    pool.submit(b"k", lambda: None, lambda: done.append(2))
+    pool.drain()
+    pool.stop()
+
+    assert isinstance(pool.error, RuntimeError)
+    assert done == []
+
+def _kafka_message(topic, partition, offset, key, value):
+    msg = MagicMock()
+    msg.error.return_value = None
+    msg.topic.return_value = topic
+    msg.partition.return_value = partition
+    msg.offset.return_value = offset
+    msg.key.return_value = key
+    msg.value.return_value = json.dumps(value).encode()
+    msg.headers.return_value = None
+    return msg
+
+def test_consume_parallel_dispatches_and_commits_processed_offsets():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+
+    received = []
+    messages = [
+        _kafka_message("payment_processed", 0, offset, f"order-{offset % 2}".encode(), {"seq": offset})
+        for offset in range(6)
+    ]
+
+    with patch.object(consumer, '_consumer') as mock_consumer:
+        mock_consumer.poll.side_effect = messages + [KeyboardInterrupt()]
+
+        with pytest.raises(KeyboardInterrupt):
+            consumer.consume_parallel({"payment_processed": received.append}, num_workers=3)
+
+        assert sorted(m["seq"] for m in received) == list(range(6))
+        committed = mock_consumer.commit.call_args.kwargs["offsets"]
+        assert [(tp.topic, tp.partition, tp.offset) for tp in committed] == [("payment_processed", 0, 6)]
+        mock_consumer.close.assert_called_once()
+
+def test_consume_parallel_raises_worker_failure_without_committing_it():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+
+    def callback(message):
+        if message["seq"] == 1:
+            raise RuntimeError("DB down")
+
+    messages = [_kafka_message("order_created", 0, offset, b"order-1", {"seq": offset}) for offset in range(3)]
+
+    with patch.object(consumer, '_consumer') as mock_consumer:
+        pending = iter(messages)
+        mock_consumer.poll.side_effect = lambda timeout: next(pending, None)
+
+        with pytest.raises(RuntimeError, match="DB down"):
+            consumer.consume_parallel({"order_created": callback}, num_workers=2)
+
+        committed = mock_consumer.commit.call_args.kwargs["offsets"]
+        assert [(tp.partition, tp.offset) for tp in committed] == [(0, 1)]
+
+def test_consume_parallel_routes_failures_to_dead_letter_and_keeps_consuming():
+    router = MagicMock()
+    router.policy = RetryPolicy((5,))
+    router.retry_delay_remaining.return_value = 0
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+
+    received = []
+
+    def callback(message):
+        if message["seq"] == 1:
+            raise RuntimeError("DB down")
+        received.append(message["seq"])
+
+    messages = [_kafka_message("order_created", 0, offset, b"order-1", {"seq": offset}) for offset in range(3)]
+    garbage = _kafka_message("order_created", 0, 3, b"order-1", {})
+    garbage.value.return_value = b"garbage"
+    retried = _kafka_message("order_created.retry.1", 0, 0, b"order-1", {"seq": 10})
+    messages += [garbage, retried]
+
+    with patch.object(consumer, '_consumer') as mock_consumer:
+        mock_consumer.poll.side_effect = messages + [KeyboardInterrupt()]
+
+        with pytest.raises(KeyboardInterrupt):
+            consumer.consume_parallel({"order_created": callback}, num_workers=2)
+
+        assert mock_consumer.subscribe.call_args[0][0] == ["order_created", "order_created.retry.1"]
+        # A mensagem do tier de retry usa o callback do tópico de origem
+        assert received == [0, 2, 10]
+        routed = sorted((c.args[0].offset(), c.kwargs) for c in router.route.call_args_list)
+        assert routed == [(1, {}), (3, {'retryable': False})]
+        committed = {(tp.topic, tp.offset) for tp in mock_consumer.commit.call_args.kwargs["offsets"]}
+        assert committed == {("order_created", 4), ("order_created.retry.1", 1)}
@@ -1,11 +1,13 @@
 import uuid
 import logging
-from typing import List
+from typing import Dict, List
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from schemas import PaymentCreate
 from models import Payment, PaymentTypeModel
+from kafka_producer import enqueue_payment_processed_event
+from shared.enums import PaymentType
 
 
 logging.basicConfig(level=logging.INFO)
@@ -81,10 +83,41 @@ def get_order(db: Session, order_id: str) -> Payment:
 def list_payments(db: Session, skip: int = 0, limit: int = 100) -> List[Payment]:
     return db.query(Payment).offset(skip).limit(limit).all()
 
+_PAYMENT_TYPE_NAMES = {payment_type.value for payment_type in PaymentType}
+
+def list_payment_rows(db: Session, skip: int = 0, limit: int = 100) -> List[Dict]:
+    """Mesma página de list_payments como dicts prontos para JSON: uma query só com as colunas da resposta"""
+    rows = db.execute(
+        select(Payment.payment_id, Payment.order_id, Payment.amount, Payment.status, Payment.created_at,
+               PaymentTypeModel.name.label("payment_type"))
+        .outerjoin(PaymentTypeModel, Payment.payment_type_id == PaymentTypeModel.type_id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return [
+        {
+            "payment_id": row.payment_id,
+            "order_id": str(row.order_id),
+            "amount": float(row.amount),
+            # Mesmo fallback de Payment.payment_type_enum
+            "payment_type": row.payment_type if row.payment_type in _PAYMENT_TYPE_NAMES else PaymentType.manual.value,
+            "status": row.status.value,
+            "created_at": row.created_at
+        }
+        for row in rows
+    ]
+
 def update_payment_status(db: Session, order_id: str, new_status: str) -> Payment:
     payment = db.query(Payment).filter(Payment.order_id == order_id).first()
     if payment:
         payment.status = new_status
+        # Evento gravado na outbox no mesmo commit da alteração de status
+        enqueue_payment_processed_event(db, {
+            "order_id": str(payment.order_id),
+            "payment_id": str(payment.payment_id),
+            "amount": float(payment.amount),
+            "status": payment.status
+        })
         db.commit()
         db.refresh(payment)
     return payment
\ No newline at end of file
@@ -15,4 +15,27 @@ CREATE TABLE IF NOT EXISTS payments (
     payment_type_id VARCHAR(36) REFERENCES payment_types(type_id),
     status VARCHAR(20) DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    event_id VARCHAR(36) PRIMARY KEY,
+    topic VARCHAR(100) NOT NULL,
+    key VARCHAR(100),
+    payload JSON NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    sequence BIGINT GENERATED BY DEFAULT AS IDENTITY
+);
+
+-- Bancos criados antes da coluna: o relay publica na ordem de sequence (atribuída no INSERT)
+ALTER TABLE outbox_events ADD COLUMN IF NOT EXISTS sequence BIGINT GENERATED BY DEFAULT AS IDENTITY;
+DROP INDEX IF EXISTS ix_outbox_events_pending;
+CREATE INDEX IF NOT EXISTS ix_outbox_events_pending_sequence ON outbox_events (sequence) WHERE sent_at IS NULL;
+-- Inbox do consumer: eventos já processados (dedup de reentregas)
+CREATE TABLE IF NOT EXISTS processed_events (
+    event_id VARCHAR(36) PRIMARY KEY,
+    topic VARCHAR(100),
+    processed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_processed_events_processed_at ON processed_events (processed_at);
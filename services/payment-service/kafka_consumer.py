@@ -1,18 +1,33 @@
+import asyncio
 import logging
+import os
 from sqlalchemy.orm import Session
 from shared.kafka.consumer import KafkaConsumerWrapper
-from database import get_db
+from shared.kafka.async_consumer import AsyncKafkaConsumerWrapper
+from shared.kafka.retry import DeadLetterRouter
+from shared.kafka.dedup import DbInbox, event_id_of
+from shared.kafka.routing import EventRouter
+from database import get_db, SessionLocal
 from shared.enums import PaymentStatus, PaymentType
 from controllers import create_or_get_payment
-from kafka_producer import publish_payment_processed_event
+from kafka_producer import enqueue_payment_processed_event
+from models import ProcessedEvent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("payment-consumer")
 
+# Inbox no banco: o registro do evento é commitado junto com o pagamento
+inbox = DbInbox(ProcessedEvent)
+
 def process_payment_event(message: dict, db: Session):
 
     try:
         if message.get('event_type') == 'orders':
+            event_id = event_id_of(message)
+            if inbox.seen(db, event_id):
+                logger.info(f"Evento {event_id} já processado, ignorando")
+                return
+
             order_data = message.get('payload', {})
 
             # Garante que os campos obrigatórios existem
@@ -24,16 +39,20 @@ def process_payment_event(message: dict, db: Session):
 
             if payment.payment_type_enum is PaymentType.online:
                 payment.status = PaymentStatus.paid.value
-                db.commit()
-                db.refresh(payment)
-                logger.info(f"Pagamento {payment.payment_id} marcado como PAGO")
-
-                publish_payment_processed_event({
+                enqueue_payment_processed_event(db, {
                     'order_id': str(payment.order_id),
                     'payment_id': str(payment.payment_id),
                     'status': payment.status
                 })
+                inbox.mark(db, event_id, topic='order_created')
+                db.commit()
+                db.refresh(payment)
+                logger.info(f"Pagamento {payment.payment_id} marcado como PAGO")
             else:
+                if event_id:
+                    # create_or_get_payment já commitou o pagamento; falta registrar o evento
+                    inbox.mark(db, event_id, topic='order_created')
+                    db.commit()
                 logger.info(f"Pagamento {payment.status} para order_id={payment.order_id}")
 
     except Exception as e:
@@ -41,16 +60,67 @@ def process_payment_event(message: dict, db: Session):
         db.rollback()
         raise
 
+def process_payment_batch(messages: list, db: Session):
+    """Processa um lote vindo de consume_batches, na ordem recebida"""
+    for message in messages:
+        process_payment_event(message, db)
+
+def process_in_own_session(handler, message: dict):
+    """Workers paralelos não podem compartilhar a sessão do consumer"""
+    db = SessionLocal()
+    try:
+        handler(message, db)
+    finally:
+        db.close()
+
+# Consumer em uso pela thread de consumo, para o lifespan sinalizar o shutdown
+_consumer = None
+
+def stop_consumer():
+    """Pede ao consumer para terminar a mensagem atual, commitar e fechar"""
+    if _consumer is not None:
+        _consumer.stop()
+
 def start_consumer():
+    global _consumer
 
     db_generator = get_db()
     db = next(db_generator)
 
     try:
-        consumer = KafkaConsumerWrapper(group_id='payment-group')
-        consumer.subscribe_and_consume(
-            topics=['order_created'],
-            callback=lambda msg: process_payment_event(msg, db)
-        )
+        consumer = KafkaConsumerWrapper(group_id='payment-group', dead_letter=DeadLetterRouter.from_env())
+        _consumer = consumer
+        workers = int(os.getenv('KAFKA_CONSUMER_WORKERS', 1))
+
+        if workers > 1:
+            consumer.consume_parallel({
+                'order_created': EventRouter({'orders': lambda msg: process_in_own_session(process_payment_event, msg)})
+            }, num_workers=workers)
+        elif os.getenv('KAFKA_CONSUMER_BATCH_MODE', 'false').lower() == 'true':
+            consumer.consume_batches(
+                topics=['order_created'],
+                batch_callback=lambda msgs: process_payment_batch(msgs, db),
+                max_messages=int(os.getenv('KAFKA_CONSUMER_BATCH_SIZE', 500)),
+                max_wait_ms=int(os.getenv('KAFKA_CONSUMER_BATCH_WAIT_MS', 100)),
+                event_types={'orders'}
+            )
+        else:
+            consumer.subscribe_and_consume(
+                topics=['order_created'],
+                callback=EventRouter({'orders': lambda msg: process_payment_event(msg, db)})
+            )
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def handle_order_created_event(message: dict):
+    # O acesso ao banco é síncrono: roda em thread para não bloquear o event loop
+    await asyncio.to_thread(process_in_own_session, process_payment_event, message)
+
+async def start_async_consumer():
+    """Consumer no event loop da aplicação; encerrado cancelando a task no lifespan"""
+    consumer = AsyncKafkaConsumerWrapper(
+        group_id='payment-group',
+        max_concurrency=int(os.getenv('KAFKA_CONSUMER_CONCURRENCY', 10)),
+        dead_letter=DeadLetterRouter.from_env()
+    )
+    await consumer.consume({'order_created': EventRouter({'orders': handle_order_created_event})})
@@ -1,20 +1,28 @@
-from shared.kafka.producer import get_kafka_producer
 import logging
 from datetime import datetime
+from sqlalchemy.orm import Session
+from shared.kafka.outbox import add_outbox_event
+from models import OutboxEvent
 
 logger = logging.getLogger(__name__)
 
-def publish_payment_processed_event(payment_data: dict):
-    producer = get_kafka_producer()
-    try:
-        event = {
-            "event_type": "payment",
-            "payload": payment_data,
-            "metadata": {
-                "timestamp": datetime.utcnow().isoformat(),
-                "service": "payment-service"
-            }
+def build_payment_processed_event(payment_data: dict) -> dict:
+    return {
+        "event_type": "payment",
+        "payload": payment_data,
+        "metadata": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "service": "payment-service"
         }
-        producer.publish_message("payment_processed", event)
+    }
+
+def enqueue_payment_processed_event(db: Session, payment_data: dict):
+    """Grava o evento na outbox dentro da transação do pagamento; o OutboxRelay publica no Kafka"""
+    try:
+        add_outbox_event(
+            db, OutboxEvent, "payment_processed", build_payment_processed_event(payment_data),
+            key=str(payment_data["order_id"])
+        )
     except Exception as e:
-        logger.error(f"Falha crítica ao publicar evento: {str(e)}")
+        logger.error(f"Falha crítica ao registrar evento na outbox: {str(e)}")
+        raise
@@ -1,10 +1,17 @@
+import asyncio
 import logging
+import os
 import threading
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from routes import router as payment_router
-from kafka_consumer import start_consumer
+from kafka_consumer import start_consumer, start_async_consumer, stop_consumer
+from database import SessionLocal
+from models import OutboxEvent
+from shared.kafka.producer import get_kafka_producer, is_kafka_producer_ready, shutdown_kafka_producer
+from shared.kafka.outbox import OutboxRelay
+from shared.kafka.metrics import latest_metrics
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
@@ -12,14 +19,23 @@ logger.setLevel(logging.INFO)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Configuração do consumer em background
+    # Relay da outbox e consumer em background
+    outbox_relay = OutboxRelay(SessionLocal, OutboxEvent)
+    consumer_task = None
+    consumer_thread = None
     try:
-        consumer_thread = threading.Thread(
-            target=start_consumer,
-            daemon=True,
-            name="payment-consumer-thread"
-        )
-        consumer_thread.start()
+        # Cria o producer sem bloquear; a conexão é confirmada em background
+        get_kafka_producer()
+        outbox_relay.start()
+        if os.getenv('KAFKA_CONSUMER_ASYNC', 'false').lower() == 'true':
+            consumer_task = asyncio.create_task(start_async_consumer(), name="payment-consumer-task")
+        else:
+            consumer_thread = threading.Thread(
+                target=start_consumer,
+                daemon=True,
+                name="payment-consumer-thread"
+            )
+            consumer_thread.start()
         logger.info("✅ Payment Consumer iniciado em background")
 
         yield
@@ -29,6 +45,16 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         logger.info("🛑 Payment Consumer finalizado")
+        if consumer_thread:
+            # Termina a mensagem em andamento e commita antes de sair
+            stop_consumer()
+            consumer_thread.join(timeout=float(os.getenv('KAFKA_CONSUMER_SHUTDOWN_TIMEOUT', 10)))
+        if consumer_task:
+            # O cancelamento aguarda os handlers em andamento e faz o commit final
+            consumer_task.cancel()
+            await asyncio.wait({consumer_task}, timeout=15)
+        outbox_relay.stop()
+        shutdown_kafka_producer()
 
 app = FastAPI(
     title="Payment Service API",
@@ -54,3 +80,22 @@ app.include_router(
     prefix="/api/v1",  # Prefixo para versionamento da API
     tags=["Payment Processing"]
 )
+
+@app.get("/health", tags=["Health"])
+def health():
+    """Liveness: o processo está de pé, mesmo sem Kafka"""
+    return {"status": "ok", "kafka_producer_ready": is_kafka_producer_ready()}
+
+@app.get("/health/ready", tags=["Health"])
+def readiness(response: Response):
+    """Readiness: 503 enquanto o producer não confirmar a conexão com o Kafka"""
+    ready = is_kafka_producer_ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "starting", "kafka_producer_ready": ready}
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Métricas Prometheus (consumer lag, throughput, latências do producer e do consumer)"""
+    body, content_type = latest_metrics()
+    return Response(content=body, media_type=content_type)
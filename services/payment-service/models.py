@@ -4,6 +4,8 @@ from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 from shared.enums import PaymentType as PaymentTypeEnum, PaymentStatus
+from shared.kafka.outbox import OutboxMixin
+from shared.kafka.dedup import InboxMixin
 
 class PaymentTypeModel(Base):
     __tablename__ = 'payment_types'
@@ -33,4 +35,10 @@ class Payment(Base):
 
     @property
     def payment_type_name(self) -> str:
-        return self.payment_type.name if self.payment_type else None
\ No newline at end of file
+        return self.payment_type.name if self.payment_type else None
+
+class OutboxEvent(OutboxMixin, Base):
+    __tablename__ = 'outbox_events'
+
+class ProcessedEvent(InboxMixin, Base):
+    __tablename__ = 'processed_events'
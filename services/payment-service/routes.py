@@ -5,30 +5,19 @@ from sqlalchemy.orm import Session, joinedload
 from database import get_db
 from models import Payment
 from schemas import PaymentCreate, PaymentResponse, PaymentConfirmResponse
-from controllers import list_payments as get_payments_list, update_payment_status, get_order
-from kafka_producer import publish_payment_processed_event
+from controllers import list_payment_rows, update_payment_status, get_order
 from shared.enums import PaymentType
+from shared.responses import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# O response_model documenta o formato; as linhas vão direto para bytes (sem objetos ORM/Pydantic)
 @router.get("/payments", response_model=List[PaymentResponse])
-async def get_all_payments(db: Session = Depends(get_db)):
+def get_all_payments(db: Session = Depends(get_db)):
     try:
-        payments = get_payments_list(db)
-
-        return [
-            PaymentResponse(
-                payment_id=p.payment_id,
-                order_id=str(p.order_id),
-                amount=float(p.amount),
-                payment_type=p.payment_type_enum.name or 'manual',
-                status=p.status.value,
-                created_at=p.created_at
-            )
-            for p in payments
-        ]
+        return FastJSONResponse(content=list_payment_rows(db))
     except Exception as e:
         logger.error(f"Erro ao buscar pagamentos: {str(e)}")
         raise HTTPException(
@@ -60,13 +49,6 @@ async def confirm_manual_payment(
 
         updated_payment = update_payment_status(db, order_id, PaymentType.manual)
 
-        publish_payment_processed_event({
-            "order_id": str(updated_payment.order_id),
-            "payment_id": str(updated_payment.payment_id),
-            "amount": updated_payment.amount,
-            "status": updated_payment.status
-        })
-
         return PaymentConfirmResponse(
             message="Pagamento confirmado com sucesso.",
             payment_id=updated_payment.payment_id,
@@ -51,9 +51,12 @@ def test_update_payment_status_success():
 
     db_mock.query().filter().first.return_value = mock_payment
 
-    result = update_payment_status(db_mock, "order-id", PaymentStatus.paid)
+    with patch("controllers.enqueue_payment_processed_event") as mock_enqueue:
+        result = update_payment_status(db_mock, "order-id", PaymentStatus.paid)
 
     assert mock_payment.status == PaymentStatus.paid
+    mock_enqueue.assert_called_once()
+    assert mock_enqueue.call_args[0][0] is db_mock
     db_mock.commit.assert_called_once()
 
 def test_get_order_found():
@@ -180,3 +183,33 @@ def test_create_or_get_payment_generic_exception():
 
     db_mock.rollback.assert_called()
 
+
+def test_list_payment_rows_matches_payment_response(client):
+    from datetime import datetime
+    from models import Payment, PaymentTypeModel
+    from schemas import PaymentResponse
+    from controllers import list_payment_rows
+    from tests.conftest import TestingSessionLocal
+
+    db = TestingSessionLocal()
+    try:
+        online = PaymentTypeModel(type_id="type-online-rows", name="online")
+        db.add(online)
+        db.add(Payment(payment_id="pay-rows-1", order_id="order-rows-1", amount=29.9, payment_type_id=online.type_id,
+                       status=PaymentStatus.paid, created_at=datetime(2026, 1, 1, 10, 0, 0)))
+        db.commit()
+
+        rows = {row["payment_id"]: row for row in list_payment_rows(db)}
+        payment = db.get(Payment, "pay-rows-1")
+        expected = PaymentResponse(
+            payment_id=payment.payment_id, order_id=payment.order_id, amount=float(payment.amount),
+            payment_type=payment.payment_type_enum.name, status=payment.status.value, created_at=payment.created_at
+        ).model_dump()
+
+        assert rows["pay-rows-1"] == expected
+    finally:
+        db.rollback()
+        db.query(Payment).filter_by(payment_id="pay-rows-1").delete()
+        db.query(PaymentTypeModel).filter_by(type_id="type-online-rows").delete()
+        db.commit()
+        db.close()
@@ -1,8 +1,14 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from kafka_consumer import process_payment_event
+from kafka_consumer import process_payment_event, process_payment_batch, start_consumer, stop_consumer, process_in_own_session
 from shared.enums import PaymentType, PaymentStatus
 
+@pytest.fixture(autouse=True)
+def mock_dead_letter_router():
+    # Evita criar o producer real ao montar o consumer nos testes de start_consumer
+    with patch("kafka_consumer.DeadLetterRouter") as mock_router:
+        yield mock_router
+
 def test_process_payment_event_online_payment():
     db_mock = MagicMock()
     payment_mock = MagicMock()
@@ -20,12 +26,12 @@ def test_process_payment_event_online_payment():
     }
 
     with patch("kafka_consumer.create_or_get_payment", return_value=payment_mock):
-        with patch("kafka_consumer.publish_payment_processed_event") as mock_publish:
+        with patch("kafka_consumer.enqueue_payment_processed_event") as mock_enqueue:
             process_payment_event(message, db_mock)
 
             db_mock.commit.assert_called_once()
             db_mock.refresh.assert_called_once_with(payment_mock)
-            mock_publish.assert_called_once()
+            mock_enqueue.assert_called_once()
 
 def test_process_payment_event_manual_payment():
     db_mock = MagicMock()
@@ -43,10 +49,10 @@ def test_process_payment_event_manual_payment():
     }
 
     with patch("kafka_consumer.create_or_get_payment", return_value=payment_mock):
-        with patch("kafka_consumer.publish_payment_processed_event") as mock_publish:
+        with patch("kafka_consumer.enqueue_payment_processed_event") as mock_enqueue:
             process_payment_event(message, db_mock)
 
-            mock_publish.assert_not_called()
+            mock_enqueue.assert_not_called()
 
 def test_process_payment_event_missing_fields():
     db_mock = MagicMock()
@@ -89,3 +95,68 @@ def test_process_payment_event_exception():
             process_payment_event(message, db_mock)
 
         db_mock.rollback.assert_called_once()
+
+def test_process_payment_batch_processes_in_order():
+    db_mock = MagicMock()
+    messages = [{"event_type": "orders", "payload": {"n": n}} for n in range(3)]
+
+    with patch("kafka_consumer.process_payment_event") as mock_process:
+        process_payment_batch(messages, db_mock)
+
+    assert [c.args[0]["payload"]["n"] for c in mock_process.call_args_list] == [0, 1, 2]
+
+def test_start_consumer_batch_mode(monkeypatch):
+    monkeypatch.setenv("KAFKA_CONSUMER_BATCH_MODE", "true")
+    db_mock = MagicMock()
+    mock_consumer = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([db_mock])), \
+         patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
+        start_consumer()
+
+    mock_consumer.consume_batches.assert_called_once()
+    assert mock_consumer.consume_batches.call_args.kwargs["topics"] == ["order_created"]
+    mock_consumer.subscribe_and_consume.assert_not_called()
+    db_mock.close.assert_called_once()
+
+def test_start_consumer_parallel_mode(monkeypatch):
+    monkeypatch.setenv("KAFKA_CONSUMER_WORKERS", "4")
+    db_mock = MagicMock()
+    mock_consumer = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([db_mock])), \
+         patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
+        start_consumer()
+
+    mock_consumer.consume_parallel.assert_called_once()
+    assert mock_consumer.consume_parallel.call_args.kwargs["num_workers"] == 4
+    mock_consumer.subscribe_and_consume.assert_not_called()
+
+def test_start_consumer_uses_dead_letter_router(mock_dead_letter_router):
+    db_mock = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([db_mock])), \
+         patch("kafka_consumer.KafkaConsumerWrapper") as mock_consumer_class:
+        start_consumer()
+
+    assert mock_consumer_class.call_args.kwargs["dead_letter"] == mock_dead_letter_router.from_env.return_value
+
+def test_process_in_own_session_closes_session():
+    session = MagicMock()
+    handler = MagicMock()
+
+    with patch("kafka_consumer.SessionLocal", return_value=session):
+        process_in_own_session(handler, {"event_type": "x"})
+
+    handler.assert_called_once_with({"event_type": "x"}, session)
+    session.close.assert_called_once()
+
+def test_stop_consumer_signals_running_consumer():
+    mock_consumer = MagicMock()
+
+    with patch("kafka_consumer.get_db", return_value=iter([MagicMock()])), \
+         patch("kafka_consumer.KafkaConsumerWrapper", return_value=mock_consumer):
+        start_consumer()
+
+    stop_consumer()
+    mock_consumer.stop.assert_called_once()
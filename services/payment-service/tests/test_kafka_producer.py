@@ -1,37 +1,35 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from kafka_producer import publish_payment_processed_event
+from kafka_producer import enqueue_payment_processed_event
+from models import OutboxEvent
+
+def test_enqueue_payment_processed_event_success():
+    db_mock = MagicMock()
 
-@patch("kafka_producer.get_kafka_producer")
-def test_publish_payment_processed_event_success(mock_get_producer):
-    mock_producer = MagicMock()
-    mock_get_producer.return_value = mock_producer
-    
     payment_data = {
         "order_id": "123e4567-e89b-12d3-a456-426614174000",
         "payment_id": "456e7890-e89b-12d3-a456-426614174000",
         "status": "paid"
     }
-    
-    publish_payment_processed_event(payment_data)
-    
-    mock_get_producer.assert_called_once()
-    mock_producer.publish_message.assert_called_once()
-    
-    args, _ = mock_producer.publish_message.call_args
-    assert args[0] == "payment_processed"
-    assert args[1]["event_type"] == "payment"
-    assert args[1]["payload"] == payment_data
-
-@patch("kafka_producer.get_kafka_producer")
+
+    enqueue_payment_processed_event(db_mock, payment_data)
+
+    db_mock.add.assert_called_once()
+    outbox_event = db_mock.add.call_args[0][0]
+    assert isinstance(outbox_event, OutboxEvent)
+    assert outbox_event.topic == "payment_processed"
+    assert outbox_event.payload["event_type"] == "payment"
+    assert outbox_event.payload["payload"] == payment_data
+    assert outbox_event.key == payment_data["order_id"]
+
 @patch("kafka_producer.logger.error")
-def test_publish_payment_processed_event_failure(mock_logger, mock_get_producer):
-    mock_producer = MagicMock()
-    mock_producer.publish_message.side_effect = Exception("Kafka error")
-    mock_get_producer.return_value = mock_producer
-    
+def test_enqueue_payment_processed_event_failure(mock_logger):
+    db_mock = MagicMock()
+    db_mock.add.side_effect = Exception("DB error")
+
     payment_data = {"order_id": "123", "status": "paid"}
-    
-    publish_payment_processed_event(payment_data)
-    
-    mock_logger.assert_called_once_with("Falha crítica ao publicar evento: Kafka error")
\ No newline at end of file
+
+    with pytest.raises(Exception, match="DB error"):
+        enqueue_payment_processed_event(db_mock, payment_data)
+
+    mock_logger.assert_called_once_with("Falha crítica ao registrar evento na outbox: DB error")
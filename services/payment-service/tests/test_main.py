@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from main import app
 
@@ -19,3 +20,20 @@ def test_openapi_endpoint():
     response = client.get("/openapi.json")
     assert response.status_code == 200
     assert "openapi" in response.json()
+
+def test_health_endpoints():
+    """Testa liveness e readiness do serviço"""
+    client = TestClient(app)
+    with patch('main.is_kafka_producer_ready', return_value=False):
+        assert client.get("/health").status_code == 200
+        assert client.get("/health/ready").status_code == 503
+    with patch('main.is_kafka_producer_ready', return_value=True):
+        assert client.get("/health/ready").status_code == 200
+
+def test_metrics_endpoint():
+    """Testa a exposição das métricas no formato Prometheus"""
+    client = TestClient(app)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "kafka_producer_queue_depth" in response.text
@@ -13,8 +13,7 @@ def test_list_payments_empty(client):
 
 @patch("routes.get_order")
 @patch("routes.update_payment_status")
-@patch("routes.publish_payment_processed_event")
-def test_confirm_manual_payment_success(mock_publish, mock_update, mock_get_order, client):
+def test_confirm_manual_payment_success(mock_update, mock_get_order, client):
     mock_order = MagicMock()
     mock_order.payment_type_enum = PaymentType.manual
     mock_get_order.return_value = mock_order
@@ -37,7 +36,6 @@ def test_confirm_manual_payment_success(mock_publish, mock_update, mock_get_orde
 
     mock_get_order.assert_called_once()
     mock_update.assert_called_once()
-    mock_publish.assert_called_once()
 
 @patch("routes.get_order")
 def test_confirm_payment_order_not_found(mock_get_order, client):
@@ -59,17 +57,16 @@ def test_confirm_payment_already_processed(mock_get_order, client):
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert "já foi processado" in response.json()["detail"]
 
-@patch("routes.get_payments_list")
+@patch("routes.list_payment_rows")
 def test_list_payments_with_data(mock_list_payments, client):
-    mock_payment = MagicMock()
-    mock_payment.payment_id = "456e7890-e89b-12d3-a456-426614174000"
-    mock_payment.order_id = "123e4567-e89b-12d3-a456-426614174000"
-    mock_payment.amount = 29.90
-    mock_payment.payment_type_enum = PaymentType.manual
-    mock_payment.status = PaymentStatus.pending
-    mock_payment.created_at = "2024-01-01T10:00:00"
-
-    mock_list_payments.return_value = [mock_payment]
+    mock_list_payments.return_value = [{
+        "payment_id": "456e7890-e89b-12d3-a456-426614174000",
+        "order_id": "123e4567-e89b-12d3-a456-426614174000",
+        "amount": 29.90,
+        "payment_type": "manual",
+        "status": "pending",
+        "created_at": "2024-01-01T10:00:00"
+    }]
 
     response = client.get(f"{API_PREFIX}/payments/")
 
@@ -81,7 +78,7 @@ def test_list_payments_with_data(mock_list_payments, client):
     assert data[0]["status"] == "pending"
 
 def test_list_payments_database_error(client):
-    with patch("routes.get_payments_list") as mock_list:
+    with patch("routes.list_payment_rows") as mock_list:
         mock_list.side_effect = Exception("Database error")
 
         response = client.get(f"{API_PREFIX}/payments/")
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from confluent_kafka import TopicPartition
+from shared.kafka.async_consumer import AsyncKafkaConsumerWrapper
+from shared.kafka.retry import RetryPolicy
+
+def _kafka_message(topic, partition, offset, key, value):
+    msg = MagicMock()
+    msg.error.return_value = None
+    msg.topic.return_value = topic
+    msg.partition.return_value = partition
+    msg.offset.return_value = offset
+    msg.key.return_value = key
+    msg.value.return_value = json.dumps(value).encode()
+    msg.headers.return_value = None
+    return msg
+
+def _consumer_with_messages(messages, **kwargs):
+    with patch('shared.kafka.async_consumer.Consumer') as mock_consumer_class:
+        consumer = AsyncKafkaConsumerWrapper(group_id='test-group', poll_timeout=0.001, **kwargs)
+    pending = iter(messages)
+    mock_consumer = mock_consumer_class.return_value
+    # Sem mensagens, o poll espera o timeout como o librdkafka
+    mock_consumer.poll.side_effect = lambda timeout: next(pending, None) or time.sleep(timeout)
+    return consumer, mock_consumer
+
+@pytest.mark.asyncio
+async def test_async_consumer_preserves_key_order_and_commits_on_cancel():
+    messages = [
+        _kafka_message("order_created", 0, offset, f"order-{offset % 2}".encode(), {"seq": offset})
+        for offset in range(6)
+    ]
+    consumer, mock_consumer = _consumer_with_messages(messages, max_concurrency=4)
+    processed = []
+
+    async def handler(message):
+        # Mensagens mais antigas demoram mais: sem ordenação por key chegariam invertidas
+        await asyncio.sleep(0.01 * (6 - message["seq"]))
+        processed.append(message["seq"])
+
+    task = asyncio.create_task(consumer.consume({"order_created": handler}))
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert [seq for seq in processed if seq % 2 == 0] == [0, 2, 4]
+    assert [seq for seq in processed if seq % 2 == 1] == [1, 3, 5]
+    committed = mock_consumer.commit.call_args.kwargs["offsets"]
+    assert [(tp.partition, tp.offset) for tp in committed] == [(0, 6)]
+    mock_consumer.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_async_consumer_limits_concurrency():
+    messages = [_kafka_message("order_created", 0, offset, f"order-{offset}".encode(), {"seq": offset}) for offset in range(10)]
+    consumer, _ = _consumer_with_messages(messages, max_concurrency=3)
+    running, peak = 0, 0
+
+    async def handler(message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    task = asyncio.create_task(consumer.consume({"order_created": handler}))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert peak == 3
+
+@pytest.mark.asyncio
+async def test_async_consumer_stops_on_handler_failure():
+    messages = [_kafka_message("order_created", 0, offset, b"order-1", {"seq": offset}) for offset in range(3)]
+    consumer, mock_consumer = _consumer_with_messages(messages)
+
+    async def handler(message):
+        if message["seq"] == 1:
+            raise RuntimeError("DB down")
+
+    with pytest.raises(RuntimeError, match="DB down"):
+        await asyncio.wait_for(consumer.consume({"order_created": handler}), timeout=2)
+
+    committed = mock_consumer.commit.call_args.kwargs["offsets"]
+    assert [(tp.partition, tp.offset) for tp in committed] == [(0, 1)]
+
+@pytest.mark.asyncio
+async def test_async_consumer_routes_failures_to_dead_letter_and_keeps_consuming():
+    router = MagicMock()
+    router.policy = RetryPolicy((5,))
+    messages = [_kafka_message("order_created", 0, offset, b"order-1", {"seq": offset}) for offset in range(3)]
+    garbage = _kafka_message("order_created", 0, 3, b"order-1", {})
+    garbage.value.return_value = b"garbage"
+    consumer, mock_consumer = _consumer_with_messages(messages + [garbage], dead_letter=router)
+    processed = []
+
+    async def handler(message):
+        if message["seq"] == 1:
+            raise RuntimeError("DB down")
+        processed.append(message["seq"])
+
+    task = asyncio.create_task(consumer.consume({"order_created": handler}))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert mock_consumer.subscribe.call_args[0][0] == ["order_created", "order_created.retry.1"]
+    assert processed == [0, 2]
+    routed = [(c.args[0].offset(), c.kwargs) for c in router.route.call_args_list]
+    assert routed == [(1, {}), (3, {"retryable": False})]
+    committed = mock_consumer.commit.call_args.kwargs["offsets"]
+    assert [(tp.partition, tp.offset) for tp in committed] == [(0, 4)]
+
+@pytest.mark.asyncio
+async def test_async_consumer_polls_and_closes_off_the_event_loop():
+    consumer, mock_consumer = _consumer_with_messages([])
+    consumer.poll_timeout = 0.05
+    consumer_threads = set()
+
+    def blocking_poll(timeout):
+        consumer_threads.add(threading.get_ident())
+        time.sleep(timeout)
+
+    mock_consumer.poll.side_effect = blocking_poll
+    mock_consumer.close.side_effect = lambda: consumer_threads.add(threading.get_ident())
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticker_task = asyncio.create_task(ticker())
+    task = asyncio.create_task(consumer.consume({"order_created": MagicMock()}))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    ticker_task.cancel()
+
+    # O poll bloqueia em outra thread e o event loop segue atendendo outras tarefas
+    assert len(consumer_threads) == 1
+    assert threading.get_ident() not in consumer_threads
+    assert ticks >= 10
+
+def _revoke_after_first_message(consumer, mock_consumer, message):
+    """poll entrega a mensagem e, na chamada seguinte, revoga a partição como num rebalance"""
+    polls = iter([message, "revoke"])
+    revoke_commits = []
+
+    def poll(timeout):
+        step = next(polls, None)
+        if step == "revoke":
+            on_revoke = mock_consumer.subscribe.call_args.kwargs["on_revoke"]
+            on_revoke(mock_consumer, [TopicPartition("order_created", 0)])
+            revoke_commits.extend(
+                (tp.partition, tp.offset) for c in mock_consumer.commit.call_args_list for tp in c.kwargs["offsets"]
+            )
+            return None
+        if step is None:
+            time.sleep(timeout)
+        return step
+
+    mock_consumer.poll.side_effect = poll
+    return revoke_commits
+
+@pytest.mark.asyncio
+async def test_async_consumer_revoke_waits_for_in_flight_handlers_before_commit():
+    consumer, mock_consumer = _consumer_with_messages([], revoke_timeout=1)
+    revoke_commits = _revoke_after_first_message(
+        consumer, mock_consumer, _kafka_message("order_created", 0, 0, b"order-1", {"seq": 0})
+    )
+
+    async def handler(message):
+        await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(consumer.consume({"order_created": handler}))
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # O handler terminou durante a revogação e o offset foi commitado antes de entregar a partição
+    assert revoke_commits == [(0, 1)]
+
+@pytest.mark.asyncio
+async def test_async_consumer_revoke_wait_is_bounded(caplog):
+    consumer, mock_consumer = _consumer_with_messages([], revoke_timeout=0.05)
+    revoke_commits = _revoke_after_first_message(
+        consumer, mock_consumer, _kafka_message("order_created", 0, 0, b"order-1", {"seq": 0})
+    )
+
+    async def handler(message):
+        await asyncio.sleep(0.5)
+
+    task = asyncio.create_task(consumer.consume({"order_created": handler}))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert revoke_commits == []
+    assert "serão reprocessados pelo novo dono" in caplog.text
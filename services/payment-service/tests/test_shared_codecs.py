@@ -0,0 +1,70 @@
+import json
+import pytest
+from unittest.mock import patch
+from shared.kafka.codecs import (
+    TopicCodecs, CodecError, decode_message, get_codec, parse_topic_codecs,
+    JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE
+)
+from shared.kafka.producer import KafkaProducerWrapper
+
+EVENT = {
+    "event_type": "payment",
+    "payload": {"order_id": "123e4567-e89b-12d3-a456-426614174000", "status": "paid"},
+    "metadata": {"service": "payment-service", "timestamp": "2024-01-01T12:00:00"}
+}
+
+def test_parse_topic_codecs():
+    assert parse_topic_codecs("order_created=orjson, menu_updated=msgpack") == {
+        "order_created": "orjson",
+        "menu_updated": "msgpack"
+    }
+    assert parse_topic_codecs(None) == {}
+
+def test_unknown_codec_falls_back_to_json():
+    assert get_codec("avro").name == "json"
+
+@pytest.mark.parametrize("codec_name", ["json", "orjson", "msgpack"])
+def test_round_trip_per_codec(codec_name):
+    codecs = TopicCodecs({"payment_processed": codec_name})
+
+    value, headers = codecs.encode("payment_processed", EVENT)
+
+    assert dict(headers)['schema-version'] == b'1'
+    assert decode_message(value, headers) == EVENT
+
+def test_codec_selected_per_topic():
+    codecs = TopicCodecs({"menu_updated": "msgpack"})
+
+    _, menu_headers = codecs.encode("menu_updated", EVENT)
+    _, order_headers = codecs.encode("order_created", EVENT)
+
+    assert dict(menu_headers)['content-type'] == MSGPACK_CONTENT_TYPE.encode()
+    assert dict(order_headers)['content-type'] == JSON_CONTENT_TYPE.encode()
+
+def test_decode_legacy_message_without_headers():
+    assert decode_message(json.dumps(EVENT).encode('utf-8'), None) == EVENT
+
+def test_decode_mixed_codecs_on_same_topic():
+    json_value, json_headers = TopicCodecs().encode("t", EVENT)
+    msgpack_value, msgpack_headers = TopicCodecs({"t": "msgpack"}).encode("t", EVENT)
+
+    assert decode_message(json_value, json_headers) == decode_message(msgpack_value, msgpack_headers)
+
+def test_decode_unsupported_content_type():
+    with pytest.raises(CodecError, match="Content-type não suportado"):
+        decode_message(b'...', [('content-type', b'application/avro')])
+
+def test_decode_invalid_payload_raises_codec_error():
+    with pytest.raises(CodecError):
+        decode_message(b'invalid json', [('content-type', b'application/json')])
+
+def test_producer_uses_topic_codec():
+    with patch('shared.kafka.producer.Producer') as mock_producer, \
+         patch('shared.kafka.producer.AdminClient'):
+        producer = KafkaProducerWrapper(codecs=TopicCodecs({"payment_processed": "msgpack"}))
+
+        producer.publish_message("payment_processed", EVENT)
+
+        kwargs = mock_producer.return_value.produce.call_args.kwargs
+        assert decode_message(kwargs['value'], kwargs['headers']) == EVENT
+        assert dict(kwargs['headers'])['content-type'] == MSGPACK_CONTENT_TYPE.encode()
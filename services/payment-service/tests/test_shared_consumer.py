@@ -1,7 +1,7 @@
 import pytest
 import json
 import logging
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, MagicMock, call, ANY
 from confluent_kafka import KafkaException, Consumer
 from shared.kafka.consumer import KafkaConsumerWrapper
 
@@ -21,7 +21,10 @@ def test_consumer_initialization():
             'auto.offset.reset': 'earliest',
             'enable.auto.commit': False,
             'session.timeout.ms': 10000,
-            'heartbeat.interval.ms': 3000
+            'heartbeat.interval.ms': 3000,
+            'partition.assignment.strategy': 'cooperative-sticky',
+            'statistics.interval.ms': 15000,
+            'stats_cb': ANY
         }
 
         mock_consumer_class.assert_called_once_with(expected_conf)
@@ -99,7 +102,8 @@ def test_subscribe_and_consume_success(mock_consumer_class, caplog):
     with pytest.raises(KeyboardInterrupt):
         consumer.subscribe_and_consume(['test-topic'], callback)
 
-    mock_consumer.subscribe.assert_called_once_with(['test-topic'])
+    mock_consumer.subscribe.assert_called_once()
+    assert mock_consumer.subscribe.call_args[0][0] == ['test-topic']
     callback.assert_called_once_with({"test": "data"})
     mock_consumer.commit.assert_called_once_with(asynchronous=False)
     mock_consumer.close.assert_called_once()
@@ -149,7 +153,8 @@ def test_subscribe_and_consume_multiple_success(mock_consumer_class):
     with pytest.raises(KeyboardInterrupt):
         consumer.subscribe_and_consume_multiple(topic_callbacks)
 
-    mock_consumer.subscribe.assert_called_once_with(['topic1', 'topic2'])
+    mock_consumer.subscribe.assert_called_once()
+    assert mock_consumer.subscribe.call_args[0][0] == ['topic1', 'topic2']
     callback1.assert_called_once_with({"data": "test"})
     callback2.assert_not_called()
 
@@ -235,3 +240,65 @@ def test_subscribe_and_consume_poll_timeout(mock_consumer_class):
     # Callback não deve ser chamado quando poll retorna None
     callback.assert_not_called()
     mock_consumer.close.assert_called_once()
+
+def _kafka_message(value, error=None):
+    msg = MagicMock()
+    msg.error.return_value = error
+    msg.value.return_value = value
+    msg.headers.return_value = None
+    return msg
+
+def test_consume_batches_commits_once_per_batch():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+
+    batches = []
+    with patch.object(consumer, '_consumer') as mock_consumer:
+        mock_consumer.consume.side_effect = [
+            [_kafka_message(b'{"n": 1}'), _kafka_message(b'{"n": 2}')],
+            [],
+            [_kafka_message(b'{"n": 3}')],
+            KeyboardInterrupt()
+        ]
+
+        with pytest.raises(KeyboardInterrupt):
+            consumer.consume_batches(['test-topic'], batches.append, max_messages=10, max_wait_ms=50, sync_commit_every=2)
+
+        mock_consumer.consume.assert_any_call(num_messages=10, timeout=0.05)
+        assert batches == [[{"n": 1}, {"n": 2}], [{"n": 3}]]
+        # Um commit por lote (assíncrono, síncrono no 2º) + commit final síncrono
+        assert mock_consumer.commit.call_args_list == [
+            call(asynchronous=True), call(asynchronous=False), call(asynchronous=False)
+        ]
+        mock_consumer.close.assert_called_once()
+
+def test_consume_batches_skips_invalid_messages(caplog):
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+
+    batches = []
+    with patch.object(consumer, '_consumer') as mock_consumer:
+        mock_consumer.consume.side_effect = [
+            [_kafka_message(b'invalid json'), _kafka_message(None, error="Partition EOF"), _kafka_message(b'{"n": 1}')],
+            KeyboardInterrupt()
+        ]
+
+        with pytest.raises(KeyboardInterrupt):
+            consumer.consume_batches(['test-topic'], batches.append)
+
+    assert batches == [[{"n": 1}]]
+    assert "Erro ao decodificar mensagem" in caplog.text
+    assert "Lote processado: 1/3 mensagem(ns)" in caplog.text
+
+def test_consume_batches_does_not_commit_failed_batch():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+
+    with patch.object(consumer, '_consumer') as mock_consumer:
+        mock_consumer.consume.side_effect = [[_kafka_message(b'{"n": 1}')]]
+
+        with pytest.raises(RuntimeError):
+            consumer.consume_batches(['test-topic'], MagicMock(side_effect=RuntimeError("DB down")))
+
+        mock_consumer.commit.assert_not_called()
+        mock_consumer.close.assert_called_once()
@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import ProcessedEvent
+from shared.kafka.dedup import DbInbox, RedisDedupStore, event_id_of
+from kafka_consumer import process_payment_event
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[ProcessedEvent.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def test_event_id_of():
+    assert event_id_of({"metadata": {"event_id": "evt-1"}}) == "evt-1"
+    assert event_id_of({"event_type": "orders"}) is None
+
+def test_db_inbox_marks_in_handler_transaction(db):
+    inbox = DbInbox(ProcessedEvent)
+
+    assert inbox.seen(db, "evt-1") is False
+    inbox.mark(db, "evt-1", topic="order_created")
+    db.rollback()
+    # Sem commit do handler o evento continua pendente
+    assert inbox.seen(db, "evt-1") is False
+
+    inbox.mark(db, "evt-1", topic="order_created")
+    db.commit()
+    assert inbox.seen(db, "evt-1") is True
+    assert inbox.seen(db, None) is False
+
+def test_db_inbox_purge_removes_expired_rows(db):
+    inbox = DbInbox(ProcessedEvent, retention=timedelta(days=1))
+    db.add(ProcessedEvent(event_id="old", processed_at=datetime.utcnow() - timedelta(days=2)))
+    db.add(ProcessedEvent(event_id="recent"))
+    db.commit()
+
+    assert inbox.purge(db) == 1
+    db.commit()
+    assert inbox.seen(db, "old") is False
+    assert inbox.seen(db, "recent") is True
+
+def test_redis_dedup_store_uses_ttl_and_tolerates_failures():
+    client = MagicMock()
+    client.exists.return_value = 1
+    store = RedisDedupStore(client, prefix="order-group", ttl_seconds=60)
+
+    assert store.seen("evt-1") is True
+    client.exists.assert_called_once_with("dedup:order-group:evt-1")
+    store.mark("evt-1")
+    client.set.assert_called_once_with("dedup:order-group:evt-1", 1, ex=60)
+
+    client.exists.side_effect = ConnectionError("redis down")
+    assert store.seen("evt-2") is False
+
+def test_process_payment_event_skips_event_in_inbox():
+    db_mock = MagicMock()
+    message = {"event_type": "orders", "payload": {"order_id": "1", "total_price": 10},
+               "metadata": {"event_id": "evt-1"}}
+
+    with patch("kafka_consumer.inbox") as mock_inbox, \
+         patch("kafka_consumer.create_or_get_payment") as mock_create:
+        mock_inbox.seen.return_value = True
+        process_payment_event(message, db_mock)
+
+    mock_create.assert_not_called()
+    db_mock.commit.assert_not_called()
@@ -0,0 +1,53 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from prometheus_client import REGISTRY
+from confluent_kafka import TopicPartition
+from shared.kafka.metrics import forget_partitions, observe_delivery, observe_handler, record_consumer_stats
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_record_consumer_stats_sets_lag_per_partition():
+    stats = {'topics': {'order_created': {'partitions': {
+        '0': {'consumer_lag': 42}, '1': {'consumer_lag': -1}, '-1': {'consumer_lag': 7},
+    }}}}
+
+    record_consumer_stats('metrics-group', json.dumps(stats))
+
+    assert _sample('kafka_consumer_lag', group='metrics-group', topic='order_created', partition='0') == 42
+    assert REGISTRY.get_sample_value(
+        'kafka_consumer_lag', {'group': 'metrics-group', 'topic': 'order_created', 'partition': '1'}
+    ) is None
+
+    forget_partitions('metrics-group', [TopicPartition('order_created', 0)])
+    assert REGISTRY.get_sample_value(
+        'kafka_consumer_lag', {'group': 'metrics-group', 'topic': 'order_created', 'partition': '0'}
+    ) is None
+
+def test_observe_handler_counts_messages_and_failures():
+    labels = dict(group='metrics-group', topic='payment_processed')
+    before = _sample('kafka_consumer_messages_total', **labels)
+    failures_before = _sample('kafka_consumer_failures_total', **labels)
+
+    observe_handler('metrics-group', 'payment_processed', lambda data: None, {})
+    with pytest.raises(ValueError):
+        observe_handler('metrics-group', 'payment_processed', MagicMock(side_effect=ValueError("boom")), {})
+
+    assert _sample('kafka_consumer_messages_total', **labels) == before + 2
+    assert _sample('kafka_consumer_failures_total', **labels) == failures_before + 1
+    assert _sample('kafka_consumer_handler_seconds_count', **labels) >= 2
+
+def test_observe_delivery_records_latency_and_errors():
+    msg = MagicMock()
+    msg.topic.return_value = 'metrics-topic'
+    msg.latency.return_value = 0.02
+    delivered_before = _sample('kafka_producer_messages_total', topic='metrics-topic')
+    errors_before = _sample('kafka_producer_delivery_errors_total', topic='metrics-topic')
+
+    observe_delivery(None, msg)
+    observe_delivery("Broker: timed out", msg)
+
+    assert _sample('kafka_producer_messages_total', topic='metrics-topic') == delivered_before + 1
+    assert _sample('kafka_producer_delivery_errors_total', topic='metrics-topic') == errors_before + 1
+    assert _sample('kafka_producer_delivery_seconds_sum', topic='metrics-topic') >= 0.02
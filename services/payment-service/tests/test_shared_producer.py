@@ -4,7 +4,8 @@ import time
 import logging
 from unittest.mock import patch, MagicMock, call
 from confluent_kafka import KafkaException
-from shared.kafka.producer import KafkaProducerWrapper, get_kafka_producer, _kafka_producer
+import threading
+from shared.kafka.producer import KafkaProducerWrapper, get_kafka_producer, is_kafka_producer_ready, shutdown_kafka_producer, _kafka_producer
 
 @pytest.fixture
 def mock_producer_and_admin():
@@ -80,7 +81,9 @@ def test_publish_message_success(mock_producer_and_admin):
     expected_value = json.dumps(message).encode('utf-8')
     mock_producer_instance.produce.assert_called_once_with(
         topic="test-topic",
+        key=None,
         value=expected_value,
+        headers=[('content-type', b'application/json'), ('schema-version', b'1')],
         on_delivery=producer._delivery_report
     )
     mock_producer_instance.flush.assert_called_once_with(timeout=10)
@@ -159,3 +162,180 @@ def test_get_kafka_producer_existing_instance():
             producer = get_kafka_producer()
             assert producer == existing_instance
             mock_wrapper.assert_not_called()
+
+def test_async_mode_configures_batching(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+
+    producer = KafkaProducerWrapper(bootstrap_servers='localhost:9092', async_mode=True, linger_ms=50)
+
+    conf = mock_producer.call_args[0][0]
+    assert conf['linger.ms'] == 50
+    assert conf['enable.idempotence'] is True
+    assert producer._poll_thread.is_alive()
+
+    producer.close(timeout=1)
+    assert not producer._poll_thread.is_alive()
+
+def test_async_publish_returns_future_without_flush(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+
+    producer = KafkaProducerWrapper(async_mode=True)
+    future = producer.publish_message("test-topic", {"test": "data"})
+
+    mock_producer_instance.flush.assert_not_called()
+    assert not future.done()
+
+    # Simula o delivery report disparado pela thread de poll
+    on_delivery = mock_producer_instance.produce.call_args.kwargs['on_delivery']
+    delivered_msg = MagicMock()
+    on_delivery(None, delivered_msg)
+
+    assert future.result(timeout=1) is delivered_msg
+    producer.close(timeout=1)
+
+def test_async_publish_delivery_failure_sets_exception(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+
+    producer = KafkaProducerWrapper(async_mode=True)
+    future = producer.publish_message("test-topic", {"test": "data"})
+
+    on_delivery = mock_producer_instance.produce.call_args.kwargs['on_delivery']
+    on_delivery("Broker indisponível", None)
+
+    with pytest.raises(KafkaException):
+        future.result(timeout=1)
+    producer.close(timeout=1)
+
+def test_async_publish_retries_when_queue_full(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+    mock_producer_instance.produce.side_effect = [BufferError("Queue full"), None]
+
+    producer = KafkaProducerWrapper(async_mode=True)
+    producer.publish_message("test-topic", {"test": "data"})
+
+    assert mock_producer_instance.produce.call_count == 2
+    mock_producer_instance.poll.assert_any_call(1)
+    producer.close(timeout=1)
+
+def test_shutdown_kafka_producer_flushes_singleton():
+    existing_instance = MagicMock()
+
+    with patch('shared.kafka.producer._kafka_producer', existing_instance):
+        shutdown_kafka_producer(timeout=3)
+
+    existing_instance.close.assert_called_once_with(timeout=3)
+
+def test_publish_batch_single_flush(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+    mock_producer_instance.flush.return_value = 0
+
+    producer = KafkaProducerWrapper()
+    producer.publish_batch([("topic-a", {"n": 1}), ("topic-b", {"n": 2})])
+
+    assert mock_producer_instance.produce.call_count == 2
+    mock_producer_instance.flush.assert_called_once_with(timeout=10)
+
+def test_publish_batch_raises_on_delivery_failure(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+
+    def fail_delivery(timeout):
+        on_delivery = mock_producer_instance.produce.call_args.kwargs['on_delivery']
+        on_delivery("Broker indisponível", None)
+        return 0
+
+    mock_producer_instance.flush.side_effect = fail_delivery
+
+    producer = KafkaProducerWrapper()
+
+    with pytest.raises(KafkaException, match="Lote incompleto"):
+        producer.publish_batch([("topic-a", {"n": 1})])
+
+def test_publish_raw_batch_single_flush(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+    mock_producer_instance.flush.return_value = 0
+
+    producer = KafkaProducerWrapper()
+    producer.publish_raw_batch([("topic-a", b'{"n": 1}', b"k1", None), ("topic-b", b'{"n": 2}', "k2", [("h", b"v")])])
+
+    assert mock_producer_instance.produce.call_count == 2
+    assert mock_producer_instance.produce.call_args.kwargs["key"] == b"k2"
+    mock_producer_instance.flush.assert_called_once_with(timeout=10)
+
+def test_publish_raw_batch_raises_on_pending_messages(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer.return_value.flush.return_value = 1
+
+    producer = KafkaProducerWrapper()
+
+    with pytest.raises(KafkaException, match="1 pendente"):
+        producer.publish_raw_batch([("topic-a", b"{}", None, None)])
+
+def test_lazy_initialization_does_not_probe(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+
+    producer = KafkaProducerWrapper(connect=False)
+
+    mock_producer.assert_called_once()
+    mock_admin.assert_not_called()
+    assert not producer.is_ready
+
+def test_warm_up_sets_ready_in_background(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_admin.return_value.list_topics.side_effect = [KafkaException("Broker indisponível"), MagicMock()]
+
+    producer = KafkaProducerWrapper(connect=False, retry_delay=0)
+    producer.warm_up()
+    producer._warmup_thread.join(timeout=2)
+
+    assert producer.is_ready
+    assert mock_admin.return_value.list_topics.call_count == 2
+    producer.close(timeout=1)
+
+def test_get_kafka_producer_concurrent_calls_create_single_instance():
+    with patch('shared.kafka.producer._kafka_producer', None), \
+         patch('shared.kafka.producer.KafkaProducerWrapper') as mock_wrapper:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_kafka_producer())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_wrapper.assert_called_once()
+        assert mock_wrapper.call_args.kwargs['connect'] is False
+        mock_wrapper.return_value.warm_up.assert_called_once()
+        assert all(result is mock_wrapper.return_value for result in results)
+
+def test_is_kafka_producer_ready():
+    with patch('shared.kafka.producer._kafka_producer', None):
+        assert is_kafka_producer_ready() is False
+
+    existing_instance = MagicMock(is_ready=True)
+    with patch('shared.kafka.producer._kafka_producer', existing_instance):
+        assert is_kafka_producer_ready() is True
+
+def test_publish_message_with_key(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+
+    producer = KafkaProducerWrapper()
+    producer.publish_message("test-topic", {"test": "data"}, key="order-1")
+
+    assert mock_producer_instance.produce.call_args.kwargs['key'] == b"order-1"
+
+def test_publish_batch_with_keys(mock_producer_and_admin):
+    mock_producer, mock_admin = mock_producer_and_admin
+    mock_producer_instance = mock_producer.return_value
+    mock_producer_instance.flush.return_value = 0
+
+    producer = KafkaProducerWrapper()
+    producer.publish_batch([("topic-a", {"n": 1}, "order-1"), ("topic-a", {"n": 2}, None), ("topic-b", {"n": 3})])
+
+    keys = [c.kwargs['key'] for c in mock_producer_instance.produce.call_args_list]
+    assert keys == [b"order-1", None, None]
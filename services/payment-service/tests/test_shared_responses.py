@@ -0,0 +1,37 @@
+import json
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+from shared import responses
+from shared.enums import PaymentStatus
+from shared.responses import FastJSONResponse, dumps
+
+CONTENT = [{
+    "id": uuid.UUID("123e4567-e89b-12d3-a456-426614174000"),
+    "status": PaymentStatus.paid,
+    "amount": 29.9,
+    "created_at": datetime(2026, 1, 1, 10, 0, 0, 123456),
+    "name": "Pão de queijo"
+}]
+
+EXPECTED = [{
+    "id": "123e4567-e89b-12d3-a456-426614174000",
+    "status": "paid",
+    "amount": 29.9,
+    "created_at": "2026-01-01T10:00:00.123456",
+    "name": "Pão de queijo"
+}]
+
+def test_dumps_with_orjson():
+    assert json.loads(dumps(CONTENT)) == EXPECTED
+
+def test_dumps_stdlib_fallback_has_same_output():
+    with patch.object(responses, "orjson", None):
+        assert json.loads(dumps(CONTENT)) == EXPECTED
+
+def test_fast_json_response_renders_bytes():
+    response = FastJSONResponse(content=CONTENT, headers={"X-Next-Cursor": "abc"})
+
+    assert json.loads(response.body) == EXPECTED
+    assert response.media_type == "application/json"
+    assert response.headers["x-next-cursor"] == "abc"
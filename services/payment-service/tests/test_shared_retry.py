@@ -0,0 +1,238 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from shared.kafka.consumer import KafkaConsumerWrapper
+from shared.kafka.retry import DeadLetterRouter, RetryPolicy, header_value, parse_delays, strip_routing_headers
+from shared.kafka import dlq
+
+def _kafka_message(value, topic='payment_processed', partition=2, offset=41, key=b'order-1', headers=None):
+    msg = MagicMock()
+    msg.error.return_value = None
+    msg.value.return_value = value
+    msg.topic.return_value = topic
+    msg.partition.return_value = partition
+    msg.offset.return_value = offset
+    msg.key.return_value = key
+    msg.headers.return_value = headers
+    return msg
+
+def _published_headers(producer):
+    return dict(producer.publish_raw.call_args.kwargs['headers'])
+
+def test_retry_policy_topics():
+    policy = RetryPolicy((5, 30))
+
+    assert policy.retry_topics('order_created') == ['order_created.retry.1', 'order_created.retry.2']
+    assert policy.dlq_topic('order_created') == 'order_created.dlq'
+    assert policy.base_topic('order_created.retry.2') == 'order_created'
+    assert policy.expand(['a', 'b']) == ['a', 'a.retry.1', 'a.retry.2', 'b', 'b.retry.1', 'b.retry.2']
+    assert parse_delays('5, 30,300') == (5, 30, 300)
+
+def test_route_first_failure_goes_to_first_retry_tier():
+    producer = MagicMock()
+    router = DeadLetterRouter(producer, RetryPolicy((5, 30)))
+    msg = _kafka_message(b'{"order_id": 1}', headers=[('content-type', b'application/json')])
+
+    target = router.route(msg, ValueError("boom"))
+
+    assert target == 'payment_processed.retry.1'
+    args = producer.publish_raw.call_args
+    assert args.args == ('payment_processed.retry.1', b'{"order_id": 1}')
+    assert args.kwargs['key'] == b'order-1'
+    headers = _published_headers(producer)
+    assert headers['content-type'] == b'application/json'
+    assert headers['x-original-topic'] == b'payment_processed'
+    assert headers['x-original-partition'] == b'2'
+    assert headers['x-original-offset'] == b'41'
+    assert headers['x-retry-attempt'] == b'1'
+    assert headers['x-error'] == b'boom'
+    assert headers['x-error-type'] == b'ValueError'
+    assert int(headers['x-retry-not-before']) >= int(time.time() * 1000)
+
+def test_route_after_last_tier_goes_to_dlq():
+    producer = MagicMock()
+    router = DeadLetterRouter(producer, RetryPolicy((5, 30)))
+    msg = _kafka_message(b'{}', topic='payment_processed.retry.2', offset=3, headers=[
+        ('x-original-topic', b'payment_processed'), ('x-original-offset', b'41'), ('x-retry-attempt', b'2'),
+    ])
+
+    assert router.route(msg, RuntimeError("still failing")) == 'payment_processed.dlq'
+    headers = _published_headers(producer)
+    assert headers['x-retry-attempt'] == b'3'
+    assert headers['x-original-offset'] == b'41'
+    assert 'x-retry-not-before' not in headers
+
+def test_route_non_retryable_goes_straight_to_dlq():
+    producer = MagicMock()
+    router = DeadLetterRouter(producer)
+
+    assert router.route(_kafka_message(b'garbage'), ValueError("bad"), retryable=False) == 'payment_processed.dlq'
+
+def test_from_env_disabled():
+    with patch.dict('os.environ', {'KAFKA_DLQ_ENABLED': 'false'}):
+        assert DeadLetterRouter.from_env() is None
+
+def test_process_routes_handler_failure_and_commits():
+    router = MagicMock()
+    router.policy = RetryPolicy((5,))
+    with patch('shared.kafka.consumer.Consumer') as mock_consumer_class:
+        mock_consumer = MagicMock()
+        mock_consumer_class.return_value = mock_consumer
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+
+    mock_consumer.poll.side_effect = [_kafka_message(b'{"n": 1}'), KeyboardInterrupt()]
+    callback = MagicMock(side_effect=ValueError("DB down"))
+
+    with pytest.raises(KeyboardInterrupt):
+        consumer.subscribe_and_consume(['payment_processed'], callback)
+
+    assert mock_consumer.subscribe.call_args[0][0] == ['payment_processed', 'payment_processed.retry.1']
+    router.route.assert_called_once()
+    assert str(router.route.call_args.args[1]) == "DB down"
+    mock_consumer.commit.assert_called_once_with(asynchronous=False)
+
+def test_process_sends_undecodable_message_to_dlq():
+    router = MagicMock()
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+    callback = MagicMock()
+
+    consumer._process(_kafka_message(b'invalid json'), callback)
+
+    callback.assert_not_called()
+    assert router.route.call_args.kwargs == {'retryable': False}
+
+def test_retry_message_before_deadline_pauses_partition():
+    router = DeadLetterRouter(MagicMock(), RetryPolicy((5,)))
+    with patch('shared.kafka.consumer.Consumer') as mock_consumer_class:
+        mock_consumer = MagicMock()
+        mock_consumer_class.return_value = mock_consumer
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+
+    not_before = str(int((time.time() + 60) * 1000)).encode()
+    msg = _kafka_message(b'{}', topic='payment_processed.retry.1', offset=7,
+                         headers=[('x-retry-not-before', not_before)])
+
+    assert consumer._defer_if_not_due(msg) is True
+    paused = mock_consumer.pause.call_args.args[0][0]
+    assert (paused.topic, paused.partition, paused.offset) == ('payment_processed.retry.1', 2, 7)
+    mock_consumer.seek.assert_called_once()
+
+    consumer._paused[('payment_processed.retry.1', 2)] = time.monotonic() - 1
+    consumer._resume_due_partitions()
+    mock_consumer.resume.assert_called_once()
+    assert consumer._paused == {}
+
+def test_retry_message_past_deadline_is_processed():
+    router = DeadLetterRouter(MagicMock(), RetryPolicy((5,)))
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+
+    msg = _kafka_message(b'{}', topic='payment_processed.retry.1',
+                         headers=[('x-retry-not-before', str(int(time.time() * 1000) - 1000).encode())])
+
+    assert consumer._defer_if_not_due(msg) is False
+
+def test_redrive_republishes_original_message_without_routing_headers():
+    msg = _kafka_message(b'{"order_id": 1}', topic='payment_processed.dlq', headers=[
+        ('content-type', b'application/json'), ('x-original-topic', b'payment_processed'), ('x-error', b'boom'),
+    ])
+    with patch('shared.kafka.dlq._dlq_consumer') as mock_dlq_consumer, \
+         patch('shared.kafka.dlq.KafkaProducerWrapper') as mock_producer_class, \
+         patch('shared.kafka.dlq.iter_dlq', return_value=iter([msg])):
+        count = dlq.redrive('payment_processed.dlq', limit=None)
+
+    assert count == 1
+    producer = mock_producer_class.return_value
+    producer.publish_raw_batch.assert_called_once_with(
+        [('payment_processed', b'{"order_id": 1}', b'order-1', [('content-type', b'application/json')])]
+    )
+    mock_dlq_consumer.return_value.commit.assert_called_once_with(asynchronous=False)
+    producer.close.assert_called_once()
+
+def test_redrive_flushes_and_commits_once_per_batch():
+    msgs = [
+        _kafka_message(f'{{"n": {n}}}'.encode(), topic='payment_processed.dlq', offset=n,
+                       headers=[('x-original-topic', b'payment_processed')])
+        for n in range(5)
+    ]
+    with patch('shared.kafka.dlq._dlq_consumer') as mock_dlq_consumer, \
+         patch('shared.kafka.dlq.KafkaProducerWrapper') as mock_producer_class, \
+         patch('shared.kafka.dlq.iter_dlq', return_value=iter(msgs)):
+        count = dlq.redrive('payment_processed.dlq', limit=None, batch_size=2)
+
+    assert count == 5
+    producer = mock_producer_class.return_value
+    assert [len(c.args[0]) for c in producer.publish_raw_batch.call_args_list] == [2, 2, 1]
+    producer.publish_raw.assert_not_called()
+    assert mock_dlq_consumer.return_value.commit.call_count == 3
+
+def test_redrive_does_not_commit_failed_batch():
+    msgs = [_kafka_message(b'{}', topic='payment_processed.dlq', offset=n) for n in range(3)]
+    with patch('shared.kafka.dlq._dlq_consumer') as mock_dlq_consumer, \
+         patch('shared.kafka.dlq.KafkaProducerWrapper') as mock_producer_class, \
+         patch('shared.kafka.dlq.iter_dlq', return_value=iter(msgs)):
+        mock_producer_class.return_value.publish_raw_batch.side_effect = RuntimeError("broker fora")
+        with pytest.raises(RuntimeError):
+            dlq.redrive('payment_processed.dlq', limit=None)
+
+    mock_dlq_consumer.return_value.commit.assert_not_called()
+
+def test_consume_batches_routes_undecodable_and_failing_messages():
+    router = MagicMock()
+    router.policy = RetryPolicy((5,))
+    with patch('shared.kafka.consumer.Consumer') as mock_consumer_class:
+        mock_consumer = MagicMock()
+        mock_consumer_class.return_value = mock_consumer
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+
+    poison = _kafka_message(b'{"n": 2}', offset=2)
+    mock_consumer.consume.side_effect = [
+        [_kafka_message(b'{"n": 1}', offset=1), poison, _kafka_message(b'garbage', offset=3),
+         _kafka_message(b'{"n": 4}', offset=4)],
+        KeyboardInterrupt()
+    ]
+    calls = []
+
+    def batch_callback(messages):
+        calls.append([m["n"] for m in messages])
+        if any(m["n"] == 2 for m in messages):
+            raise ValueError("DB down")
+
+    with pytest.raises(KeyboardInterrupt):
+        consumer.consume_batches(['payment_processed'], batch_callback)
+
+    assert mock_consumer.subscribe.call_args[0][0] == ['payment_processed', 'payment_processed.retry.1']
+    # Lote falhou: refeito uma a uma, só a mensagem com problema segue para o retry
+    assert calls == [[1, 2, 4], [1], [2], [4]]
+    routed = [(c.args[0].offset(), c.kwargs) for c in router.route.call_args_list]
+    assert routed == [(3, {'retryable': False}), (2, {})]
+    assert str(router.route.call_args.args[1]) == "DB down"
+    mock_consumer.commit.assert_called()
+
+def test_consume_batches_defers_retry_partition_until_due():
+    router = DeadLetterRouter(MagicMock(), RetryPolicy((5,)))
+    with patch('shared.kafka.consumer.Consumer') as mock_consumer_class:
+        mock_consumer = MagicMock()
+        mock_consumer_class.return_value = mock_consumer
+        consumer = KafkaConsumerWrapper(group_id='test-group', dead_letter=router)
+
+    not_before = [('x-retry-not-before', str(int((time.time() + 60) * 1000)).encode())]
+    msgs = [
+        _kafka_message(b'{"n": 1}', topic='payment_processed.retry.1', offset=7, headers=not_before),
+        _kafka_message(b'{"n": 2}', topic='payment_processed.retry.1', offset=8, headers=not_before),
+        _kafka_message(b'{"n": 3}', offset=9),
+    ]
+
+    batch = consumer._decode_batch(msgs)
+
+    assert [message_data for _, message_data in batch] == [{"n": 3}]
+    mock_consumer.pause.assert_called_once()
+    assert ('payment_processed.retry.1', 2) in consumer._paused
+
+def test_strip_routing_headers_and_header_value():
+    headers = [('x-error', b'boom'), ('trace', b'abc')]
+
+    assert strip_routing_headers(headers) == [('trace', b'abc')]
+    assert header_value(headers, 'x-error') == 'boom'
+    assert header_value(None, 'x-error') is None
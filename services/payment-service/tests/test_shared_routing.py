@@ -0,0 +1,86 @@
+from unittest.mock import patch, MagicMock
+from shared.kafka.codecs import TopicCodecs
+from shared.kafka.consumer import KafkaConsumerWrapper
+from shared.kafka.routing import EventRouter, should_decode
+from shared.kafka.workers import OffsetTracker
+
+def _kafka_message(value, event_type=None, topic='order_created', offset=0):
+    msg = MagicMock()
+    msg.error.return_value = None
+    msg.value.return_value = value
+    msg.topic.return_value = topic
+    msg.partition.return_value = 0
+    msg.offset.return_value = offset
+    msg.key.return_value = b'order-1'
+    msg.headers.return_value = [('event-type', event_type.encode())] if event_type else None
+    return msg
+
+def test_encode_adds_event_type_and_service_headers():
+    _, headers = TopicCodecs().encode('order_created', {
+        'event_type': 'orders', 'payload': {}, 'metadata': {'service': 'order-service'}
+    })
+
+    assert dict(headers)['event-type'] == b'orders'
+    assert dict(headers)['source-service'] == b'order-service'
+
+def test_event_router_accepts_by_header_and_routes_by_envelope():
+    handler = MagicMock()
+    router = EventRouter({'orders': handler})
+
+    assert router.accepts([('event-type', b'orders')]) is True
+    assert router.accepts([('event-type', b'refund')]) is False
+    # Mensagens legadas, sem header, precisam ser decodificadas
+    assert router.accepts(None) is True
+
+    router({'event_type': 'refund'})
+    handler.assert_not_called()
+    router({'event_type': 'orders'})
+    handler.assert_called_once_with({'event_type': 'orders'})
+
+    assert should_decode(None, None) is False
+    assert should_decode(lambda msg: None, [('event-type', b'refund')]) is True
+
+def test_process_skips_unrouted_event_without_decoding():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+    handler = MagicMock()
+
+    with patch('shared.kafka.consumer.decode_message') as mock_decode:
+        consumer._process(_kafka_message(b'not even json', event_type='refund'), EventRouter({'orders': handler}))
+
+    mock_decode.assert_not_called()
+    handler.assert_not_called()
+
+def test_process_routes_registered_event():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+    handler = MagicMock()
+
+    consumer._process(_kafka_message(b'{"event_type": "orders"}', event_type='orders'), EventRouter({'orders': handler}))
+
+    handler.assert_called_once_with({'event_type': 'orders'})
+
+def test_decode_batch_filters_by_event_type_header():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+    msgs = [
+        _kafka_message(b'{"event_type": "orders"}', event_type='orders'),
+        _kafka_message(b'garbage', event_type='refund'),
+        _kafka_message(b'{"event_type": "orders", "legacy": true}'),
+    ]
+
+    batch = consumer._decode_batch(msgs, event_types={'orders'})
+
+    assert [message_data for _, message_data in batch] == [{'event_type': 'orders'}, {'event_type': 'orders', 'legacy': True}]
+
+def test_dispatch_completes_skipped_offsets():
+    with patch('shared.kafka.consumer.Consumer'):
+        consumer = KafkaConsumerWrapper(group_id='test-group')
+    tracker = OffsetTracker()
+    pool = MagicMock()
+
+    consumer._dispatch(_kafka_message(b'garbage', event_type='refund', offset=5),
+                       {'order_created': EventRouter({'orders': MagicMock()})}, pool, tracker)
+
+    pool.submit.assert_not_called()
+    assert tracker.pop_committable() == {('order_created', 0): 6}
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import MagicMock
+from confluent_kafka import KafkaException
+from shared.kafka.topic_manager import TopicManager, TopicSpec, load_spec, parse_spec
+
+def _future(result=None, error=None):
+    future = MagicMock()
+    if error:
+        future.result.side_effect = error
+    else:
+        future.result.return_value = result
+    return future
+
+def _admin(existing_partitions, configs):
+    admin = MagicMock()
+    admin.list_topics.return_value.topics = {
+        name: MagicMock(partitions={i: None for i in range(count)}) for name, count in existing_partitions.items()
+    }
+
+    def describe_configs(resources):
+        return {
+            resource: _future({key: MagicMock(value=value) for key, value in configs.get(resource.name, {}).items()})
+            for resource in resources
+        }
+    admin.describe_configs.side_effect = describe_configs
+    admin.create_topics.side_effect = lambda topics: {t.topic: _future() for t in topics}
+    admin.create_partitions.side_effect = lambda parts: {p.topic: _future() for p in parts}
+    admin.incremental_alter_configs.side_effect = lambda resources: {r: _future() for r in resources}
+    return admin
+
+def test_parse_spec_expands_retry_and_dlq_topics():
+    specs = parse_spec({
+        'replication_factor': 3,
+        'topics': {'order_created': {'partitions': 6, 'configs': {'retention.ms': 3600000}}},
+        'dead_letter': {'topics': ['order_created'], 'retry_tiers': 2, 'dlq_partitions': 1,
+                        'retry_configs': {'retention.ms': '86400000'}},
+    })
+
+    assert sorted(specs) == ['order_created', 'order_created.dlq', 'order_created.retry.1', 'order_created.retry.2']
+    assert specs['order_created'].configs == {'retention.ms': '3600000'}
+    assert specs['order_created.retry.2'].partitions == 6
+    assert specs['order_created.dlq'].partitions == 1
+
+def test_bundled_spec_is_valid():
+    specs = load_spec()
+
+    assert specs['order_created'].partitions == 6
+    assert 'payment_processed.dlq' in specs
+
+def test_plan_diffs_partitions_and_configs():
+    admin = _admin(
+        existing_partitions={'order_created': 1, 'menu_updated': 5},
+        configs={'order_created': {'retention.ms': '604800000', 'cleanup.policy': 'delete'},
+                 'menu_updated': {'retention.ms': '86400000'}},
+    )
+    specs = {
+        'order_created': TopicSpec('order_created', 6, 3, {'retention.ms': '3600000', 'cleanup.policy': 'delete'}),
+        'menu_updated': TopicSpec('menu_updated', 3, 3, {'retention.ms': '86400000'}),
+        'order_ready': TopicSpec('order_ready', 3, 3),
+    }
+
+    plan = TopicManager(admin=admin).plan(specs)
+
+    assert [t.name for t in plan.create] == ['order_ready']
+    assert plan.partitions == {'order_created': (1, 6)}
+    assert plan.configs == {'order_created': {'retention.ms': ('604800000', '3600000')}}
+    assert any('não é possível reduzir' in warning for warning in plan.warnings)
+
+def test_dry_run_does_not_touch_cluster():
+    admin = _admin(existing_partitions={'order_created': 1}, configs={'order_created': {}})
+
+    TopicManager(admin=admin).reconcile({'order_created': TopicSpec('order_created', 6, 3)}, dry_run=True)
+
+    admin.create_partitions.assert_not_called()
+    admin.create_topics.assert_not_called()
+
+def test_apply_creates_grows_and_alters_incrementally():
+    admin = _admin(existing_partitions={'order_created': 1}, configs={'order_created': {'retention.ms': '1'}})
+    specs = {
+        'order_created': TopicSpec('order_created', 6, 3, {'retention.ms': '3600000'}),
+        'order_ready': TopicSpec('order_ready', 3, 3, {'retention.ms': '600000'}),
+    }
+
+    TopicManager(admin=admin).reconcile(specs)
+
+    new_topic = admin.create_topics.call_args.args[0][0]
+    assert (new_topic.topic, new_topic.num_partitions, new_topic.replication_factor) == ('order_ready', 3, 3)
+    new_partitions = admin.create_partitions.call_args.args[0][0]
+    assert (new_partitions.topic, new_partitions.new_total_count) == ('order_created', 6)
+    resource = admin.incremental_alter_configs.call_args.args[0][0]
+    assert resource.name == 'order_created'
+    assert [(entry.name, entry.value) for entry in resource.incremental_configs] == [('retention.ms', '3600000')]
+
+def test_apply_raises_on_failed_operation():
+    admin = _admin(existing_partitions={}, configs={})
+    admin.create_topics.side_effect = lambda topics: {
+        t.topic: _future(error=KafkaException("INVALID_REPLICATION_FACTOR")) for t in topics
+    }
+
+    with pytest.raises(KafkaException, match="Falha ao criar tópico"):
+        TopicManager(admin=admin).reconcile({'order_ready': TopicSpec('order_ready', 3, 3)})
@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from confluent_kafka import Consumer, KafkaException, TopicPartition
+from shared.kafka.codecs import CodecError, decode_message
+from shared.kafka.retry import DeadLetterRouter, RetryDeferralMixin
+from shared.kafka.routing import EventRouter, should_decode
+from shared.kafka.workers import OffsetTracker
+from shared.kafka.metrics import (
+    CONSUMER_COMMIT_SECONDS, CONSUMER_SKIPPED, forget_partitions, observe_async_handler, record_consumer_stats
+)
+
+logger = logging.getLogger("kafka-async-consumer")
+logger.setLevel(logging.INFO)
+
+AsyncHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class AsyncKafkaConsumerWrapper(RetryDeferralMixin):
+    """Consumer que roda no event loop da aplicação com handlers assíncronos.
+
+    Poll, commit e close (e os callbacks de rebalance, chamados dentro do poll)
+    rodam em uma thread dedicada, então o event loop nunca bloqueia no
+    librdkafka; o poll espera até `poll_timeout` por mensagens. Mensagens da
+    mesma key são processadas em sequência e o número de handlers simultâneos
+    é limitado por um semáforo. Na revogação, os handlers das partições
+    perdidas têm até `revoke_timeout` para terminar antes do commit. Com DLQ,
+    falhas seguem para os tópicos de retry (publicação em thread) e o consumo continua.
+    """
+
+    def __init__(self, bootstrap_servers: str = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095',
+                 group_id: str = None, max_concurrency: int = 10, poll_timeout: float = 0.1,
+                 commit_interval: float = 1.0, dead_letter: Optional[DeadLetterRouter] = None,
+                 revoke_timeout: float = 5.0):
+        self._conf = {
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': group_id,
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False,
+            'session.timeout.ms': 10000,
+            'heartbeat.interval.ms': 3000,
+            'partition.assignment.strategy': 'cooperative-sticky',
+            'statistics.interval.ms': int(os.getenv('KAFKA_STATS_INTERVAL_MS', 15000)),
+            'stats_cb': lambda stats_json: record_consumer_stats(group_id, stats_json)
+        }
+        self.group_id = group_id
+        self.max_concurrency = max_concurrency
+        self.poll_timeout = poll_timeout
+        self.commit_interval = commit_interval
+        self.revoke_timeout = revoke_timeout
+        self._consumer = Consumer(self._conf)
+        # Uma única thread serializa todas as chamadas ao Consumer
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka-async-consumer")
+        self._tracker = OffsetTracker()
+        self._tasks = set()
+        self._task_partitions: Dict[asyncio.Task, Tuple[str, int]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._key_tails: Dict[bytes, asyncio.Task] = {}
+        self._error: Optional[BaseException] = None
+        self.dead_letter = dead_letter
+        self._paused: Dict[Tuple[str, int], float] = {}
+        logger.info(f"Consumer assíncrono configurado para brokers: {bootstrap_servers}")
+
+    async def consume(self, topic_handlers: Dict[str, AsyncHandler], shutdown_timeout: float = 10):
+        """Consome até ser cancelado; no cancelamento aguarda os handlers em andamento"""
+        topics = list(topic_handlers.keys())
+        if self.dead_letter is not None:
+            topics = self.dead_letter.policy.expand(topics)
+        self._consumer.subscribe(topics, on_revoke=self._on_revoke)
+        logger.info(f"Inscrito nos tópicos (asyncio): {topics}")
+
+        self._loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        last_commit = time.monotonic()
+        try:
+            while True:
+                if self._error is not None:
+                    raise self._error
+
+                self._resume_due_partitions()
+                msg = await self._call(self._consumer.poll, timeout=self.poll_timeout)
+                if msg is not None:
+                    if msg.error():
+                        logger.error(f"Erro no consumer: {msg.error()}")
+                    elif not self._defer_if_not_due(msg):
+                        await semaphore.acquire()
+                        self._schedule(msg, topic_handlers, semaphore)
+
+                if time.monotonic() - last_commit >= self.commit_interval:
+                    await self._call(self._commit, asynchronous=True)
+                    last_commit = time.monotonic()
+        finally:
+            await self._drain(shutdown_timeout)
+            try:
+                await self._call(self._commit, asynchronous=False)
+            except KafkaException as e:
+                logger.warning(f"Commit final falhou: {str(e)}")
+            await self._call(self._consumer.close)
+            self._executor.shutdown(wait=False)
+            logger.info("Consumer assíncrono fechado corretamente")
+
+    async def _call(self, fn, *args, **kwargs):
+        """Executa uma chamada ao Consumer na thread dedicada, sem bloquear o event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def _schedule(self, msg, topic_handlers: Dict[str, AsyncHandler], semaphore: asyncio.Semaphore):
+        topic, partition, offset = msg.topic(), msg.partition(), msg.offset()
+        self._tracker.track(topic, partition, offset)
+        # Sem key, a ordem é preservada por partição
+        key = msg.key() or f"{topic}:{partition}".encode('utf-8')
+        previous = self._key_tails.get(key)
+
+        async def run():
+            try:
+                if previous is not None:
+                    await asyncio.wait({previous})
+                if self._error is not None:
+                    return
+                # Tópicos de retry usam o handler do tópico de origem
+                base_topic = self.dead_letter.policy.base_topic(topic) if self.dead_letter else topic
+                await self._handle(msg, topic_handlers.get(base_topic))
+                self._tracker.complete(topic, partition, offset)
+            except Exception as e:
+                logger.error(f"Falha no handler de {topic}: {str(e)}")
+                self._error = e
+            finally:
+                semaphore.release()
+                if self._key_tails.get(key) is task:
+                    del self._key_tails[key]
+
+        task = asyncio.create_task(run())
+        self._key_tails[key] = task
+        self._tasks.add(task)
+        self._task_partitions[task] = (topic, partition)
+        task.add_done_callback(self._forget_task)
+
+    def _forget_task(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._task_partitions.pop(task, None)
+
+    async def _handle(self, msg, handler):
+        """Decodifica e executa o handler; com DLQ configurada, falhas são roteadas em vez de parar o consumo"""
+        topic = msg.topic()
+        if not should_decode(handler, msg.headers()):
+            CONSUMER_SKIPPED.labels(self.group_id, topic).inc()
+            return
+        try:
+            message_data = decode_message(msg.value(), msg.headers())
+        except CodecError as e:
+            if self.dead_letter is None:
+                logger.error(f"Erro ao decodificar mensagem: {str(e)}")
+                return
+            # Mensagem ilegível não melhora com retry: vai direto para a DLQ
+            await asyncio.to_thread(self.dead_letter.route, msg, e, retryable=False)
+            return
+
+        if isinstance(handler, EventRouter):
+            handler = handler.resolve(message_data)
+        if not handler:
+            return
+        try:
+            await observe_async_handler(self.group_id, topic, handler, message_data)
+        except Exception as e:
+            if self.dead_letter is None:
+                raise
+            # publish_raw aguarda a entrega: fora do event loop
+            await asyncio.to_thread(self.dead_letter.route, msg, e)
+
+    def _on_revoke(self, consumer, partitions):
+        # Chamado dentro do poll, na thread do consumer: espera (até revoke_timeout)
+        # os handlers das partições revogadas e commita o que terminou; o que
+        # não terminar a tempo será reprocessado pelo novo dono
+        revoked = [(p.topic, p.partition) for p in partitions]
+        if self._loop is not None and not self._loop.is_closed():
+            pending = asyncio.run_coroutine_threadsafe(self._wait_partitions(set(revoked)), self._loop)
+            try:
+                pending.result(timeout=self.revoke_timeout + 1)
+            except Exception as e:
+                logger.warning(f"Espera pelos handlers das partições revogadas falhou: {str(e)}")
+        try:
+            self._commit(asynchronous=False)
+        except KafkaException as e:
+            logger.warning(f"Commit antes da revogação falhou: {str(e)}")
+        self._tracker.reset(revoked)
+        for tp in revoked:
+            self._paused.pop(tp, None)
+        forget_partitions(self.group_id, partitions)
+
+    async def _wait_partitions(self, partitions: set):
+        tasks = [task for task, tp in self._task_partitions.items() if tp in partitions]
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=self.revoke_timeout)
+        if pending:
+            logger.warning(
+                f"{len(pending)} handler(s) das partições revogadas não concluído(s) em "
+                f"{self.revoke_timeout}s; serão reprocessados pelo novo dono"
+            )
+
+    async def _drain(self, timeout: float):
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"{len(pending)} handler(s) não concluído(s) no shutdown; serão reprocessados")
+            for task in pending:
+                task.cancel()
+
+    def _commit(self, asynchronous: bool):
+        committable = self._tracker.pop_committable()
+        if not committable:
+            return
+        offsets = [TopicPartition(topic, partition, offset) for (topic, partition), offset in committable.items()]
+        if asynchronous:
+            self._consumer.commit(offsets=offsets, asynchronous=True)
+            return
+        with CONSUMER_COMMIT_SECONDS.labels(self.group_id).time():
+            self._consumer.commit(offsets=offsets, asynchronous=False)
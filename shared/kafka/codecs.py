@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependência opcional
+    msgpack = None
+
+logger = logging.getLogger("kafka-codecs")
+
+CONTENT_TYPE_HEADER = 'content-type'
+SCHEMA_VERSION_HEADER = 'schema-version'
+# Copiados do envelope para permitir rotear/filtrar sem decodificar o payload
+EVENT_TYPE_HEADER = 'event-type'
+SERVICE_HEADER = 'source-service'
+
+# Versão atual do envelope {event_type, payload, metadata}
+SCHEMA_VERSION = 1
+
+JSON_CONTENT_TYPE = 'application/json'
+MSGPACK_CONTENT_TYPE = 'application/x-msgpack'
+
+class CodecError(ValueError):
+    """Falha ao codificar/decodificar uma mensagem"""
+
+class JsonCodec:
+    name = 'json'
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return json.dumps(message).encode('utf-8')
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return json.loads(data.decode('utf-8'))
+
+class OrjsonCodec:
+    """JSON via orjson: mesmo formato no fio, sem round-trip por str"""
+    name = 'orjson'
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return orjson.dumps(message)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return orjson.loads(data)
+
+class MsgpackCodec:
+    name = 'msgpack'
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(data, raw=False)
+
+_json_codec = JsonCodec()
+_codecs = {'json': _json_codec}
+if orjson is not None:
+    _codecs['orjson'] = OrjsonCodec()
+if msgpack is not None:
+    _codecs['msgpack'] = MsgpackCodec()
+
+# Decodificadores por content-type; JSON usa orjson quando disponível
+_decoders = {
+    JSON_CONTENT_TYPE: _codecs.get('orjson', _json_codec),
+}
+if msgpack is not None:
+    _decoders[MSGPACK_CONTENT_TYPE] = _codecs['msgpack']
+
+def get_codec(name: str):
+    """Retorna o codec pelo nome, caindo para JSON se a lib não estiver instalada"""
+    codec = _codecs.get(name)
+    if codec is None:
+        logger.warning(f"Codec '{name}' indisponível, usando json")
+        return _json_codec
+    return codec
+
+def parse_topic_codecs(spec: Optional[str]) -> Dict[str, str]:
+    """Converte 'order_created=orjson,menu_updated=msgpack' em dict"""
+    topic_codecs = {}
+    for entry in (spec or '').split(','):
+        if '=' in entry:
+            topic, codec_name = entry.split('=', 1)
+            topic_codecs[topic.strip()] = codec_name.strip()
+    return topic_codecs
+
+class TopicCodecs:
+    """Seleciona o codec de cada tópico e monta os headers do envelope"""
+
+    def __init__(self, topic_codecs: Optional[Dict[str, str]] = None, default_codec: str = 'json'):
+        self._default = get_codec(default_codec)
+        self._by_topic = {topic: get_codec(name) for topic, name in (topic_codecs or {}).items()}
+
+    @classmethod
+    def from_env(cls) -> 'TopicCodecs':
+        return cls(
+            topic_codecs=parse_topic_codecs(os.getenv('KAFKA_TOPIC_CODECS')),
+            default_codec=os.getenv('KAFKA_DEFAULT_CODEC', 'json')
+        )
+
+    def for_topic(self, topic: str):
+        return self._by_topic.get(topic, self._default)
+
+    def encode(self, topic: str, message: Dict[str, Any]) -> Tuple[bytes, List[Tuple[str, bytes]]]:
+        codec = self.for_topic(topic)
+        try:
+            value = codec.encode(message)
+        except Exception as e:
+            raise CodecError(f"Falha ao codificar mensagem ({codec.name}): {str(e)}") from e
+        headers = [
+            (CONTENT_TYPE_HEADER, codec.content_type.encode('utf-8')),
+            (SCHEMA_VERSION_HEADER, str(SCHEMA_VERSION).encode('utf-8')),
+        ]
+        event_type = message.get('event_type')
+        if event_type:
+            headers.append((EVENT_TYPE_HEADER, str(event_type).encode('utf-8')))
+        service = (message.get('metadata') or {}).get('service')
+        if service:
+            headers.append((SERVICE_HEADER, str(service).encode('utf-8')))
+        return value, headers
+
+def header_value(headers, name: str) -> Optional[str]:
+    for key, value in headers or []:
+        if key == name and value is not None:
+            return value.decode('utf-8') if isinstance(value, bytes) else value
+    return None
+
+def decode_message(value: bytes, headers=None) -> Dict[str, Any]:
+    """Decodifica pelo content-type do header; mensagens sem header são JSON (legado)"""
+    content_type = header_value(headers, CONTENT_TYPE_HEADER) or JSON_CONTENT_TYPE
+    decoder = _decoders.get(content_type)
+    if decoder is None:
+        raise CodecError(f"Content-type não suportado: {content_type}")
+
+    schema_version = header_value(headers, SCHEMA_VERSION_HEADER)
+    if schema_version and schema_version.isdigit() and int(schema_version) > SCHEMA_VERSION:
+        logger.warning(f"Mensagem com schema-version {schema_version} mais nova que a suportada ({SCHEMA_VERSION})")
+
+    try:
+        return decoder.decode(value)
+    except Exception as e:
+        raise CodecError(f"Falha ao decodificar mensagem ({content_type}): {str(e)}") from e
@@ -1,25 +1,121 @@
 import json
 import logging
-from typing import Callable, Dict, Any
-from confluent_kafka import Consumer, KafkaException
+import os
+import threading
+import time
+from typing import Callable, Collection, Dict, Any, List, Optional, Tuple
+from confluent_kafka import Consumer, KafkaError, KafkaException, TopicPartition
 from functools import wraps
+from shared.kafka.codecs import EVENT_TYPE_HEADER, CodecError, decode_message, header_value
+from shared.kafka.routing import should_decode
+from shared.kafka.workers import KeyedWorkerPool, OffsetTracker
+from shared.kafka.retry import DeadLetterRouter, RetryDeferralMixin
+from shared.kafka.metrics import (
+    CONSUMER_BATCH_SECONDS, CONSUMER_COMMIT_SECONDS, CONSUMER_MESSAGES, CONSUMER_SKIPPED,
+    forget_partitions, observe_handler, record_consumer_stats
+)
 
 logger = logging.getLogger("kafka-consumer")
 logger.setLevel(logging.INFO)
 
-class KafkaConsumerWrapper:
-    def __init__(self, bootstrap_servers: str = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095', group_id: str = None):
+class KafkaConsumerWrapper(RetryDeferralMixin):
+    def __init__(self, bootstrap_servers: str = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095', group_id: str = None,
+                 dead_letter: Optional[DeadLetterRouter] = None):
         self._conf = {
             'bootstrap.servers': bootstrap_servers,
             'group.id': group_id,
             'auto.offset.reset': 'earliest',
             'enable.auto.commit': False,
             'session.timeout.ms': 10000,
-            'heartbeat.interval.ms': 3000
+            'heartbeat.interval.ms': 3000,
+            # Rebalance incremental: só as partições que mudam de dono são revogadas
+            'partition.assignment.strategy': 'cooperative-sticky',
+            # Estatísticas periódicas alimentam a métrica de lag por partição
+            'statistics.interval.ms': int(os.getenv('KAFKA_STATS_INTERVAL_MS', 15000)),
+            'stats_cb': self._on_stats
         }
+        self.group_id = group_id
         self._consumer = Consumer(self._conf)
+        self._stop_event = threading.Event()
+        # Com DLQ, falhas vão para os tópicos de retry em vez de derrubar o consumo
+        self.dead_letter = dead_letter
+        self._paused: Dict[Tuple[str, int], float] = {}
         logger.info(f"Consumer configurado para brokers: {bootstrap_servers}")
 
+    def stop(self):
+        """Sinaliza o fim do consumo; o loop termina a mensagem atual, faz o commit e fecha"""
+        self._stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def _on_stats(self, stats_json: str):
+        record_consumer_stats(self.group_id, stats_json)
+
+    def _commit(self, asynchronous: bool = False, offsets: Optional[List[TopicPartition]] = None):
+        """Commit de offsets; os síncronos entram no histograma de latência"""
+        kwargs = {'asynchronous': asynchronous}
+        if offsets is not None:
+            kwargs['offsets'] = offsets
+        if asynchronous:
+            self._consumer.commit(**kwargs)
+            return
+        with CONSUMER_COMMIT_SECONDS.labels(self.group_id).time():
+            self._consumer.commit(**kwargs)
+
+    @staticmethod
+    def _format_partitions(partitions) -> str:
+        return ', '.join(f"{p.topic}[{p.partition}]" for p in partitions)
+
+    def _subscribe(self, topics: list, before_revoke: Callable[[list], None] = None):
+        """Inscreve com callbacks de rebalance; antes de entregar partições o trabalho é commitado"""
+        def on_assign(consumer, partitions):
+            logger.info(f"Partições atribuídas: {self._format_partitions(partitions)}")
+
+        def on_revoke(consumer, partitions):
+            logger.info(f"Partições revogadas: {self._format_partitions(partitions)}")
+            for p in partitions:
+                self._paused.pop((p.topic, p.partition), None)
+            forget_partitions(self.group_id, partitions)
+            try:
+                if before_revoke:
+                    before_revoke(partitions)
+                else:
+                    self._commit()
+            except KafkaException as e:
+                if e.args and getattr(e.args[0], 'code', lambda: None)() == KafkaError._NO_OFFSET:
+                    return
+                logger.warning(f"Commit antes da revogação falhou: {str(e)}")
+
+        def on_lost(consumer, partitions):
+            logger.warning(f"Partições perdidas (sem commit): {self._format_partitions(partitions)}")
+            forget_partitions(self.group_id, partitions)
+
+        self._consumer.subscribe(topics, on_assign=on_assign, on_revoke=on_revoke, on_lost=on_lost)
+
+    def _process(self, msg, callback: Optional[Callable[[Dict[str, Any]], None]]):
+        """Decodifica e executa o callback; com DLQ configurada, falhas não interrompem o consumo"""
+        if not should_decode(callback, msg.headers()):
+            CONSUMER_SKIPPED.labels(self.group_id, msg.topic()).inc()
+            return
+        try:
+            message_data = decode_message(msg.value(), msg.headers())
+        except CodecError as e:
+            if self.dead_letter is None:
+                raise
+            # Mensagem ilegível não melhora com retry: vai direto para a DLQ
+            self.dead_letter.route(msg, e, retryable=False)
+            return
+
+        logger.debug(f"Mensagem recebida do tópico {msg.topic()}: {message_data}")
+        try:
+            observe_handler(self.group_id, msg.topic(), callback, message_data)
+        except Exception as e:
+            if self.dead_letter is None:
+                raise
+            self.dead_letter.route(msg, e)
+
     def handle_errors(f):
         @wraps(f)
         def wrapper(self, *args, **kwargs):
@@ -28,7 +124,7 @@ class KafkaConsumerWrapper:
             except KafkaException as e:
                 logger.error(f"Erro no Kafka: {str(e)}")
                 raise
-            except json.JSONDecodeError as e:
+            except (json.JSONDecodeError, CodecError) as e:
                 logger.error(f"Erro ao decodificar mensagem: {str(e)}")
             except Exception as e:
                 logger.critical(f"Erro inesperado: {str(e)}")
@@ -38,11 +134,14 @@ class KafkaConsumerWrapper:
     @handle_errors
     def subscribe_and_consume(self, topics: list, callback: Callable[[Dict[str, Any]], None]):
         """Consome mensagens com tratamento de erros integrado"""
-        self._consumer.subscribe(topics)
+        if self.dead_letter is not None:
+            topics = self.dead_letter.policy.expand(topics)
+        self._subscribe(topics)
         logger.info(f"Inscrito nos tópicos: {topics}")
 
         try:
-            while True:
+            while not self._stop_event.is_set():
+                self._resume_due_partitions()
                 msg = self._consumer.poll(timeout=1.0)
                 if msg is None:
                     continue
@@ -51,11 +150,11 @@ class KafkaConsumerWrapper:
                     logger.error(f"Erro no consumer: {msg.error()}")
                     continue
 
-                message_data = json.loads(msg.value().decode('utf-8'))
-                logger.debug(f"Mensagem recebida: {message_data}")
+                if self._defer_if_not_due(msg):
+                    continue
 
-                callback(message_data)
-                self._consumer.commit(asynchronous=False)
+                self._process(msg, callback)
+                self._commit()
         finally:
             self._consumer.close()
             logger.info("Consumer fechado corretamente")
@@ -64,11 +163,14 @@ class KafkaConsumerWrapper:
     def subscribe_and_consume_multiple(self, topic_callbacks: Dict[str, Callable[[Dict[str, Any]], None]]):
         """Consome mensagens com callbacks diferentes por tópico"""
         topics = list(topic_callbacks.keys())
-        self._consumer.subscribe(topics)
+        if self.dead_letter is not None:
+            topics = self.dead_letter.policy.expand(topics)
+        self._subscribe(topics)
         logger.info(f"Inscrito nos tópicos: {topics}")
 
         try:
-            while True:
+            while not self._stop_event.is_set():
+                self._resume_due_partitions()
                 msg = self._consumer.poll(timeout=1.0)
                 if msg is None:
                     continue
@@ -77,16 +179,218 @@ class KafkaConsumerWrapper:
                     logger.error(f"Erro no consumer: {msg.error()}")
                     continue
 
+                if self._defer_if_not_due(msg):
+                    continue
+
+                # Tópicos de retry usam o callback do tópico de origem
                 topic = msg.topic()
-                message_data = json.loads(msg.value().decode('utf-8'))
-                logger.debug(f"Mensagem recebida do tópico {topic}: {message_data}")
+                if self.dead_letter is not None:
+                    topic = self.dead_letter.policy.base_topic(topic)
+                self._process(msg, topic_callbacks.get(topic))
+
+                self._commit()
+
+        finally:
+            self._consumer.close()
+            logger.info("Consumer fechado corretamente")
+
+    def _decode_batch(self, msgs, event_types: Optional[Collection[str]] = None) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Decodifica o lote em pares (mensagem, payload), descartando com log as com erro ou inválidas.
+
+        Com `event_types`, mensagens cujo header event-type não está na lista
+        são descartadas antes de decodificar. Com DLQ, mensagens ilegíveis vão
+        para a DLQ e mensagens de retry antes do prazo pausam a partição (o
+        restante dela no lote é relido depois).
+        """
+        batch, deferred = [], set()
+        for msg in msgs:
+            if msg.error():
+                logger.error(f"Erro no consumer: {msg.error()}")
+                continue
+            if (msg.topic(), msg.partition()) in deferred:
+                continue
+            if self._defer_if_not_due(msg):
+                deferred.add((msg.topic(), msg.partition()))
+                continue
+            if event_types is not None:
+                event_type = header_value(msg.headers(), EVENT_TYPE_HEADER)
+                if event_type is not None and event_type not in event_types:
+                    CONSUMER_SKIPPED.labels(self.group_id, msg.topic()).inc()
+                    continue
+            try:
+                batch.append((msg, decode_message(msg.value(), msg.headers())))
+            except CodecError as e:
+                if self.dead_letter is None:
+                    logger.error(f"Erro ao decodificar mensagem: {str(e)}")
+                else:
+                    self.dead_letter.route(msg, e, retryable=False)
+        return batch
+
+    def _run_batch(self, batch_callback: Callable[[List[Dict[str, Any]]], None], batch: List[Tuple[Any, Dict[str, Any]]]):
+        """Executa o callback no lote inteiro.
+
+        Com DLQ, se o lote falha ele é refeito mensagem a mensagem e só as que
+        falharem seguem para o retry; as demais são reaplicadas (os consumers
+        são idempotentes pelo event_id).
+        """
+        try:
+            batch_callback([message_data for _, message_data in batch])
+        except Exception as e:
+            if self.dead_letter is None:
+                raise
+            logger.warning(f"Lote de {len(batch)} mensagem(ns) falhou, reprocessando uma a uma: {str(e)}")
+            for msg, message_data in batch:
+                try:
+                    batch_callback([message_data])
+                except Exception as message_error:
+                    self.dead_letter.route(msg, message_error)
 
-                callback = topic_callbacks.get(topic)
-                if callback:
-                    callback(message_data)
+    @handle_errors
+    def consume_batches(self, topics: list, batch_callback: Callable[[List[Dict[str, Any]]], None],
+                        max_messages: int = 500, max_wait_ms: int = 100, sync_commit_every: int = 10,
+                        event_types: Optional[Collection[str]] = None):
+        """Consome em lotes com um único commit por lote.
+
+        Os commits são assíncronos; a cada `sync_commit_every` lotes (e no
+        encerramento) o commit é síncrono para limitar o reprocessamento. Com
+        DLQ, os tópicos de retry entram na inscrição e chegam no mesmo lote.
+        """
+        if self.dead_letter is not None:
+            topics = self.dead_letter.policy.expand(topics)
+        self._subscribe(topics)
+        logger.info(f"Inscrito nos tópicos (modo lote): {topics}")
+
+        batches = 0
+        try:
+            while not self._stop_event.is_set():
+                self._resume_due_partitions()
+                msgs = self._consumer.consume(num_messages=max_messages, timeout=max_wait_ms / 1000)
+                if not msgs:
+                    continue
 
-                self._consumer.commit(asynchronous=False)
+                start = time.perf_counter()
+                batch = self._decode_batch(msgs, event_types)
+                if batch:
+                    self._run_batch(batch_callback, batch)
+                CONSUMER_BATCH_SECONDS.labels(self.group_id).observe(time.perf_counter() - start)
+                self._count_batch(msgs)
 
+                batches += 1
+                self._commit(asynchronous=batches % sync_commit_every != 0)
+                logger.info(
+                    f"Lote processado: {len(batch)}/{len(msgs)} mensagem(ns) em "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms"
+                )
         finally:
+            if batches:
+                try:
+                    self._commit()
+                except KafkaException as e:
+                    logger.warning(f"Commit final falhou: {str(e)}")
             self._consumer.close()
-            logger.info("Consumer fechado corretamente")
\ No newline at end of file
+            logger.info("Consumer fechado corretamente")
+
+    def _count_batch(self, msgs):
+        counts: Dict[str, int] = {}
+        for msg in msgs:
+            if not msg.error():
+                counts[msg.topic()] = counts.get(msg.topic(), 0) + 1
+        for topic, count in counts.items():
+            CONSUMER_MESSAGES.labels(self.group_id, topic).inc(count)
+
+    def _commit_tracked(self, tracker: OffsetTracker):
+        committable = tracker.pop_committable()
+        if committable:
+            self._commit(
+                offsets=[TopicPartition(topic, partition, offset) for (topic, partition), offset in committable.items()]
+            )
+
+    @handle_errors
+    def consume_parallel(self, topic_callbacks: Dict[str, Callable[[Dict[str, Any]], None]],
+                         num_workers: int = 4, queue_size: int = 100, commit_interval: float = 1.0):
+        """Processa mensagens em um pool de workers particionado pela key.
+
+        Mensagens com a mesma key (ex.: order_id) seguem a ordem da partição;
+        só são commitados offsets contíguos já processados. Os callbacks rodam
+        em threads diferentes e não devem compartilhar sessão de banco. Com DLQ,
+        falhas seguem para os tópicos de retry em vez de parar o consumo.
+        """
+        tracker = OffsetTracker()
+        pool = KeyedWorkerPool(num_workers, queue_size=queue_size, name="kafka-consumer-worker")
+
+        def before_revoke(partitions):
+            # Termina o que está em andamento antes de perder as partições
+            pool.drain()
+            self._commit_tracked(tracker)
+            tracker.reset([(p.topic, p.partition) for p in partitions])
+
+        topics = list(topic_callbacks.keys())
+        if self.dead_letter is not None:
+            topics = self.dead_letter.policy.expand(topics)
+        self._subscribe(topics, before_revoke=before_revoke)
+        logger.info(f"Inscrito nos tópicos com {num_workers} worker(s): {topics}")
+
+        last_commit = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                if pool.error is not None:
+                    raise pool.error
+
+                self._resume_due_partitions()
+                msg = self._consumer.poll(timeout=0.1)
+                if msg is not None:
+                    self._dispatch(msg, topic_callbacks, pool, tracker)
+
+                if time.monotonic() - last_commit >= commit_interval:
+                    self._commit_tracked(tracker)
+                    last_commit = time.monotonic()
+        finally:
+            pool.drain()
+            pool.stop()
+            try:
+                self._commit_tracked(tracker)
+            except KafkaException as e:
+                logger.warning(f"Commit final falhou: {str(e)}")
+            self._consumer.close()
+            logger.info("Consumer fechado corretamente")
+
+    def _dispatch(self, msg, topic_callbacks, pool: KeyedWorkerPool, tracker: OffsetTracker):
+        if msg.error():
+            logger.error(f"Erro no consumer: {msg.error()}")
+            return
+        if self._defer_if_not_due(msg):
+            return
+
+        topic, partition, offset = msg.topic(), msg.partition(), msg.offset()
+        tracker.track(topic, partition, offset)
+        on_done = lambda: tracker.complete(topic, partition, offset)
+
+        # Tópicos de retry usam o callback do tópico de origem
+        callback = topic_callbacks.get(self.dead_letter.policy.base_topic(topic) if self.dead_letter else topic)
+        if not should_decode(callback, msg.headers()):
+            CONSUMER_SKIPPED.labels(self.group_id, topic).inc()
+            on_done()
+            return
+
+        try:
+            message_data = decode_message(msg.value(), msg.headers())
+        except CodecError as e:
+            if self.dead_letter is None:
+                logger.error(f"Erro ao decodificar mensagem: {str(e)}")
+            else:
+                self.dead_letter.route(msg, e, retryable=False)
+            on_done()
+            return
+
+        def handle():
+            # Com DLQ, a falha vai para o retry no próprio worker e o offset é concluído
+            try:
+                observe_handler(self.group_id, topic, callback, message_data)
+            except Exception as e:
+                if self.dead_letter is None:
+                    raise
+                self.dead_letter.route(msg, e)
+
+        # Sem key, a ordem é preservada por partição
+        key = msg.key() or f"{topic}:{partition}".encode('utf-8')
+        pool.submit(key, handle, on_done)
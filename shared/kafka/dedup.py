@@ -0,0 +1,86 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import Column, String, DateTime, delete, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("kafka-dedup")
+logger.setLevel(logging.INFO)
+
+def event_id_of(message: Dict[str, Any]) -> Optional[str]:
+    """Id do evento carimbado em metadata pela outbox; eventos antigos podem não ter"""
+    return (message.get('metadata') or {}).get('event_id')
+
+class RedisDedupStore:
+    """Eventos já processados em chaves Redis com TTL; uma consulta por mensagem.
+
+    Falhas no Redis não bloqueiam o consumo: o evento é processado de novo e o
+    handler continua precisando ser idempotente.
+    """
+
+    def __init__(self, client, prefix: str, ttl_seconds: int = 86400):
+        self._client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, event_id: str) -> str:
+        return f"dedup:{self.prefix}:{event_id}"
+
+    def seen(self, event_id: Optional[str]) -> bool:
+        if not event_id:
+            return False
+        try:
+            return bool(self._client.exists(self._key(event_id)))
+        except Exception as e:
+            logger.warning(f"Falha ao consultar dedup para {event_id}: {str(e)}")
+            return False
+
+    def mark(self, event_id: Optional[str]):
+        if not event_id:
+            return
+        try:
+            self._client.set(self._key(event_id), 1, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Falha ao registrar dedup para {event_id}: {str(e)}")
+
+class InboxMixin:
+    """Colunas da tabela de inbox; cada serviço declara o modelo com a própria Base"""
+    event_id = Column(String(36), primary_key=True)
+    topic = Column(String(100), nullable=True)
+    processed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class DbInbox:
+    """Eventos processados gravados na mesma transação dos efeitos do handler.
+
+    Como o registro só é commitado junto com o resultado, uma reentrega após
+    falha é processada de novo e uma reentrega após sucesso é ignorada.
+    """
+
+    def __init__(self, model, retention: timedelta = timedelta(days=7)):
+        self._model = model
+        self.retention = retention
+        self._last_purge = datetime.utcnow()
+
+    def seen(self, db: Session, event_id: Optional[str]) -> bool:
+        if not event_id:
+            return False
+        return db.execute(
+            select(self._model.event_id).where(self._model.event_id == event_id)
+        ).first() is not None
+
+    def mark(self, db: Session, event_id: Optional[str], topic: Optional[str] = None):
+        """Adiciona o registro à sessão; persiste no próximo commit do handler"""
+        if not event_id:
+            return
+        db.add(self._model(event_id=event_id, topic=topic))
+        # Limpeza oportunista, no máximo uma vez por hora
+        if datetime.utcnow() - self._last_purge > timedelta(hours=1):
+            self._last_purge = datetime.utcnow()
+            self.purge(db)
+
+    def purge(self, db: Session) -> int:
+        """Remove registros mais antigos que a retenção (maior que a dos tópicos)"""
+        result = db.execute(
+            delete(self._model).where(self._model.processed_at < datetime.utcnow() - self.retention)
+        )
+        return result.rowcount
@@ -0,0 +1,135 @@
+"""Inspeciona e reprocessa mensagens das dead-letter queues ({topic}.dlq).
+
+Uso (em qualquer container de serviço, que já tem /app/shared no PYTHONPATH):
+    python -m shared.kafka.dlq list payment_processed.dlq [--limit 20]
+    python -m shared.kafka.dlq redrive payment_processed.dlq [--limit 500] [--dry-run]
+
+`redrive` republica os bytes originais no tópico de origem (sem os headers de
+erro) e commita o progresso no grupo `dlq-redrive`, então execuções seguintes
+continuam de onde a anterior parou.
+"""
+import argparse
+import logging
+import uuid
+from typing import Iterator, Optional
+from confluent_kafka import Consumer, KafkaError
+from shared.kafka.producer import KafkaProducerWrapper
+from shared.kafka.retry import (
+    DLQ_SUFFIX, ERROR_HEADER, ERROR_TYPE_HEADER, FAILED_AT_HEADER, ORIGINAL_TOPIC_HEADER, RETRY_ATTEMPT_HEADER,
+    RetryPolicy, header_value, strip_routing_headers
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("kafka-dlq")
+
+DEFAULT_BROKERS = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095'
+REDRIVE_GROUP = 'dlq-redrive'
+
+def _dlq_consumer(bootstrap_servers: str, group_id: str) -> Consumer:
+    return Consumer({
+        'bootstrap.servers': bootstrap_servers,
+        'group.id': group_id,
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+        'enable.partition.eof': True,
+    })
+
+def iter_dlq(consumer: Consumer, topic: str, limit: Optional[int] = None, idle_timeout: float = 5.0) -> Iterator:
+    """Lê a DLQ até o fim de todas as partições (ou até `limit` mensagens)"""
+    consumer.subscribe([topic])
+    eof_partitions, assigned, count = set(), None, 0
+    while limit is None or count < limit:
+        msg = consumer.poll(timeout=idle_timeout)
+        if msg is None:
+            return
+        if assigned is None:
+            assigned = {p.partition for p in consumer.assignment()}
+        if msg.error():
+            if msg.error().code() == KafkaError._PARTITION_EOF:
+                eof_partitions.add(msg.partition())
+                if assigned and eof_partitions >= assigned:
+                    return
+                continue
+            logger.error(f"Erro ao ler {topic}: {msg.error()}")
+            continue
+        count += 1
+        yield msg
+
+def describe(msg) -> str:
+    headers = msg.headers()
+    key = msg.key().decode('utf-8', 'replace') if msg.key() else '-'
+    preview = (msg.value() or b'')[:120].decode('utf-8', 'replace')
+    return (
+        f"[{msg.partition()}@{msg.offset()}] key={key} origem={header_value(headers, ORIGINAL_TOPIC_HEADER)} "
+        f"tentativas={header_value(headers, RETRY_ATTEMPT_HEADER)} em={header_value(headers, FAILED_AT_HEADER)}\n"
+        f"    {header_value(headers, ERROR_TYPE_HEADER)}: {header_value(headers, ERROR_HEADER)}\n"
+        f"    {preview}"
+    )
+
+def list_messages(topic: str, limit: int, bootstrap_servers: str = DEFAULT_BROKERS) -> int:
+    # Grupo descartável: listar não move o progresso do redrive
+    consumer = _dlq_consumer(bootstrap_servers, f"dlq-inspect-{uuid.uuid4()}")
+    count = 0
+    try:
+        for msg in iter_dlq(consumer, topic, limit):
+            print(describe(msg))
+            count += 1
+    finally:
+        consumer.close()
+    print(f"{count} mensagem(ns) em {topic}")
+    return count
+
+def redrive(topic: str, limit: Optional[int], bootstrap_servers: str = DEFAULT_BROKERS,
+            dry_run: bool = False, batch_size: int = 100) -> int:
+    """Republica as mensagens no tópico de origem em lotes de `batch_size`: um flush e um commit por lote"""
+    if dry_run:
+        return list_messages(topic, limit, bootstrap_servers)
+
+    consumer = _dlq_consumer(bootstrap_servers, REDRIVE_GROUP)
+    producer = KafkaProducerWrapper(bootstrap_servers=bootstrap_servers)
+    fallback_topic = RetryPolicy.base_topic(topic[:-len(DLQ_SUFFIX)] if topic.endswith(DLQ_SUFFIX) else topic)
+    count, pending = 0, []
+
+    def deliver(batch):
+        # O offset só é commitado depois de todo o lote confirmado pelo broker
+        producer.publish_raw_batch(batch)
+        consumer.commit(asynchronous=False)
+
+    try:
+        for msg in iter_dlq(consumer, topic, limit):
+            target = header_value(msg.headers(), ORIGINAL_TOPIC_HEADER) or fallback_topic
+            pending.append((target, msg.value(), msg.key(), strip_routing_headers(msg.headers())))
+            count += 1
+            if len(pending) >= batch_size:
+                deliver(pending)
+                pending = []
+        if pending:
+            deliver(pending)
+    finally:
+        consumer.close()
+        producer.close()
+    logger.info(f"{count} mensagem(ns) de {topic} reenviada(s)")
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bootstrap-servers', default=DEFAULT_BROKERS)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help='Lista mensagens da DLQ com os metadados de erro')
+    list_parser.add_argument('topic')
+    list_parser.add_argument('--limit', type=int, default=20)
+
+    redrive_parser = subparsers.add_parser('redrive', help='Reenvia mensagens da DLQ para o tópico de origem')
+    redrive_parser.add_argument('topic')
+    redrive_parser.add_argument('--limit', type=int, default=None)
+    redrive_parser.add_argument('--dry-run', action='store_true')
+
+    args = parser.parse_args(argv)
+    if args.command == 'list':
+        list_messages(args.topic, args.limit, args.bootstrap_servers)
+    else:
+        redrive(args.topic, args.limit, args.bootstrap_servers, dry_run=args.dry_run)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Métricas Prometheus dos wrappers de Kafka.
+
+Throughput sai de rate() sobre os contadores; o lag por partição vem das
+estatísticas do librdkafka (statistics.interval.ms), sem chamadas extras ao broker.
+"""
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+logger = logging.getLogger("kafka-metrics")
+logger.setLevel(logging.INFO)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONSUMER_MESSAGES = Counter(
+    'kafka_consumer_messages', 'Mensagens processadas pelo consumer', ['group', 'topic']
+)
+CONSUMER_FAILURES = Counter(
+    'kafka_consumer_failures', 'Mensagens cujo handler lançou exceção', ['group', 'topic']
+)
+CONSUMER_SKIPPED = Counter(
+    'kafka_consumer_skipped', 'Mensagens descartadas pelos headers, sem decodificar', ['group', 'topic']
+)
+CONSUMER_HANDLER_SECONDS = Histogram(
+    'kafka_consumer_handler_seconds', 'Tempo de execução do handler por mensagem', ['group', 'topic'],
+    buckets=LATENCY_BUCKETS
+)
+CONSUMER_BATCH_SECONDS = Histogram(
+    'kafka_consumer_batch_seconds', 'Tempo de processamento de um lote (modo lote)', ['group'],
+    buckets=LATENCY_BUCKETS
+)
+CONSUMER_COMMIT_SECONDS = Histogram(
+    'kafka_consumer_commit_seconds', 'Latência dos commits síncronos de offset', ['group'],
+    buckets=LATENCY_BUCKETS
+)
+CONSUMER_LAG = Gauge(
+    'kafka_consumer_lag', 'Mensagens ainda não consumidas por partição', ['group', 'topic', 'partition']
+)
+
+PRODUCER_MESSAGES = Counter(
+    'kafka_producer_messages', 'Mensagens com entrega confirmada', ['topic']
+)
+PRODUCER_ERRORS = Counter(
+    'kafka_producer_delivery_errors', 'Mensagens com falha na entrega', ['topic']
+)
+PRODUCER_DELIVERY_SECONDS = Histogram(
+    'kafka_producer_delivery_seconds', 'Tempo entre produce() e o delivery report', ['topic'],
+    buckets=LATENCY_BUCKETS
+)
+PRODUCER_QUEUE_DEPTH = Gauge(
+    'kafka_producer_queue_depth', 'Mensagens aguardando entrega na fila local do librdkafka'
+)
+
+def observe_handler(group: str, topic: str, handler: Callable[..., Any], *args):
+    start = time.perf_counter()
+    try:
+        return handler(*args)
+    except Exception:
+        CONSUMER_FAILURES.labels(group, topic).inc()
+        raise
+    finally:
+        CONSUMER_HANDLER_SECONDS.labels(group, topic).observe(time.perf_counter() - start)
+        CONSUMER_MESSAGES.labels(group, topic).inc()
+
+async def observe_async_handler(group: str, topic: str, handler: Callable[..., Awaitable[Any]], *args):
+    start = time.perf_counter()
+    try:
+        return await handler(*args)
+    except Exception:
+        CONSUMER_FAILURES.labels(group, topic).inc()
+        raise
+    finally:
+        CONSUMER_HANDLER_SECONDS.labels(group, topic).observe(time.perf_counter() - start)
+        CONSUMER_MESSAGES.labels(group, topic).inc()
+
+def observe_delivery(err, msg):
+    """Chamado a partir do delivery report do producer"""
+    topic = msg.topic() if msg is not None else 'unknown'
+    if err:
+        PRODUCER_ERRORS.labels(topic).inc()
+        return
+    PRODUCER_MESSAGES.labels(topic).inc()
+    latency = msg.latency()
+    if latency is not None:
+        PRODUCER_DELIVERY_SECONDS.labels(topic).observe(float(latency))
+
+def record_consumer_stats(group: str, stats_json: str):
+    """Atualiza o lag a partir do JSON de estatísticas do librdkafka"""
+    try:
+        stats = json.loads(stats_json)
+    except ValueError:
+        logger.warning("Estatísticas do librdkafka inválidas, ignorando")
+        return
+    for topic, topic_stats in stats.get('topics', {}).items():
+        for partition, partition_stats in topic_stats.get('partitions', {}).items():
+            lag = partition_stats.get('consumer_lag', -1)
+            # Partição -1 é interna; lag -1 significa partição não atribuída ou sem offset ainda
+            if partition == '-1' or lag < 0:
+                continue
+            CONSUMER_LAG.labels(group, topic, partition).set(lag)
+
+def forget_partitions(group: str, partitions):
+    """Remove o lag de partições que deixaram de ser deste consumer"""
+    for p in partitions:
+        try:
+            CONSUMER_LAG.remove(group, p.topic, str(p.partition))
+        except KeyError:
+            pass
+
+def latest_metrics():
+    """Retorna (corpo, content-type) no formato de exposição do Prometheus"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,155 @@
+import logging
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import BigInteger, Column, String, DateTime, FetchedValue, JSON, select, update, delete, func
+from sqlalchemy.orm import Session
+from shared.kafka.producer import get_kafka_producer
+
+logger = logging.getLogger("kafka-outbox")
+logger.setLevel(logging.INFO)
+
+class OutboxMixin:
+    """Colunas da tabela de outbox; cada serviço declara o modelo com a própria Base"""
+    event_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), nullable=False)
+    topic = Column(String(100), nullable=False)
+    # Chave de particionamento (ex.: order_id); eventos com a mesma chave mantêm a ordem
+    key = Column(String(100), nullable=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    # Ordem de publicação atribuída pelo banco no INSERT (IDENTITY no init.sql); created_at vem do
+    # relógio de cada réplica. Sem a coluna gerada (SQLite dos testes) fica nula e vale o created_at
+    sequence = Column(BigInteger, FetchedValue(), nullable=True)
+
+def add_outbox_event(db: Session, model, topic: str, event: Dict[str, Any], key: Optional[str] = None):
+    """Registra o evento na sessão atual; é persistido no mesmo commit da transação de negócio"""
+    # O id da linha vai em metadata.event_id para os consumers descartarem reentregas
+    event_id = str(uuid.uuid4())
+    event = {**event, "metadata": {**(event.get("metadata") or {}), "event_id": event_id}}
+    outbox_event = model(event_id=event_id, topic=topic, payload=event, key=key)
+    db.add(outbox_event)
+    return outbox_event
+
+class OutboxRelay:
+    """Drena a outbox em lote: busca várias linhas, publica com um único flush e marca todas como enviadas.
+
+    Garantia de ordem: eventos da mesma key são publicados na ordem de `sequence`. Só uma
+    réplica publica por vez (advisory lock da transação no PostgreSQL); as demais pulam o
+    ciclo. Transações da mesma key que se serializam (ex.: lock da linha do pedido)
+    recebem sequence crescente, então a ordem de commit é a ordem no Kafka.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], model, producer_factory=get_kafka_producer,
+                 batch_size: int = 500, poll_interval: float = 0.5, retention: timedelta = timedelta(hours=24)):
+        self._session_factory = session_factory
+        self._model = model
+        self._producer_factory = producer_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Um lock por tabela de outbox: serviços com bancos/tabelas diferentes não disputam entre si
+        self.lock_key = zlib.crc32(model.__tablename__.encode())
+
+    def _is_active_relay(self, db: Session) -> bool:
+        """Tenta o advisory lock (liberado no fim da transação); fora do PostgreSQL o relay é sempre o ativo"""
+        if db.get_bind().dialect.name != "postgresql":
+            return True
+        return bool(db.execute(select(func.pg_try_advisory_xact_lock(self.lock_key))).scalar())
+
+    def relay_batch(self) -> int:
+        """Publica o próximo lote pendente e retorna quantos eventos foram enviados"""
+        producer = self._producer_factory()
+        if not producer.is_ready:
+            # Aguarda o warm-up do producer em vez de travar no flush
+            return 0
+
+        model = self._model
+        db = self._session_factory()
+        try:
+            if not self._is_active_relay(db):
+                # Outra réplica está publicando; lotes intercalados quebrariam a ordem por key
+                db.rollback()
+                return 0
+
+            rows = db.execute(
+                select(model)
+                .where(model.sent_at.is_(None))
+                .order_by(model.sequence, model.created_at)
+                .limit(self.batch_size)
+            ).scalars().all()
+
+            if not rows:
+                db.rollback()
+                return 0
+
+            producer.publish_batch([(row.topic, row.payload, row.key) for row in rows])
+
+            db.execute(
+                update(model)
+                .where(model.event_id.in_([row.event_id for row in rows]))
+                .values(sent_at=datetime.utcnow())
+            )
+            db.commit()
+            logger.debug(f"{len(rows)} evento(s) da outbox publicados")
+            return len(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def purge_sent(self) -> int:
+        """Remove eventos já enviados mais antigos que a retenção configurada"""
+        model = self._model
+        db = self._session_factory()
+        try:
+            result = db.execute(
+                delete(model)
+                .where(model.sent_at.is_not(None))
+                .where(model.sent_at < datetime.utcnow() - self.retention)
+            )
+            db.commit()
+            return result.rowcount
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run(self):
+        """Loop do relay; em caso de falha aguarda com backoff e tenta novamente"""
+        backoff = self.poll_interval
+        last_purge = datetime.utcnow()
+        while not self._stop_event.is_set():
+            try:
+                sent = self.relay_batch()
+                backoff = self.poll_interval
+
+                if datetime.utcnow() - last_purge > timedelta(hours=1):
+                    self.purge_sent()
+                    last_purge = datetime.utcnow()
+
+                # Lote cheio indica backlog: continua drenando sem esperar
+                if sent < self.batch_size:
+                    self._stop_event.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Falha no relay da outbox: {str(e)}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self.run, daemon=True, name="outbox-relay-thread")
+        self._thread.start()
+        logger.info("Outbox relay iniciado")
+        return self._thread
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        logger.info("Outbox relay finalizado")
@@ -1,15 +1,22 @@
-import json
+import os
 import logging
+import threading
 import time
-from typing import Any, Dict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from confluent_kafka import Producer, KafkaException
 from confluent_kafka.admin import AdminClient
+from shared.kafka.codecs import TopicCodecs
+from shared.kafka.spill import SpillLog
+from shared.kafka.metrics import PRODUCER_QUEUE_DEPTH, observe_delivery
 
 logger = logging.getLogger("kafka-producer")
 logger.setLevel(logging.INFO)
 
 class KafkaProducerWrapper:
-    def __init__(self, bootstrap_servers: str = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095', max_retries: int = 5, retry_delay: int = 5):
+    def __init__(self, bootstrap_servers: str = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095', max_retries: int = 5, retry_delay: int = 5,
+                 async_mode: bool = False, linger_ms: int = 20, batch_num_messages: int = 10000,
+                 codecs: Optional[TopicCodecs] = None, connect: bool = True, spill: Optional[SpillLog] = None):
         self._conf = {
             'bootstrap.servers': bootstrap_servers,
             'message.timeout.ms': 10000,
@@ -18,20 +25,47 @@ class KafkaProducerWrapper:
             'socket.keepalive.enable': True,
             'socket.timeout.ms': 10000,
         }
+        if async_mode:
+            # Agrupa mensagens em lotes; idempotência mantém a ordem mesmo com retries
+            self._conf.update({
+                'linger.ms': linger_ms,
+                'batch.num.messages': batch_num_messages,
+                'compression.type': 'lz4',
+                'enable.idempotence': True,
+            })
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.async_mode = async_mode
+        self.codecs = codecs or TopicCodecs()
+        self.spill = spill
+        self._on_delivery = self._report_and_spill if spill is not None else self._delivery_report
         self._producer = None
-        self._initialize()
+        self._poll_thread = None
+        self._warmup_thread = None
+        self._replay_thread = None
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        if connect:
+            self._initialize()
+        else:
+            # Criar o Producer não bloqueia: a conexão é verificada por warm_up()
+            self._producer = Producer(self._conf)
+        if async_mode:
+            self._start_poll_loop()
+        if spill is not None:
+            self._start_replay_loop()
+
+    @property
+    def is_ready(self) -> bool:
+        """Indica se a conexão com o cluster já foi confirmada"""
+        return self._ready.is_set()
 
     def _initialize(self):
         """Tenta conectar com retry exponencial"""
+        self._producer = Producer(self._conf)
         for attempt in range(self.max_retries):
             try:
-                self._producer = Producer(self._conf)
-                # Testa a conexão com um ping leve
-                admin_client = AdminClient({'bootstrap.servers': self._conf['bootstrap.servers']})
-                admin_client.list_topics(timeout=5)
-                logger.info(f"Conectado ao Kafka em {self._conf['bootstrap.servers']}")
+                self._probe()
                 return
             except KafkaException as e:
                 logger.warning(f"Tentativa {attempt + 1}/{self.max_retries} falhou: {str(e)}")
@@ -39,34 +73,333 @@ class KafkaProducerWrapper:
                     raise
                 time.sleep(self.retry_delay * (attempt + 1))
 
-    def publish_message(self, topic: str, message: Dict[str, Any]):
-        """Publica mensagem com tratamento de erro reforçado"""
+    def _probe(self):
+        # Testa a conexão com um ping leve
+        admin_client = AdminClient({'bootstrap.servers': self._conf['bootstrap.servers']})
+        admin_client.list_topics(timeout=5)
+        self._ready.set()
+        logger.info(f"Conectado ao Kafka em {self._conf['bootstrap.servers']}")
+
+    def warm_up(self):
+        """Verifica a conexão em background, sem bloquear quem publica"""
+        if self._ready.is_set() or self._warmup_thread is not None:
+            return
+        self._warmup_thread = threading.Thread(
+            target=self._warm_up_loop,
+            daemon=True,
+            name="kafka-producer-warmup"
+        )
+        self._warmup_thread.start()
+
+    def _warm_up_loop(self):
+        attempt = 0
+        while not self._stop_event.is_set():
+            try:
+                self._probe()
+                return
+            except KafkaException as e:
+                attempt += 1
+                logger.warning(f"Warm-up do producer: tentativa {attempt} falhou: {str(e)}")
+                self._stop_event.wait(min(self.retry_delay * attempt, 30))
+
+    def _start_poll_loop(self):
+        """Dispara a thread que processa os delivery reports em background"""
+        self._poll_thread = threading.Thread(
+            target=self._poll_loop,
+            daemon=True,
+            name="kafka-producer-poll"
+        )
+        self._poll_thread.start()
+
+    def _poll_loop(self):
+        while not self._stop_event.is_set():
+            self._producer.poll(0.1)
+
+    def publish_message(self, topic: str, message: Dict[str, Any], key: Optional[str] = None) -> Optional[Future]:
+        """Publica mensagem com tratamento de erro reforçado.
+
+        Mensagens com a mesma key vão para a mesma partição, preservando a ordem.
+        No modo assíncrono apenas enfileira a mensagem e retorna um Future
+        resolvido pelo delivery report; no modo síncrono aguarda o flush.
+        """
         if not self._producer:
             raise KafkaException("Producer não inicializado")
 
         try:
+            value, headers = self.codecs.encode(topic, message)
+            if self._spill_pending():
+                # Há mensagens no spill: enfileira atrás delas para manter a ordem
+                self.spill.append(topic, self._encode_key(key), value, headers)
+                return self._spilled_future() if self.async_mode else None
+
+            if self.async_mode:
+                return self._produce_async(topic, value, headers, key)
+
             self._producer.produce(
                 topic=topic,
-                value=json.dumps(message).encode('utf-8'),
-                on_delivery=self._delivery_report
+                key=self._encode_key(key),
+                value=value,
+                headers=headers,
+                on_delivery=self._on_delivery
             )
             self._producer.flush(timeout=10)
         except Exception as e:
             logger.error(f"Falha ao publicar: {str(e)}")
             raise
 
+    def publish_raw(self, topic: str, value: bytes, key: Optional[Union[str, bytes]] = None,
+                    headers=None, timeout: float = 10):
+        """Publica bytes já codificados (ex.: reenvio para retry/DLQ) e aguarda a entrega"""
+        self.publish_raw_batch([(topic, value, key, headers)], timeout=timeout)
+
+    def publish_raw_batch(self, messages: List[Tuple[str, bytes, Optional[Union[str, bytes]], Any]], timeout: float = 10):
+        """Publica vários (topic, value, key, headers) já codificados com um único flush no fim"""
+        if not self._producer:
+            raise KafkaException("Producer não inicializado")
+
+        errors = []
+
+        def on_delivery(err, msg):
+            self._delivery_report(err, msg)
+            if err:
+                errors.append(err)
+
+        for topic, value, key, headers in messages:
+            self._produce_with_backpressure(topic, value, headers, on_delivery, key, allow_spill=False)
+        remaining = self._producer.flush(timeout=timeout)
+        if errors or remaining:
+            topics = ', '.join(sorted({topic for topic, _, _, _ in messages}))
+            raise KafkaException(f"Falha ao publicar em {topics}: {len(errors)} falha(s), {remaining} pendente(s)")
+
+    @staticmethod
+    def _encode_key(key: Optional[Union[str, bytes]]) -> Optional[bytes]:
+        return key.encode('utf-8') if isinstance(key, str) else key
+
+    def _produce_async(self, topic: str, value: bytes, headers, key: Optional[str] = None) -> Future:
+        future = Future()
+
+        def on_delivery(err, msg):
+            if self._spill_failed(err, msg):
+                self._delivery_report(err, msg)
+                future.set_result(None)
+            else:
+                self._resolve_delivery(future, err, msg)
+
+        if not self._produce_with_backpressure(topic, value, headers, on_delivery, key):
+            future.set_result(None)
+        return future
+
+    def _produce_with_backpressure(self, topic: str, value: bytes, headers, on_delivery,
+                                   key: Optional[str] = None, allow_spill: bool = True) -> bool:
+        """Enfileira no librdkafka; retorna False se a mensagem foi para o spill"""
+        kwargs = dict(topic=topic, key=self._encode_key(key), value=value, headers=headers, on_delivery=on_delivery)
+        try:
+            self._producer.produce(**kwargs)
+        except BufferError:
+            # Fila local cheia: drena delivery reports e tenta mais uma vez
+            logger.warning("Fila do producer cheia, aguardando entregas pendentes")
+            self._producer.poll(1)
+            try:
+                self._producer.produce(**kwargs)
+            except BufferError:
+                if not allow_spill or self.spill is None:
+                    raise
+                self.spill.append(topic, kwargs['key'], value, headers)
+                logger.warning(f"Fila do producer ainda cheia, mensagem de {topic} gravada no spill")
+                return False
+        return True
+
+    def _spill_pending(self) -> bool:
+        return self.spill is not None and self.spill.has_pending()
+
+    @staticmethod
+    def _spilled_future() -> Future:
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def _spill_failed(self, err, msg) -> bool:
+        """Grava no spill a mensagem cuja entrega falhou; retorna True se gravou"""
+        if not err or self.spill is None:
+            return False
+        try:
+            self.spill.append(msg.topic(), msg.key(), msg.value(), msg.headers())
+        except OSError as e:
+            logger.error(f"Falha ao gravar mensagem no spill: {str(e)}")
+            return False
+        logger.warning(f"Entrega em {msg.topic()} falhou, mensagem gravada no spill")
+        return True
+
+    def _report_and_spill(self, err, msg):
+        self._delivery_report(err, msg)
+        self._spill_failed(err, msg)
+
+    def publish_batch(self, messages: List[Sequence[Union[str, Dict[str, Any], None]]], timeout: float = 10):
+        """Enfileira um lote de mensagens e aguarda todas com um único flush.
+
+        Cada item é (topic, message) ou (topic, message, key); a ordem do lote
+        é preservada dentro de cada key.
+        Levanta KafkaException se alguma mensagem do lote não for entregue
+        (falhas gravadas no spill não contam como erro).
+        """
+        if not self._producer:
+            raise KafkaException("Producer não inicializado")
+
+        errors = []
+
+        def on_delivery(err, msg):
+            self._delivery_report(err, msg)
+            if err and not self._spill_failed(err, msg):
+                errors.append(err)
+
+        try:
+            spill_all = self._spill_pending()
+            for topic, message, *key in messages:
+                value, headers = self.codecs.encode(topic, message)
+                key = key[0] if key else None
+                if spill_all:
+                    self.spill.append(topic, self._encode_key(key), value, headers)
+                else:
+                    self._produce_with_backpressure(topic, value, headers, on_delivery, key)
+
+            remaining = self._producer.flush(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Falha ao publicar lote: {str(e)}")
+            raise
+
+        if errors or remaining:
+            raise KafkaException(f"Lote incompleto: {len(errors)} falha(s), {remaining} pendente(s)")
+
+    def _start_replay_loop(self):
+        """Dispara a thread que reenvia o spill quando o cluster volta"""
+        self._replay_thread = threading.Thread(
+            target=self._replay_loop,
+            daemon=True,
+            name="kafka-spill-replay"
+        )
+        self._replay_thread.start()
+
+    def _replay_loop(self, interval: float = 1.0):
+        backoff = interval
+        while not self._stop_event.is_set():
+            if not self._ready.is_set() or not self.spill.has_pending():
+                self._stop_event.wait(interval)
+                continue
+            try:
+                self.replay_spill()
+                backoff = interval
+            except KafkaException as e:
+                logger.warning(f"Replay do spill falhou, nova tentativa em {backoff}s: {str(e)}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def replay_spill(self, max_records: int = 500, timeout: float = 10) -> int:
+        """Reenvia o próximo lote do spill em ordem; o cursor só avança se todo o lote for entregue"""
+        records, position = self.spill.read_batch(max_records)
+        if not records:
+            return 0
+
+        errors = []
+
+        def on_delivery(err, msg):
+            self._delivery_report(err, msg)
+            if err:
+                errors.append(err)
+
+        for topic, key, value, headers in records:
+            self._produce_with_backpressure(topic, value, headers, on_delivery, key, allow_spill=False)
+        remaining = self._producer.flush(timeout=timeout)
+
+        if errors or remaining:
+            raise KafkaException(f"Replay incompleto: {len(errors)} falha(s), {remaining} pendente(s)")
+
+        self.spill.commit(position)
+        logger.info(f"{len(records)} mensagem(ns) reenviada(s) a partir do spill")
+        return len(records)
+
+    @classmethod
+    def _resolve_delivery(cls, future: Future, err, msg):
+        cls._delivery_report(err, msg)
+        if err:
+            future.set_exception(KafkaException(err))
+        else:
+            future.set_result(msg)
+
+    def flush(self, timeout: float = 10) -> int:
+        """Aguarda a entrega das mensagens pendentes e retorna quantas restaram"""
+        if not self._producer:
+            return 0
+        remaining = self._producer.flush(timeout=timeout)
+        if remaining:
+            logger.warning(f"{remaining} mensagem(ns) não entregue(s) após flush")
+        return remaining
+
+    def queue_depth(self) -> int:
+        """Mensagens na fila local aguardando entrega ou delivery report"""
+        return len(self._producer) if self._producer else 0
+
+    def close(self, timeout: float = 10) -> int:
+        """Encerra as threads de background e faz o flush final"""
+        self._stop_event.set()
+        for thread in (self._poll_thread, self._replay_thread):
+            if thread:
+                thread.join(timeout=timeout)
+        remaining = self.flush(timeout=timeout)
+        if self.spill is not None:
+            self.spill.close()
+        return remaining
+
     @staticmethod
     def _delivery_report(err, msg):
+        observe_delivery(err, msg)
         if err:
             logger.error(f"Falha na entrega: {err}")
         else:
             logger.debug(f"Mensagem entregue em {msg.topic()} [{msg.partition()}]")
 
-# Singleton com inicialização preguiçosa
+# Singleton com inicialização preguiçosa; o lock evita que a thread do consumer
+# e as threads de request criem instâncias duplicadas
 _kafka_producer = None
+_kafka_producer_lock = threading.Lock()
+
+def _spill_from_env() -> Optional[SpillLog]:
+    """Spill em disco é opcional: habilitado apenas quando KAFKA_SPILL_DIR está definido"""
+    spill_dir = os.getenv('KAFKA_SPILL_DIR')
+    if not spill_dir:
+        return None
+    return SpillLog(spill_dir, segment_size=int(os.getenv('KAFKA_SPILL_SEGMENT_BYTES', 64 * 1024 * 1024)))
 
 def get_kafka_producer():
     global _kafka_producer
     if _kafka_producer is None:
-        _kafka_producer = KafkaProducerWrapper()
-    return _kafka_producer
\ No newline at end of file
+        with _kafka_producer_lock:
+            if _kafka_producer is None:
+                producer = KafkaProducerWrapper(
+                    async_mode=os.getenv('KAFKA_PRODUCER_ASYNC', 'false').lower() == 'true',
+                    linger_ms=int(os.getenv('KAFKA_PRODUCER_LINGER_MS', 20)),
+                    codecs=TopicCodecs.from_env(),
+                    connect=False,
+                    spill=_spill_from_env()
+                )
+                producer.warm_up()
+                _kafka_producer = producer
+    return _kafka_producer
+
+def _singleton_queue_depth() -> int:
+    producer = _kafka_producer
+    return producer.queue_depth() if producer is not None else 0
+
+PRODUCER_QUEUE_DEPTH.set_function(_singleton_queue_depth)
+
+def is_kafka_producer_ready() -> bool:
+    """Flag de prontidão usada pelos health checks"""
+    producer = _kafka_producer
+    return producer is not None and producer.is_ready
+
+def shutdown_kafka_producer(timeout: float = 10):
+    """Faz o flush do singleton (se criado) no shutdown da aplicação"""
+    global _kafka_producer
+    with _kafka_producer_lock:
+        if _kafka_producer is not None:
+            _kafka_producer.close(timeout=timeout)
+            _kafka_producer = None
@@ -0,0 +1,147 @@
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from confluent_kafka import TopicPartition
+from shared.kafka.codecs import header_value
+
+logger = logging.getLogger("kafka-retry")
+logger.setLevel(logging.INFO)
+
+ORIGINAL_TOPIC_HEADER = 'x-original-topic'
+ORIGINAL_PARTITION_HEADER = 'x-original-partition'
+ORIGINAL_OFFSET_HEADER = 'x-original-offset'
+RETRY_ATTEMPT_HEADER = 'x-retry-attempt'
+NOT_BEFORE_HEADER = 'x-retry-not-before'
+ERROR_HEADER = 'x-error'
+ERROR_TYPE_HEADER = 'x-error-type'
+FAILED_AT_HEADER = 'x-failed-at'
+
+ROUTING_HEADERS = {
+    ORIGINAL_TOPIC_HEADER, ORIGINAL_PARTITION_HEADER, ORIGINAL_OFFSET_HEADER, RETRY_ATTEMPT_HEADER,
+    NOT_BEFORE_HEADER, ERROR_HEADER, ERROR_TYPE_HEADER, FAILED_AT_HEADER,
+}
+
+RETRY_SUFFIX = '.retry.'
+DLQ_SUFFIX = '.dlq'
+
+def strip_routing_headers(headers) -> List[Tuple[str, bytes]]:
+    return [(key, value) for key, value in (headers or []) if key not in ROUTING_HEADERS]
+
+def parse_delays(spec: Optional[str]) -> Tuple[int, ...]:
+    """Converte '5,30,300' em (5, 30, 300) segundos"""
+    return tuple(int(delay) for delay in (spec or '').split(',') if delay.strip())
+
+class RetryPolicy:
+    """Tiers de retry por tópico: {topic}.retry.1..N com atraso crescente e {topic}.dlq no fim"""
+
+    def __init__(self, delays: Tuple[int, ...] = (5, 30, 300)):
+        self.delays = tuple(delays)
+
+    def retry_topic(self, topic: str, attempt: int) -> str:
+        return f"{topic}{RETRY_SUFFIX}{attempt}"
+
+    def retry_topics(self, topic: str) -> List[str]:
+        return [self.retry_topic(topic, attempt) for attempt in range(1, len(self.delays) + 1)]
+
+    def dlq_topic(self, topic: str) -> str:
+        return f"{topic}{DLQ_SUFFIX}"
+
+    @staticmethod
+    def base_topic(topic: str) -> str:
+        """payment_processed.retry.2 -> payment_processed"""
+        return topic.split(RETRY_SUFFIX, 1)[0]
+
+    def expand(self, topics: List[str]) -> List[str]:
+        expanded = []
+        for topic in topics:
+            expanded.append(topic)
+            expanded.extend(self.retry_topics(topic))
+        return expanded
+
+class DeadLetterRouter:
+    """Encaminha mensagens que falharam para o próximo tier de retry ou para a DLQ.
+
+    A mensagem é republicada com os bytes originais (value, key e headers) mais
+    headers de erro; o consumer só commita o offset depois do envio confirmado.
+    """
+
+    def __init__(self, producer, policy: Optional[RetryPolicy] = None):
+        self._producer = producer
+        self.policy = policy or RetryPolicy()
+
+    @classmethod
+    def from_env(cls) -> Optional['DeadLetterRouter']:
+        if os.getenv('KAFKA_DLQ_ENABLED', 'true').lower() != 'true':
+            return None
+        from shared.kafka.producer import get_kafka_producer
+        return cls(get_kafka_producer(), RetryPolicy(parse_delays(os.getenv('KAFKA_RETRY_DELAYS', '5,30,300'))))
+
+    def retry_delay_remaining(self, msg) -> float:
+        """Segundos até a mensagem de um tópico de retry poder ser reprocessada"""
+        not_before = header_value(msg.headers(), NOT_BEFORE_HEADER)
+        if not not_before:
+            return 0
+        return max(0.0, int(not_before) / 1000 - time.time())
+
+    def route(self, msg, error: Exception, retryable: bool = True) -> str:
+        """Publica no próximo tier (ou na DLQ) e retorna o tópico de destino"""
+        headers = msg.headers() or []
+        original_topic = header_value(headers, ORIGINAL_TOPIC_HEADER) or self.policy.base_topic(msg.topic())
+        attempt = int(header_value(headers, RETRY_ATTEMPT_HEADER) or 0) + 1
+
+        routing: Dict[str, str] = {
+            ORIGINAL_TOPIC_HEADER: original_topic,
+            ORIGINAL_PARTITION_HEADER: header_value(headers, ORIGINAL_PARTITION_HEADER) or str(msg.partition()),
+            ORIGINAL_OFFSET_HEADER: header_value(headers, ORIGINAL_OFFSET_HEADER) or str(msg.offset()),
+            RETRY_ATTEMPT_HEADER: str(attempt),
+            ERROR_HEADER: str(error)[:1000],
+            ERROR_TYPE_HEADER: type(error).__name__,
+            FAILED_AT_HEADER: datetime.utcnow().isoformat(),
+        }
+
+        if retryable and attempt <= len(self.policy.delays):
+            target = self.policy.retry_topic(original_topic, attempt)
+            delay = self.policy.delays[attempt - 1]
+            routing[NOT_BEFORE_HEADER] = str(int((time.time() + delay) * 1000))
+        else:
+            target = self.policy.dlq_topic(original_topic)
+
+        self._producer.publish_raw(
+            target,
+            msg.value(),
+            key=msg.key(),
+            headers=strip_routing_headers(headers) + [(name, value.encode('utf-8')) for name, value in routing.items()]
+        )
+        log = logger.error if target.endswith(DLQ_SUFFIX) else logger.warning
+        log(f"Mensagem de {msg.topic()} [{msg.partition()}@{msg.offset()}] enviada para {target}: {str(error)}")
+        return target
+
+class RetryDeferralMixin:
+    """Segura mensagens de tópicos de retry até o prazo do tier.
+
+    Usado pelos consumers com `self._consumer`, `self.dead_letter` e
+    `self._paused` ({(topic, partition): instante monotônico de retomada}).
+    """
+
+    def _defer_if_not_due(self, msg) -> bool:
+        """Mensagem de retry antes do prazo: pausa a partição e volta ao mesmo offset"""
+        if self.dead_letter is None or RETRY_SUFFIX not in msg.topic():
+            return False
+        remaining = self.dead_letter.retry_delay_remaining(msg)
+        if remaining <= 0:
+            return False
+        partition = TopicPartition(msg.topic(), msg.partition(), msg.offset())
+        self._consumer.pause([partition])
+        self._consumer.seek(partition)
+        self._paused[(msg.topic(), msg.partition())] = time.monotonic() + remaining
+        return True
+
+    def _resume_due_partitions(self):
+        now = time.monotonic()
+        due = [tp for tp, resume_at in self._paused.items() if resume_at <= now]
+        if due:
+            self._consumer.resume([TopicPartition(topic, partition) for topic, partition in due])
+            for tp in due:
+                del self._paused[tp]
@@ -0,0 +1,42 @@
+import logging
+from typing import Any, Callable, Dict, Optional
+from shared.kafka.codecs import EVENT_TYPE_HEADER, header_value
+
+logger = logging.getLogger("kafka-routing")
+logger.setLevel(logging.INFO)
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+class EventRouter:
+    """Handlers por event_type para um tópico.
+
+    O consumer consulta `accepts()` com os headers antes de decodificar: eventos
+    sem handler são descartados sem custo de desserialização. Mensagens sem o
+    header (produzidas antes dele existir) são decodificadas e roteadas pelo
+    campo `event_type` do envelope.
+    """
+
+    def __init__(self, handlers: Dict[str, Handler]):
+        self.handlers = dict(handlers)
+
+    def accepts(self, headers) -> bool:
+        event_type = header_value(headers, EVENT_TYPE_HEADER)
+        return event_type is None or event_type in self.handlers
+
+    def resolve(self, message: Dict[str, Any]) -> Optional[Handler]:
+        handler = self.handlers.get(message.get('event_type'))
+        if handler is None:
+            logger.debug(f"Sem handler para event_type={message.get('event_type')}, ignorando")
+        return handler
+
+    def __call__(self, message: Dict[str, Any]):
+        handler = self.resolve(message)
+        return handler(message) if handler else None
+
+def should_decode(callback: Optional[Callable], headers) -> bool:
+    """Decide, só pelos headers, se vale a pena decodificar a mensagem"""
+    if callback is None:
+        return False
+    if isinstance(callback, EventRouter):
+        return callback.accepts(headers)
+    return True
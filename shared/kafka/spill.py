@@ -0,0 +1,190 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("kafka-spill")
+logger.setLevel(logging.INFO)
+
+# Cabeçalho de cada registro: tamanho do corpo + crc32 do corpo
+_RECORD_HEADER = struct.Struct('<II')
+# Corpo: tamanhos de topic, key (-1 = sem key), value e headers
+_BODY_HEADER = struct.Struct('<HiII')
+
+SEGMENT_SUFFIX = '.seg'
+CURSOR_FILE = 'cursor'
+
+SpillRecord = Tuple[str, Optional[bytes], bytes, list]
+Position = Tuple[int, int]
+
+def _encode_record(topic: str, key: Optional[bytes], value: bytes, headers) -> bytes:
+    topic_bytes = topic.encode('utf-8')
+    headers_bytes = json.dumps([
+        [name, header_value.decode('latin-1') if isinstance(header_value, bytes) else header_value]
+        for name, header_value in (headers or [])
+    ]).encode('utf-8')
+    body = b''.join([
+        _BODY_HEADER.pack(len(topic_bytes), -1 if key is None else len(key), len(value), len(headers_bytes)),
+        topic_bytes,
+        key or b'',
+        value,
+        headers_bytes,
+    ])
+    return _RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+def _decode_body(body: bytes) -> SpillRecord:
+    topic_len, key_len, value_len, headers_len = _BODY_HEADER.unpack_from(body)
+    offset = _BODY_HEADER.size
+    topic = body[offset:offset + topic_len].decode('utf-8')
+    offset += topic_len
+    key = None
+    if key_len >= 0:
+        key = body[offset:offset + key_len]
+        offset += key_len
+    value = body[offset:offset + value_len]
+    offset += value_len
+    headers = [
+        (name, header_value.encode('latin-1') if header_value is not None else None)
+        for name, header_value in json.loads(body[offset:offset + headers_len])
+    ]
+    return topic, key, value, headers
+
+class _Segment:
+    """Arquivo pré-alocado e mapeado em memória; registros são só anexados"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.seq = int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)])
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        # Arquivo vazio ou truncado (ex.: crash logo após o open): completa com zeros,
+        # que o scan lê como fim dos registros
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self.size = os.fstat(self._fd).st_size
+        self._mm = mmap.mmap(self._fd, self.size)
+        self.write_offset = self._scan_end()
+
+    def _scan_end(self) -> int:
+        """Percorre os registros válidos; um crc inválido marca o fim (escrita interrompida)"""
+        offset = 0
+        for _, next_offset in self.iter_records(0):
+            offset = next_offset
+        return offset
+
+    def iter_records(self, offset: int):
+        while offset + _RECORD_HEADER.size <= self.size:
+            length, crc = _RECORD_HEADER.unpack_from(self._mm, offset)
+            start = offset + _RECORD_HEADER.size
+            if length == 0 or start + length > self.size:
+                return
+            body = self._mm[start:start + length]
+            if zlib.crc32(body) != crc:
+                logger.warning(f"Checksum inválido em {self.path}@{offset}, ignorando o restante do segmento")
+                return
+            offset = start + length
+            yield body, offset
+
+    def has_room(self, record_size: int) -> bool:
+        return self.write_offset + record_size <= self.size
+
+    def append(self, record: bytes):
+        self._mm[self.write_offset:self.write_offset + len(record)] = record
+        self._mm.flush()
+        self.write_offset += len(record)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+class SpillLog:
+    """Log local append-only usado quando o Kafka não aceita mensagens.
+
+    Os registros ficam em segmentos mapeados em memória com crc32 por registro;
+    o cursor de leitura é persistido para que o replay continue após um restart.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        self._segments = [_Segment(path, segment_size) for path in paths]
+        if not self._segments:
+            self._segments.append(self._new_segment(0))
+        self._cursor = self._load_cursor()
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}{SEGMENT_SUFFIX}")
+
+    def _new_segment(self, seq: int, size: Optional[int] = None) -> _Segment:
+        return _Segment(self._segment_path(seq), size or self.segment_size)
+
+    def _load_cursor(self) -> Position:
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                seq, offset = json.load(f)
+                return seq, offset
+        except (OSError, ValueError):
+            return self._segments[0].seq, 0
+
+    def _save_cursor(self, position: Position):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(list(position), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def append(self, topic: str, key: Optional[bytes], value: bytes, headers=None):
+        record = _encode_record(topic, key, value, headers)
+        with self._lock:
+            active = self._segments[-1]
+            if not active.has_room(len(record)):
+                active = self._new_segment(active.seq + 1, max(self.segment_size, len(record)))
+                self._segments.append(active)
+            active.append(record)
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            active = self._segments[-1]
+            return self._cursor < (active.seq, active.write_offset)
+
+    def read_batch(self, max_records: int = 500) -> Tuple[List[SpillRecord], Position]:
+        """Lê registros a partir do cursor, em ordem; retorna a posição após o último lido"""
+        records = []
+        with self._lock:
+            position = self._cursor
+            for segment in self._segments:
+                if segment.seq < position[0]:
+                    continue
+                offset = position[1] if segment.seq == position[0] else 0
+                for body, next_offset in segment.iter_records(offset):
+                    records.append(_decode_body(body))
+                    position = (segment.seq, next_offset)
+                    if len(records) >= max_records:
+                        return records, position
+        return records, position
+
+    def commit(self, position: Position):
+        """Avança o cursor e remove segmentos já drenados (exceto o ativo)"""
+        with self._lock:
+            self._save_cursor(position)
+            self._cursor = position
+            while len(self._segments) > 1 and self._segments[0].seq < position[0]:
+                segment = self._segments.pop(0)
+                segment.close()
+                os.remove(segment.path)
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments:
+                segment.close()
@@ -0,0 +1,200 @@
+"""Gerenciador declarativo de tópicos: compara um spec JSON com o cluster e aplica a diferença.
+
+Uso:
+    python -m shared.kafka.topic_manager plan [--spec topics.json]
+    python -m shared.kafka.topic_manager apply [--spec topics.json] [--dry-run] [--wait 60]
+
+Cria tópicos ausentes, aumenta partições e altera configs (retention.ms,
+cleanup.policy, ...) de forma incremental: configs fora do spec não são tocadas.
+Partições nunca diminuem e o replication factor de tópicos existentes não muda.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from confluent_kafka import KafkaException
+from confluent_kafka.admin import (
+    AdminClient, AlterConfigOpType, ConfigEntry, ConfigResource, NewPartitions, NewTopic, ResourceType
+)
+from shared.kafka.retry import DLQ_SUFFIX, RETRY_SUFFIX
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("kafka-topic-manager")
+
+DEFAULT_BROKERS = 'kafka-controller:9092,kafka-broker-2:9094,kafka-broker-3:9095'
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topics.json')
+
+class TopicSpec:
+    def __init__(self, name: str, partitions: int, replication_factor: int, configs: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.partitions = partitions
+        self.replication_factor = replication_factor
+        self.configs = {key: str(value) for key, value in (configs or {}).items()}
+
+    def __repr__(self):
+        return f"TopicSpec({self.name}, partitions={self.partitions}, rf={self.replication_factor}, configs={self.configs})"
+
+def parse_spec(spec: dict) -> Dict[str, TopicSpec]:
+    """Expande o spec: tópicos declarados + tiers de retry e DLQ dos tópicos consumidos"""
+    replication_factor = spec.get('replication_factor', 3)
+    topics = {
+        name: TopicSpec(name, definition['partitions'], definition.get('replication_factor', replication_factor),
+                        definition.get('configs'))
+        for name, definition in spec.get('topics', {}).items()
+    }
+
+    dead_letter = spec.get('dead_letter')
+    if dead_letter:
+        for name in dead_letter.get('topics', []):
+            partitions = topics[name].partitions
+            for attempt in range(1, dead_letter.get('retry_tiers', 3) + 1):
+                retry_name = f"{name}{RETRY_SUFFIX}{attempt}"
+                topics[retry_name] = TopicSpec(retry_name, partitions, replication_factor,
+                                               dead_letter.get('retry_configs'))
+            dlq_name = f"{name}{DLQ_SUFFIX}"
+            topics[dlq_name] = TopicSpec(dlq_name, dead_letter.get('dlq_partitions', 1), replication_factor,
+                                         dead_letter.get('dlq_configs'))
+    return topics
+
+def load_spec(path: str = DEFAULT_SPEC) -> Dict[str, TopicSpec]:
+    with open(path) as f:
+        return parse_spec(json.load(f))
+
+class TopicPlan:
+    """Diferença entre o spec e o cluster"""
+
+    def __init__(self):
+        self.create: List[TopicSpec] = []
+        # topic -> (atual, desejado)
+        self.partitions: Dict[str, Tuple[int, int]] = {}
+        # topic -> {config: (atual, desejado)}
+        self.configs: Dict[str, Dict[str, Tuple[Optional[str], str]]] = {}
+        self.warnings: List[str] = []
+
+    @property
+    def empty(self) -> bool:
+        return not (self.create or self.partitions or self.configs)
+
+    def describe(self) -> List[str]:
+        lines = [f"+ criar {t.name} (partições={t.partitions}, rf={t.replication_factor}, configs={t.configs})"
+                 for t in self.create]
+        lines += [f"~ {name}: partições {current} -> {desired}" for name, (current, desired) in self.partitions.items()]
+        for name, changes in self.configs.items():
+            lines += [f"~ {name}: {key} {current} -> {desired}" for key, (current, desired) in changes.items()]
+        lines += [f"! {warning}" for warning in self.warnings]
+        return lines or ["Cluster já está de acordo com o spec"]
+
+class TopicManager:
+    def __init__(self, bootstrap_servers: str = DEFAULT_BROKERS, admin: Optional[AdminClient] = None,
+                 timeout: float = 30):
+        self._admin = admin or AdminClient({'bootstrap.servers': bootstrap_servers})
+        self.timeout = timeout
+
+    def wait_for_cluster(self, timeout: float = 60, interval: float = 2) -> bool:
+        """Aguarda os brokers responderem (substitui o sleep fixo do script antigo)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._admin.list_topics(timeout=5)
+                return True
+            except KafkaException as e:
+                if time.monotonic() >= deadline:
+                    logger.error(f"Cluster indisponível após {timeout}s: {str(e)}")
+                    return False
+                logger.warning(f"Aguardando cluster Kafka: {str(e)}")
+                time.sleep(interval)
+
+    def _current_configs(self, names: List[str]) -> Dict[str, Dict[str, str]]:
+        if not names:
+            return {}
+        futures = self._admin.describe_configs([ConfigResource(ResourceType.TOPIC, name) for name in names])
+        return {
+            resource.name: {key: entry.value for key, entry in future.result(timeout=self.timeout).items()}
+            for resource, future in futures.items()
+        }
+
+    def plan(self, specs: Dict[str, TopicSpec]) -> TopicPlan:
+        plan = TopicPlan()
+        existing = self._admin.list_topics(timeout=self.timeout).topics
+
+        for name, spec in specs.items():
+            if name not in existing:
+                plan.create.append(spec)
+                continue
+            current = len(existing[name].partitions)
+            if spec.partitions > current:
+                plan.partitions[name] = (current, spec.partitions)
+                plan.warnings.append(f"{name}: keys existentes mudam de partição ao aumentar de {current} para {spec.partitions}")
+            elif spec.partitions < current:
+                plan.warnings.append(f"{name}: spec pede {spec.partitions} partições, cluster tem {current} (não é possível reduzir)")
+
+        current_configs = self._current_configs([name for name in specs if name in existing])
+        for name, configs in current_configs.items():
+            changes = {
+                key: (configs.get(key), value) for key, value in specs[name].configs.items() if configs.get(key) != value
+            }
+            if changes:
+                plan.configs[name] = changes
+        return plan
+
+    def apply(self, plan: TopicPlan, dry_run: bool = False) -> TopicPlan:
+        for line in plan.describe():
+            logger.info(line)
+        if dry_run or plan.empty:
+            return plan
+
+        if plan.create:
+            self._wait_all(self._admin.create_topics([
+                NewTopic(t.name, num_partitions=t.partitions, replication_factor=t.replication_factor, config=t.configs)
+                for t in plan.create
+            ]), "criar tópico")
+        if plan.partitions:
+            self._wait_all(self._admin.create_partitions([
+                NewPartitions(name, desired) for name, (_, desired) in plan.partitions.items()
+            ]), "aumentar partições")
+        if plan.configs:
+            # Incremental: só as chaves do spec são alteradas
+            self._wait_all(self._admin.incremental_alter_configs([
+                ConfigResource(ResourceType.TOPIC, name, incremental_configs=[
+                    ConfigEntry(key, desired, incremental_operation=AlterConfigOpType.SET)
+                    for key, (_, desired) in changes.items()
+                ])
+                for name, changes in plan.configs.items()
+            ]), "alterar configs")
+        logger.info("Spec de tópicos aplicado")
+        return plan
+
+    def reconcile(self, specs: Dict[str, TopicSpec], dry_run: bool = False) -> TopicPlan:
+        return self.apply(self.plan(specs), dry_run=dry_run)
+
+    def _wait_all(self, futures: dict, action: str):
+        errors = []
+        for target, future in futures.items():
+            try:
+                future.result(timeout=self.timeout)
+            except KafkaException as e:
+                errors.append(f"{getattr(target, 'name', target)}: {str(e)}")
+        if errors:
+            raise KafkaException(f"Falha ao {action}: {'; '.join(errors)}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bootstrap-servers', default=os.getenv('KAFKA_BOOTSTRAP_SERVERS', DEFAULT_BROKERS))
+    parser.add_argument('--spec', default=os.getenv('KAFKA_TOPICS_SPEC', DEFAULT_SPEC))
+    parser.add_argument('--wait', type=float, default=0, help='Segundos aguardando o cluster antes de começar')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('plan', help='Mostra a diferença entre o spec e o cluster')
+    apply_parser = subparsers.add_parser('apply', help='Aplica o spec no cluster')
+    apply_parser.add_argument('--dry-run', action='store_true')
+
+    args = parser.parse_args(argv)
+    manager = TopicManager(args.bootstrap_servers)
+    if args.wait and not manager.wait_for_cluster(timeout=args.wait):
+        return 1
+    manager.reconcile(load_spec(args.spec), dry_run=args.command == 'plan' or args.dry_run)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
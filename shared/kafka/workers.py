@@ -0,0 +1,116 @@
+import logging
+import queue
+import threading
+import zlib
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("kafka-workers")
+logger.setLevel(logging.INFO)
+
+TopicPartitionKey = Tuple[str, int]
+
+class OffsetTracker:
+    """Acompanha offsets despachados e concluídos por partição.
+
+    Só libera para commit o maior offset contíguo concluído: uma mensagem lenta
+    segura o commit das seguintes até terminar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[TopicPartitionKey, deque] = {}
+        self._done: Dict[TopicPartitionKey, set] = {}
+        self._committable: Dict[TopicPartitionKey, int] = {}
+
+    def track(self, topic: str, partition: int, offset: int):
+        with self._lock:
+            self._pending.setdefault((topic, partition), deque()).append(offset)
+            self._done.setdefault((topic, partition), set())
+
+    def complete(self, topic: str, partition: int, offset: int):
+        with self._lock:
+            tp = (topic, partition)
+            pending, done = self._pending.get(tp), self._done.get(tp)
+            if pending is None:
+                # Partição revogada enquanto a mensagem era processada
+                return
+            done.add(offset)
+            last_contiguous = None
+            while pending and pending[0] in done:
+                last_contiguous = pending.popleft()
+                done.discard(last_contiguous)
+            if last_contiguous is not None:
+                # Commit no Kafka aponta para a próxima mensagem a consumir
+                self._committable[tp] = last_contiguous + 1
+
+    def pop_committable(self) -> Dict[TopicPartitionKey, int]:
+        """Retorna {(topic, partition): próximo offset} pendentes de commit"""
+        with self._lock:
+            committable, self._committable = self._committable, {}
+            return committable
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def reset(self, partitions: Optional[List[TopicPartitionKey]] = None):
+        with self._lock:
+            for tp in (partitions if partitions is not None else list(self._pending)):
+                self._pending.pop(tp, None)
+                self._done.pop(tp, None)
+                self._committable.pop(tp, None)
+
+class KeyedWorkerPool:
+    """Pool de threads em que cada key é sempre atendida pelo mesmo worker.
+
+    Mensagens de uma mesma key (ex.: order_id) são processadas em ordem;
+    keys diferentes rodam em paralelo. Filas limitadas fazem backpressure no poll.
+    """
+
+    def __init__(self, num_workers: int, queue_size: int = 100, name: str = "kafka-worker"):
+        self.num_workers = num_workers
+        self.error: Optional[BaseException] = None
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(num_workers)]
+        self._threads = [
+            threading.Thread(target=self._run, args=(q,), daemon=True, name=f"{name}-{i}")
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, tasks: queue.Queue):
+        while True:
+            task = tasks.get()
+            try:
+                if task is None:
+                    return
+                handler, on_done = task
+                if self.error is not None:
+                    # Após uma falha, nada mais é concluído: os offsets não avançam
+                    continue
+                try:
+                    handler()
+                    on_done()
+                except Exception as e:
+                    logger.error(f"Falha no worker {threading.current_thread().name}: {str(e)}")
+                    self.error = e
+            finally:
+                tasks.task_done()
+
+    def worker_for(self, key: bytes) -> int:
+        return zlib.crc32(key) % self.num_workers
+
+    def submit(self, key: bytes, handler: Callable[[], None], on_done: Callable[[], None]):
+        self._queues[self.worker_for(key)].put((handler, on_done))
+
+    def drain(self):
+        """Bloqueia até todas as tarefas enfileiradas terminarem"""
+        for tasks in self._queues:
+            tasks.join()
+
+    def stop(self, timeout: float = 10):
+        for tasks in self._queues:
+            tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
@@ -0,0 +1,4 @@
+"""Contrato do GET /api/v1/menu/batch, compartilhado entre o menu-service e seus clientes."""
+
+# Máximo de ids por chamada do lote (mantém a URL e o IN (...) pequenos); clientes dividem em blocos deste tamanho
+MENU_BATCH_MAX_IDS = 100
@@ -0,0 +1,36 @@
+"""Respostas JSON das rotas de leitura: dicts/listas simples serializados direto para bytes.
+
+Com orjson instalado a serialização é feita em C (datetime, UUID e Enum nativos);
+sem ele cai no json da stdlib com o mesmo formato de saída.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+from uuid import UUID
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse sem validação/serialização do Pydantic; o conteúdo já deve estar pronto para JSON"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)